@@ -0,0 +1,91 @@
+"""
+JWT authentication that doesn't fetch the user row on every request.
+"""
+import logging
+from types import MethodType
+
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, router
+from redis import RedisError
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+
+from .tokens import CLAIM_FIELDS, TOKEN_VERSION_CLAIM, current_version
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+
+def _load_remaining_fields(user, using=None, fields=None, **kwargs):
+    deferred = user.get_deferred_fields()
+    if fields is not None and deferred and set(fields) <= deferred:
+        # Load the whole row on first access instead of one field at a time.
+        # The values go straight into __dict__: the field tracker's setter
+        # reads a deferred field before replacing it, loading the row again
+        row = User._base_manager.db_manager(using or user._state.db).values(*deferred).get(pk=user.pk)
+        user.__dict__.update(row)
+        return
+    User.refresh_from_db(user, using=using, fields=fields, **kwargs)
+
+
+def user_from_claims(values, using=None):
+    """
+    A ``User`` with only ``values`` set. Reading any other field loads all
+    of them with a single query.
+    """
+    field_names = [f.attname for f in User._meta.concrete_fields if f.attname in values]
+    user = User.from_db(using, field_names, [values[name] for name in field_names])
+    # Deferred fields are loaded through refresh_from_db
+    user.refresh_from_db = MethodType(_load_remaining_fields, user)
+    return user
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    Trust the signed claims of the token for the request user.
+
+    The only lookup per request is the user's token version in Redis. The
+    user is a ``User`` instance whose remaining fields load in one query the
+    first time any of them is read, so views that only filter by the user
+    or check its flags never touch the users table.
+
+    Tokens issued before the claims existed, or requests made while Redis
+    is unavailable, fall back to loading the user as before.
+    """
+
+    def get_user(self, validated_token):
+        if TOKEN_VERSION_CLAIM not in validated_token:
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise AuthenticationFailed('Token contained no recognizable user identification', code='token_not_valid')
+
+        try:
+            version = current_version(user_id)
+        except RedisError as e:
+            logger.error(f"Token version check unavailable, loading user {user_id}: {str(e)}")
+            user = super().get_user(validated_token)
+            # The user may come from a replica; the version must not
+            version = User.objects.using(DEFAULT_DB_ALIAS).filter(pk=user.pk).values_list(
+                'token_version', flat=True
+            ).first()
+            if version != validated_token[TOKEN_VERSION_CLAIM]:
+                raise AuthenticationFailed('Token has been revoked', code='token_revoked')
+            return user
+
+        if version is None:
+            raise AuthenticationFailed('User not found', code='user_not_found')
+        if version != validated_token[TOKEN_VERSION_CLAIM]:
+            raise AuthenticationFailed('Token has been revoked', code='token_revoked')
+
+        values = {
+            User._meta.pk.attname: user_id,
+            'is_active': True,
+            'token_version': version,
+        }
+        for field in CLAIM_FIELDS:
+            values[field] = bool(validated_token.get(field, False))
+        return user_from_claims(values, using=router.db_for_read(User))
@@ -0,0 +1,207 @@
+"""
+Google sign-in token verification.
+
+ID tokens are verified locally against Google's signing keys (JWKS). The
+key set is fetched once per process and kept for as long as Google's
+``Cache-Control: max-age`` allows, so verifying a token is a signature
+check with no network round trip. An unknown ``kid`` (Google rotated its
+keys) triggers an early refetch, rate limited so forged tokens can't make
+us hammer the endpoint. If a refetch fails, the previous keys stay in use.
+
+Outgoing calls share one pooled ``requests`` session with timeouts.
+``GOOGLE_JWKS_URL``, ``GOOGLE_TOKENINFO_URL`` and ``GOOGLE_USERINFO_URL``
+can point at a local stub server for testing.
+"""
+import logging
+import re
+import threading
+import time
+
+import jwt
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_ISSUERS = ('accounts.google.com', 'https://accounts.google.com')
+
+# Used when Google sends no usable max-age
+DEFAULT_MAX_AGE = 3600
+# Minimum seconds between refetches triggered by an unknown key id
+MIN_REFRESH_INTERVAL = 60
+
+_MAX_AGE = re.compile(r'max-age=(\d+)')
+
+
+class GoogleTokenError(Exception):
+    pass
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Process-wide HTTP session with a connection pool and retries on connect errors."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=4,
+                    pool_maxsize=getattr(settings, 'GOOGLE_HTTP_POOL_SIZE', 20),
+                    max_retries=Retry(total=2, connect=2, read=0, backoff_factor=0.1),
+                )
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+    return _session
+
+
+def _timeout():
+    return getattr(settings, 'GOOGLE_HTTP_TIMEOUT', 5)
+
+
+def _max_age(response):
+    match = _MAX_AGE.search(response.headers.get('Cache-Control', ''))
+    return int(match.group(1)) if match else DEFAULT_MAX_AGE
+
+
+class JWKSCache:
+    """Signing keys of a JWKS endpoint, cached per ``Cache-Control`` max-age."""
+
+    def __init__(self, url):
+        self.url = url
+        self._keys = {}
+        self._expires_at = 0
+        self._fetched_at = 0
+        self._lock = threading.Lock()
+
+    def _fetch(self):
+        response = get_session().get(self.url, timeout=_timeout())
+        response.raise_for_status()
+        keys = {}
+        for data in response.json().get('keys', []):
+            try:
+                keys[data['kid']] = jwt.PyJWK(data).key
+            except (KeyError, jwt.PyJWKError) as e:
+                logger.error(f"Skipping unusable key in {self.url}: {str(e)}")
+        now = time.monotonic()
+        self._keys = keys
+        self._fetched_at = now
+        self._expires_at = now + _max_age(response)
+
+    def _refresh(self, force=False):
+        with self._lock:
+            now = time.monotonic()
+            # Another thread may have refreshed while we waited for the lock
+            if now < self._expires_at and not force:
+                return
+            if force and now - self._fetched_at < MIN_REFRESH_INTERVAL:
+                return
+            try:
+                self._fetch()
+            except (requests.RequestException, ValueError) as e:
+                if not self._keys:
+                    raise GoogleTokenError(f"Could not fetch signing keys: {str(e)}")
+                # Keep the previous keys for a short while rather than failing every login
+                logger.error(f"Error refreshing signing keys from {self.url}: {str(e)}")
+                self._fetched_at = now
+                self._expires_at = now + MIN_REFRESH_INTERVAL
+
+    def get_key(self, kid):
+        if time.monotonic() >= self._expires_at:
+            self._refresh()
+        key = self._keys.get(kid)
+        if key is None:
+            # Keys may have rotated before our copy expired
+            self._refresh(force=True)
+            key = self._keys.get(kid)
+        if key is None:
+            raise GoogleTokenError('Token signed with an unknown key')
+        return key
+
+
+_jwks = None
+
+
+def get_jwks():
+    global _jwks
+    url = getattr(settings, 'GOOGLE_JWKS_URL', 'https://www.googleapis.com/oauth2/v3/certs')
+    if _jwks is None or _jwks.url != url:
+        _jwks = JWKSCache(url)
+    return _jwks
+
+
+def get_client_id():
+    return getattr(settings, 'GOOGLE_OAUTH2_CLIENT_ID', None)
+
+
+def verify_id_token(token, client_id=None):
+    """
+    Verify a Google ID token's signature, expiry, issuer and audience and
+    return its claims. Raises ``GoogleTokenError`` when it isn't valid.
+    """
+    client_id = client_id or get_client_id()
+    if not client_id:
+        raise GoogleTokenError('Google client id is not configured')
+    try:
+        header = jwt.get_unverified_header(token)
+    except jwt.InvalidTokenError as e:
+        raise GoogleTokenError(str(e))
+    if header.get('alg') != 'RS256':
+        raise GoogleTokenError('Unexpected token algorithm')
+
+    key = get_jwks().get_key(header.get('kid'))
+    try:
+        return jwt.decode(
+            token,
+            key,
+            algorithms=['RS256'],
+            audience=client_id,
+            issuer=GOOGLE_ISSUERS,
+            leeway=getattr(settings, 'GOOGLE_TOKEN_LEEWAY', 10),
+            options={'require': ['exp', 'iat', 'iss', 'aud', 'sub']},
+        )
+    except jwt.InvalidTokenError as e:
+        raise GoogleTokenError(str(e))
+
+
+def fetch_user_info(access_token, client_id=None):
+    """
+    Resolve an OAuth access token to the user's profile, checking that it
+    was issued to our client. Raises ``GoogleTokenError`` otherwise.
+    """
+    client_id = client_id or get_client_id()
+    if not client_id:
+        raise GoogleTokenError('Google client id is not configured')
+    session = get_session()
+    try:
+        token_response = session.get(
+            getattr(settings, 'GOOGLE_TOKENINFO_URL', 'https://oauth2.googleapis.com/tokeninfo'),
+            params={'access_token': access_token},
+            timeout=_timeout(),
+        )
+        if token_response.status_code != 200:
+            raise GoogleTokenError('Invalid access token')
+        token_info = token_response.json()
+        if token_info.get('aud') != client_id:
+            raise GoogleTokenError('Access token was issued to another client')
+
+        response = session.get(
+            getattr(settings, 'GOOGLE_USERINFO_URL', 'https://www.googleapis.com/oauth2/v3/userinfo'),
+            headers={'Authorization': f'Bearer {access_token}'},
+            timeout=_timeout(),
+        )
+        response.raise_for_status()
+        user_info = response.json()
+    except (requests.RequestException, ValueError) as e:
+        raise GoogleTokenError(f"Could not fetch user info: {str(e)}")
+
+    # If we have an email in the token info, make sure it matches the user info
+    if 'email' in token_info and 'email' in user_info and token_info['email'] != user_info['email']:
+        raise GoogleTokenError('Access token and user info disagree')
+    return user_info
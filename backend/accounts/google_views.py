@@ -1,10 +1,8 @@
 """
 Views for handling Google OAuth2 authentication.
 """
+import logging
 import os
-import base64
-import json
-from time import time
 
 from django.conf import settings
 from django.contrib.sites.models import Site
@@ -12,12 +10,14 @@ from django.contrib.auth import get_user_model
 from rest_framework import status, permissions
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
 from allauth.socialaccount.models import SocialAccount, SocialApp
-import requests
 
+from . import google_auth
+from .tokens import ClaimsRefreshToken
 from . import serializers as account_serializers
 
+logger = logging.getLogger(__name__)
+
 User = get_user_model()
 
 class GoogleAuthConfigView(APIView):
@@ -123,7 +123,7 @@ class GoogleLogin(APIView):
             user, created = self.get_or_create_user(user_info)
             
             # Return user data and tokens
-            refresh = RefreshToken.for_user(user)
+            refresh = ClaimsRefreshToken.for_user(user)
             user_serializer = account_serializers.UserSerializer(user, context={'request': request})
             user_data = user_serializer.data
             
@@ -159,122 +159,19 @@ class GoogleLogin(APIView):
 
     def verify_google_token(self, token):
         """
-        Verify a Google ID token using the google-auth library.
+        Verify a Google ID token locally against Google's cached signing keys.
         """
         try:
-            # First, try to verify locally
-            try:
-                from google.oauth2 import id_token
-                from google.auth.transport import requests as google_requests
-                
-                client_id = os.getenv('GOOGLE_OAUTH2_CLIENT_ID')
-                if not client_id:
-                    # Try to get from settings directly as fallback
-                    from django.conf import settings
-                    client_id = getattr(settings, 'GOOGLE_OAUTH2_CLIENT_ID', None)
-                    if not client_id:
-                        return None
-                
-                # Try to decode the token to see its structure
-                try:
-                    # The token is in JWT format: header.payload.signature
-                    parts = token.split('.')
-                    if len(parts) != 3:
-                        return None
-                        
-                    # Decode the payload
-                    payload = parts[1]
-                    # Add padding if needed
-                    payload += '=' * (-len(payload) % 4)
-                    decoded_payload = base64.urlsafe_b64decode(payload).decode('utf-8')
-                    payload_data = json.loads(decoded_payload)
-                    
-                    # Check token expiration
-                    exp = payload_data.get('exp')
-                    if exp and exp < time():
-                        return None
-                        
-                    # Check audience
-                    aud = payload_data.get('aud')
-                    if isinstance(aud, list):
-                        if client_id not in aud:
-                            return None
-                    elif aud != client_id:
-                        return None
-                        
-                except Exception as e:
-                    return None
-                
-                # Now verify the token with Google's library
-                idinfo = id_token.verify_oauth2_token(
-                    token,
-                    google_requests.Request(),
-                    client_id
-                )
-                
-                return idinfo
-                
-            except Exception as e:
-                pass
-            
-            # Fall back to Google's tokeninfo endpoint
-            try:
-                response = requests.get(
-                    'https://oauth2.googleapis.com/tokeninfo',
-                    params={'id_token': token}
-                )
-                response.raise_for_status()
-                idinfo = response.json()
-                
-                # Verify the client ID
-                if idinfo.get('aud') != os.getenv('GOOGLE_OAUTH2_CLIENT_ID'):
-                    return None
-                    
-                return idinfo
-                
-            except Exception as e:
-                return None
-                
-        except Exception as e:
+            return google_auth.verify_id_token(token)
+        except google_auth.GoogleTokenError as e:
+            logger.info(f"Rejected Google ID token: {str(e)}")
             return None
     
     def get_google_user_info(self, access_token):
         try:
-            # First, try to get user info using the access token
-            headers = {'Authorization': f'Bearer {access_token}'}
-            response = requests.get(
-                'https://www.googleapis.com/oauth2/v3/userinfo',
-                headers=headers
-            )
-            response.raise_for_status()
-            
-            user_info = response.json()
-            
-            # Verify the token's audience matches our client ID
-            client_id = os.getenv('GOOGLE_OAUTH2_CLIENT_ID')
-            if not client_id:
-                return None
-                
-            # Verify the token using Google's tokeninfo endpoint
-            token_info_url = f'https://oauth2.googleapis.com/tokeninfo?access_token={access_token}'
-            token_response = requests.get(token_info_url)
-            
-            if token_response.status_code == 200:
-                token_info = token_response.json()
-                if token_info.get('aud') != client_id:
-                    return None
-                
-                # If we have an email in the token info, make sure it matches the user info
-                if 'email' in token_info and 'email' in user_info and token_info['email'] != user_info['email']:
-                    return None
-                    
-                return user_info
-            
-            return None
-                
-        except requests.exceptions.RequestException as e:
-            return None
-        except Exception as e:
+            return google_auth.fetch_user_info(access_token)
+        except google_auth.GoogleTokenError as e:
+            logger.info(f"Rejected Google access token: {str(e)}")
             return None
     
     def get_or_create_user(self, user_info):
@@ -0,0 +1,91 @@
+import time
+
+from django.contrib.auth import get_user
+from django.contrib.sessions.backends.cache import SessionStore
+from django.core.management.base import BaseCommand
+from django.utils.functional import SimpleLazyObject
+from django.utils.module_loading import import_string
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+
+from config.auth_profiles import auth_profile
+
+BEFORE_AUTHENTICATION = [
+    'rest_framework_simplejwt.authentication.JWTAuthentication',
+    'rest_framework.authentication.SessionAuthentication',
+    'rest_framework.authentication.BasicAuthentication',
+]
+BEFORE_RENDERERS = [
+    'rest_framework.renderers.JSONRenderer',
+    'rest_framework.renderers.BrowsableAPIRenderer',
+]
+AFTER_RENDERERS = [
+    'config.renderers.ORJSONRenderer',
+]
+
+PAYLOAD = {'results': [{'id': i, 'title': f'Gallery {i}', 'is_public': True} for i in range(20)]}
+
+
+class Command(BaseCommand):
+    help = 'Measure per-request DRF overhead of authentication profiles and renderers on an anonymous request'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=5000,
+            help='Requests per configuration (default: 5000)'
+        )
+        parser.add_argument(
+            '--accept',
+            default='*/*',
+            help='Accept header sent with each request (default: */*)'
+        )
+
+    def make_view(self, authentication_classes, renderer_classes):
+        class BenchmarkView(APIView):
+            permission_classes = [AllowAny]
+
+            def get(self, request):
+                # Touch the user the way most views do
+                request.user.is_authenticated
+                return Response(PAYLOAD)
+
+        return BenchmarkView.as_view(
+            authentication_classes=authentication_classes,
+            renderer_classes=[import_string(path) for path in renderer_classes],
+        )
+
+    def run(self, view, iterations, accept):
+        factory = APIRequestFactory()
+
+        def request():
+            django_request = factory.get('/api/gallery/public/galleries/', HTTP_ACCEPT=accept)
+            # What SessionMiddleware and AuthenticationMiddleware attach
+            django_request.session = SessionStore()
+            django_request.user = SimpleLazyObject(lambda: get_user(django_request))
+            return django_request
+
+        for _ in range(min(iterations, 200)):
+            view(request()).render()
+        started = time.perf_counter()
+        for _ in range(iterations):
+            view(request()).render()
+        return (time.perf_counter() - started) / iterations * 1e6
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        configurations = [
+            ('before: jwt+session+basic, json+browsable', [import_string(path) for path in BEFORE_AUTHENTICATION], BEFORE_RENDERERS),
+            ('jwt-session, json', auth_profile('jwt-session'), AFTER_RENDERERS),
+            ('jwt-only, json', auth_profile('jwt-only'), AFTER_RENDERERS),
+            ('public-anonymous, json', auth_profile('public-anonymous'), AFTER_RENDERERS),
+        ]
+        baseline = None
+        for label, authentication_classes, renderer_classes in configurations:
+            view = self.make_view(authentication_classes, renderer_classes)
+            per_request = self.run(view, iterations, options['accept'])
+            baseline = baseline or per_request
+            self.stdout.write(f'{label:<45} {per_request:8.1f} us/request  ({per_request / baseline:.2f}x)')
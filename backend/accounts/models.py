@@ -3,6 +3,7 @@ from django.db import models
 from django.utils.translation import gettext_lazy as _
 from django.dispatch import receiver
 from django.db.models.signals import post_save
+from model_utils import FieldTracker
 
 class UserManager(BaseUserManager):
     """Custom user model manager where email is the unique identifier."""
@@ -49,6 +50,15 @@ class CustomUser(AbstractUser):
         default=False,
         help_text=_('Designates whether the user is a photographer who can upload photos.')
     )
+    token_version = models.PositiveIntegerField(
+        _('token version'),
+        default=0,
+        editable=False,
+        help_text=_('Incremented to revoke every JWT issued to the user so far')
+    )
+    
+    # Changes to these fields revoke the user's tokens (see accounts.signals)
+    tracker = FieldTracker(fields=['password', 'is_active', 'is_staff', 'is_superuser', 'is_photographer'])
     
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = []
@@ -2,14 +2,19 @@ import logging
 from rest_framework import serializers
 from django.contrib.auth import get_user_model, authenticate
 from django.utils.translation import gettext_lazy as _
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
 from django.contrib.auth.forms import PasswordResetForm, SetPasswordForm
 from django.conf import settings
 from django.utils.http import urlsafe_base64_decode as uid_decoder
 from django.utils.encoding import force_str
 from django.contrib.auth.tokens import default_token_generator
+from django.db import DEFAULT_DB_ALIAS
 from rest_framework.exceptions import ValidationError
 
+from .tokens import ClaimsRefreshToken, TOKEN_VERSION_CLAIM
+
 User = get_user_model()
 
 class UserSerializer(serializers.ModelSerializer):
@@ -208,6 +213,8 @@ class PasswordResetConfirmSerializer(serializers.Serializer):
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     """Custom token serializer to include additional user data in the response."""
+    token_class = ClaimsRefreshToken
+
     def validate(self, attrs):
         data = super().validate(attrs)
         refresh = self.get_token(self.user)
@@ -221,6 +228,21 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         })
         return data
 
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refuse to refresh tokens that were revoked by a token version bump."""
+    token_class = ClaimsRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        if TOKEN_VERSION_CLAIM in refresh:
+            # Refreshes are rare, so check the authoritative version on the primary
+            version = User.objects.using(DEFAULT_DB_ALIAS).filter(
+                pk=refresh[jwt_settings.USER_ID_CLAIM]
+            ).values_list('token_version', flat=True).first()
+            if version != refresh[TOKEN_VERSION_CLAIM]:
+                raise InvalidToken('Token has been revoked')
+        return super().validate(attrs)
+
 class CustomLoginSerializer(serializers.Serializer):
     """
     Custom serializer for email-based login.
@@ -1,10 +1,12 @@
 from django.core.mail import send_mail
 from django.template.loader import render_to_string
 from django.conf import settings
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 
+from .tokens import cache_version, revoke_tokens
+
 User = get_user_model()
 
 def send_welcome_email(user, is_photographer=False):
@@ -46,3 +48,41 @@ def send_welcome_email_on_signup(sender, instance, created, **kwargs):
         # Check if this is a photographer or regular customer
         is_photographer = hasattr(instance, 'is_photographer') and instance.is_photographer
         send_welcome_email(instance, is_photographer=is_photographer)
+
+def _credentials_changed(instance):
+    return any(instance.tracker.has_changed(field) for field in instance.tracker.fields)
+
+def _saves_token_version(update_fields):
+    return update_fields is None or 'token_version' in update_fields
+
+@receiver(pre_save, sender=User)
+def bump_token_version_on_credential_change(sender, instance, update_fields=None, **kwargs):
+    """
+    Signal to bump the token version in the same write as a password,
+    active status or role change, so the instance never holds a stale one
+    """
+    if instance._state.adding or not _credentials_changed(instance):
+        return
+    if _saves_token_version(update_fields):
+        instance.token_version = (instance.token_version or 0) + 1
+
+@receiver(post_save, sender=User)
+def revoke_tokens_on_credential_change(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Signal to revoke a user's JWTs when their password, active status or
+    roles change, since tokens carry the roles as claims
+    """
+    if created or not _credentials_changed(instance):
+        return
+    if _saves_token_version(update_fields):
+        cache_version(instance.pk, instance.token_version)
+    else:
+        # update_fields left the version out; bump it separately
+        instance.token_version = revoke_tokens(instance.pk)
+
+@receiver(post_delete, sender=User)
+def revoke_tokens_on_delete(sender, instance, **kwargs):
+    """
+    Signal to drop the cached token version of a deleted user
+    """
+    cache_version(instance.pk, None)
@@ -0,0 +1,138 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from redis import RedisError
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+
+from .authentication import ClaimsJWTAuthentication
+from .tokens import ClaimsRefreshToken, TOKEN_VERSION_CLAIM, _version_key
+
+User = get_user_model()
+
+
+class FakeRedis:
+    """The few string commands the token version cache uses."""
+
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.values:
+            return None
+        self.values[key] = str(value).encode()
+        return True
+
+    def delete(self, key):
+        return int(self.values.pop(key, None) is not None)
+
+
+class DownRedis:
+    def __getattr__(self, name):
+        raise RedisError('Connection refused')
+
+
+class ClaimsAuthenticationTests(TestCase):
+    def setUp(self):
+        self.redis = FakeRedis()
+        patcher = mock.patch('accounts.tokens.get_redis', return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user(email='customer@example.com', password='secret')
+        self.auth = ClaimsJWTAuthentication()
+
+    def authenticate(self, user=None):
+        access = ClaimsRefreshToken.for_user(user or self.user).access_token
+        return self.auth.get_user(self.auth.get_validated_token(str(access)))
+
+    def test_user_is_built_from_the_claims(self):
+        token = ClaimsRefreshToken.for_user(self.user).access_token
+        validated = self.auth.get_validated_token(str(token))
+        self.authenticate()  # caches the version
+
+        with self.assertNumQueries(0):
+            user = self.auth.get_user(validated)
+            self.assertEqual(user.pk, self.user.pk)
+            self.assertFalse(user.is_staff)
+            self.assertTrue(user.is_active)
+
+        # Any other field loads the row
+        with self.assertNumQueries(1):
+            self.assertEqual(user.email, 'customer@example.com')
+
+    def test_password_change_bumps_the_version_in_the_same_save(self):
+        old_token = ClaimsRefreshToken.for_user(self.user).access_token
+        self.authenticate()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.set_password('changed')
+            self.user.save()
+
+        self.user.refresh_from_db(fields=['token_version'])
+        self.assertEqual(self.user.token_version, 1)
+        self.assertEqual(self.redis.get(_version_key(self.user.pk)), b'1')
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.get_user(self.auth.get_validated_token(str(old_token)))
+        self.assertEqual(self.authenticate().pk, self.user.pk)
+
+    def test_password_change_through_the_claims_user_revokes(self):
+        user = self.authenticate()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            user.set_password('changed')
+            user.save()
+
+        self.assertEqual(User.objects.get(pk=self.user.pk).token_version, 1)
+        self.assertEqual(self.redis.get(_version_key(self.user.pk)), b'1')
+
+    def test_next_save_keeps_the_bumped_version(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_staff = True
+            self.user.save()
+        self.user.first_name = 'Ada'
+        self.user.save()
+
+        self.user.refresh_from_db(fields=['token_version'])
+        self.assertEqual(self.user.token_version, 1)
+
+    def test_update_fields_without_the_version_still_revokes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.set_password('changed')
+            self.user.save(update_fields=['password'])
+
+        self.assertEqual(self.user.token_version, 1)
+        self.assertEqual(User.objects.get(pk=self.user.pk).token_version, 1)
+        self.assertEqual(self.redis.get(_version_key(self.user.pk)), b'1')
+
+    def test_version_is_cached_only_after_commit(self):
+        self.authenticate()
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.user.is_active = False
+            self.user.save()
+            self.assertEqual(self.redis.get(_version_key(self.user.pk)), b'0')
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.redis.get(_version_key(self.user.pk)), b'1')
+
+    def test_redis_down_falls_back_to_the_database(self):
+        token = ClaimsRefreshToken.for_user(self.user).access_token
+
+        with mock.patch('accounts.tokens.get_redis', return_value=DownRedis()):
+            user = self.auth.get_user(self.auth.get_validated_token(str(token)))
+            self.assertEqual(user.pk, self.user.pk)
+
+            User.objects.filter(pk=self.user.pk).update(token_version=1)
+            with self.assertRaises(AuthenticationFailed):
+                self.auth.get_user(self.auth.get_validated_token(str(token)))
+
+    def test_token_carries_the_stored_version(self):
+        User.objects.filter(pk=self.user.pk).update(token_version=3)
+
+        token = ClaimsRefreshToken.for_user(self.user)
+
+        self.assertEqual(token[TOKEN_VERSION_CLAIM], 3)
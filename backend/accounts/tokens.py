@@ -0,0 +1,98 @@
+"""
+JWTs that carry enough of the user to authorize most requests.
+
+Access and refresh tokens include ``is_staff``, ``is_superuser``,
+``is_photographer`` and the user's token version (``ver``).
+``accounts.authentication.ClaimsJWTAuthentication`` builds the request user
+from these claims and loads the rest of the row only when code reads
+another field.
+
+Revocation works through the version: bumping it, which happens on a
+password change, deactivation or role change, invalidates every token
+issued before. The current version is read from Redis and falls back to
+``CustomUser.token_version`` when the key is missing. A bump is written to
+Redis once its transaction commits; if that write fails, the cached old
+version expires within ``VERSION_CACHE_TTL``.
+"""
+import logging
+
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import F
+from redis import RedisError
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from config.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+TOKEN_VERSION_CLAIM = 'ver'
+CLAIM_FIELDS = ('is_staff', 'is_superuser', 'is_photographer')
+
+# Bounds how long a revoked token is still accepted if caching the bump failed
+VERSION_CACHE_TTL = 5 * 60
+
+
+def _version_key(user_id):
+    return f'auth:token_version:{user_id}'
+
+
+def current_version(user_id):
+    """
+    Current token version of ``user_id``, or None if the user no longer
+    exists. Raises ``RedisError`` when Redis is unavailable.
+    """
+    redis = get_redis()
+    version = redis.get(_version_key(user_id))
+    if version is not None:
+        return int(version)
+    # Always the primary: a lagging replica would accept just-revoked tokens
+    version = User.objects.using(DEFAULT_DB_ALIAS).filter(pk=user_id).values_list('token_version', flat=True).first()
+    if version is not None:
+        # nx: a bump cached meanwhile must not be replaced by this older read
+        redis.set(_version_key(user_id), version, ex=VERSION_CACHE_TTL, nx=True)
+    return version
+
+
+def cache_version(user_id, version):
+    """
+    Store ``version`` as the current token version of ``user_id`` once the
+    current transaction commits; None drops the cached version.
+    """
+    def store():
+        try:
+            if version is None:
+                get_redis().delete(_version_key(user_id))
+            else:
+                get_redis().set(_version_key(user_id), version, ex=VERSION_CACHE_TTL)
+        except RedisError as e:
+            # The cached old version expires within VERSION_CACHE_TTL
+            logger.error(f"Error caching token version of user {user_id}: {str(e)}")
+    transaction.on_commit(store)
+
+
+def revoke_tokens(user_id):
+    """Invalidate every token issued to ``user_id`` so far; returns the new version."""
+    with transaction.atomic():
+        User.objects.filter(pk=user_id).update(token_version=F('token_version') + 1)
+        version = User.objects.using(DEFAULT_DB_ALIAS).filter(pk=user_id).values_list(
+            'token_version', flat=True
+        ).first()
+        cache_version(user_id, version)
+    return version
+
+
+class ClaimsRefreshToken(RefreshToken):
+    """Refresh token (and derived access tokens) carrying the user's claims."""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for field in CLAIM_FIELDS:
+            token[field] = bool(getattr(user, field, False))
+        # Read back from the primary; the instance may predate a revocation
+        version = User.objects.using(DEFAULT_DB_ALIAS).filter(pk=user.pk).values_list('token_version', flat=True).first()
+        token[TOKEN_VERSION_CLAIM] = version or 0
+        return token
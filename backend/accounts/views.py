@@ -5,7 +5,6 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 import os
 from rest_framework_simplejwt.views import TokenObtainPairView as BaseTokenObtainPairView
-from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import get_user_model, authenticate
 from django.conf import settings
 from django.contrib.sites.models import Site
@@ -30,6 +29,7 @@ from rest_framework.exceptions import ValidationError
 # Import serializers
 from . import serializers as account_serializers
 from rest_framework import permissions
+from .tokens import ClaimsRefreshToken
 from .serializers import EmailSerializer, PasswordResetConfirmSerializer, ChangePasswordSerializer, UserSerializer
 
 logger = logging.getLogger(__name__)
@@ -119,8 +119,15 @@ class ChangePasswordView(generics.UpdateAPIView):
             self.object.set_password(serializer.data.get('new_password'))
             self.object.save()
             
+            # Saving the password revoked every token issued so far,
+            # including the one used for this request
+            refresh = ClaimsRefreshToken.for_user(self.object)
             response = Response(
-                {"message": "Password updated successfully"},
+                {
+                    "message": "Password updated successfully",
+                    "access": str(refresh.access_token),
+                    "refresh": str(refresh),
+                },
                 status=status.HTTP_200_OK
             )
         else:
@@ -276,7 +283,7 @@ def create(self, request, *args, **kwargs):
         user = serializer.save()
         
         # Generate tokens
-        refresh = RefreshToken.for_user(user)
+        refresh = ClaimsRefreshToken.for_user(user)
         access = str(refresh.access_token)
         refresh = str(refresh)
         
@@ -0,0 +1,85 @@
+"""
+Named authentication profiles for API views.
+
+DRF runs every class in ``DEFAULT_AUTHENTICATION_CLASSES`` until one of
+them succeeds, so an anonymous hit on a public endpoint pays for the whole
+chain, including loading the session for ``SessionAuthentication``. Views
+declare the profile they need instead::
+
+    class PublicGalleryListView(generics.ListAPIView):
+        authentication_classes = auth_profile('public-anonymous')
+
+or a URL module applies one to all of its views::
+
+    urlpatterns = apply_auth_profile('jwt-only', urlpatterns)
+
+``apply_auth_profile`` leaves alone views that set their own
+``authentication_classes``. Profiles are configured in ``AUTH_PROFILES``.
+"""
+from django.conf import settings
+from django.urls import URLPattern, URLResolver
+from django.utils.module_loading import import_string
+from rest_framework.views import APIView
+
+DEFAULT_PROFILES = {
+    # Nothing to authenticate: request.user is always AnonymousUser
+    'public-anonymous': [],
+    # API clients sending a bearer token
+    'jwt-only': ['accounts.authentication.ClaimsJWTAuthentication'],
+    # Admin and staff tools used from a logged-in browser
+    'staff-session': ['rest_framework.authentication.SessionAuthentication'],
+    # Bearer token first, then the browser session
+    'jwt-session': [
+        'accounts.authentication.ClaimsJWTAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+    ],
+}
+
+_resolved = {}
+
+
+def auth_profile(name):
+    """Authentication classes of the profile ``name``."""
+    if name not in _resolved:
+        profiles = {**DEFAULT_PROFILES, **getattr(settings, 'AUTH_PROFILES', {})}
+        try:
+            paths = profiles[name]
+        except KeyError:
+            raise ValueError(f"Unknown authentication profile {name}")
+        _resolved[name] = [import_string(path) for path in paths]
+    return list(_resolved[name])
+
+
+def _sets_own_authentication(cls):
+    return cls.authentication_classes is not APIView.authentication_classes
+
+
+def _with_profile(pattern, classes):
+    callback = pattern.callback
+    cls = getattr(callback, 'cls', None)
+    if cls is None or not issubclass(cls, APIView) or _sets_own_authentication(cls):
+        return pattern
+    initkwargs = {**callback.initkwargs, 'authentication_classes': classes}
+    actions = getattr(callback, 'actions', None)
+    view = cls.as_view(actions, **initkwargs) if actions else cls.as_view(**initkwargs)
+    return URLPattern(pattern.pattern, view, pattern.default_args, pattern.name)
+
+
+def apply_auth_profile(name, urlpatterns):
+    """Apply the profile ``name`` to every DRF view in ``urlpatterns``, recursing into includes."""
+    classes = auth_profile(name)
+    patterns = []
+    for pattern in urlpatterns:
+        if isinstance(pattern, URLResolver):
+            # A new resolver, so the included module's own list stays untouched
+            pattern = URLResolver(
+                pattern.pattern,
+                apply_auth_profile(name, pattern.url_patterns),
+                pattern.default_kwargs,
+                pattern.app_name,
+                pattern.namespace,
+            )
+        elif isinstance(pattern, URLPattern):
+            pattern = _with_profile(pattern, classes)
+        patterns.append(pattern)
+    return patterns
@@ -24,4 +24,61 @@ app.conf.beat_schedule = {
         'task': 'gallery.tasks.update_gallery_stats',
         'schedule': 86400.0,  # 24 hours in seconds
     },
+    'rebuild-ticket-availability-hourly': {
+        'task': 'gallery.tasks.rebuild_ticket_availability',
+        'schedule': 3600.0,  # 1 hour in seconds
+    },
+    'refresh-ticket-sale-windows-every-minute': {
+        'task': 'gallery.tasks.refresh_ticket_sale_windows',
+        'schedule': 60.0,
+    },
+    'drain-email-outbox-every-minute': {
+        'task': 'notifications.tasks.drain_email_outbox',
+        'schedule': 60.0,
+    },
+    'resume-stalled-fanouts-every-5-minutes': {
+        'task': 'notifications.tasks.resume_stalled_fanouts',
+        'schedule': 300.0,
+    },
+    'compact-photographer-stats-hourly': {
+        'task': 'photographer_dashboard.tasks.compact_photographer_stats',
+        'schedule': 3600.0,
+    },
+    'compact-photographer-stats-nightly': {
+        'task': 'photographer_dashboard.tasks.compact_photographer_stats',
+        'schedule': 86400.0,
+        'kwargs': {'days': 61},
+    },
+    'flush-user-activity-every-10-seconds': {
+        'task': 'customer_dashboard.tasks.flush_user_activity',
+        'schedule': 10.0,
+    },
+    'compact-user-activity-stats-hourly': {
+        'task': 'customer_dashboard.tasks.compact_user_activity_stats',
+        'schedule': 3600.0,
+    },
+    'maintain-user-activity-partitions-daily': {
+        'task': 'customer_dashboard.tasks.maintain_user_activity_partitions',
+        'schedule': 86400.0,
+    },
+    'purge-gallery-exports-daily': {
+        'task': 'gallery.tasks.purge_gallery_exports',
+        'schedule': 86400.0,
+    },
+    'replicate-pending-media-every-5-minutes': {
+        'task': 'gallery.tasks.replicate_pending_media',
+        'schedule': 300.0,
+    },
+    'evict-media-cache-every-5-minutes': {
+        'task': 'gallery.tasks.evict_media_cache',
+        'schedule': 300.0,
+    },
+    'reconcile-paystack-payments-every-10-seconds': {
+        'task': 'payments.tasks.reconcile_paystack_payments',
+        'schedule': 10.0,
+    },
+    'enqueue-pending-paystack-transactions-every-5-minutes': {
+        'task': 'payments.tasks.enqueue_pending_paystack_transactions',
+        'schedule': 300.0,
+    },
 }
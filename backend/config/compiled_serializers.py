@@ -0,0 +1,112 @@
+"""
+Read-only serializers compiled to a field plan.
+
+``ModelSerializer`` builds its fields per instance, instantiates a model
+per row and walks every field's ``to_representation``. For large, flat,
+read-only payloads (photo grids, gallery listings), a ``CompiledSerializer``
+instead declares its output once::
+
+    class GridPhotoSerializer(CompiledSerializer):
+        model = Photo
+        fields = ('id', 'title', 'image', 'gallery_title')
+        sources = {'gallery_title': 'gallery__title'}
+        transforms = {'image': media_url}
+
+The first use builds a plan: the columns to fetch with ``values_list``
+and, for each output key, the position of its column and an optional
+transform. Rows are then serialized straight from the tuples without
+creating model instances. Values that the renderer encodes natively
+(datetimes, UUIDs, decimals) are passed through unchanged.
+
+``computed`` fields are callables of ``(row, context)`` evaluated after
+the column fields. ``row`` is the dict built so far, which lets them use
+per-request lookups prepared in the context, such as the set of photos
+the user has liked.
+"""
+
+
+class CompiledSerializer:
+    model = None
+    # Output keys, in order
+    fields = ()
+    # Output key -> ORM lookup, when they differ
+    sources = {}
+    # Output key -> callable(value, context)
+    transforms = {}
+    # Output key -> callable(row, context), evaluated after the column fields
+    computed = {}
+    # Annotations added by serialize_queryset, usable as sources
+    annotations = {}
+
+    _plan = None
+
+    @classmethod
+    def plan(cls):
+        """``(columns, steps)`` for this class, built once."""
+        # Stored per class so subclasses don't reuse their parent's plan
+        if cls.__dict__.get('_plan') is None:
+            columns = []
+            steps = []
+            for key in cls.fields:
+                if key in cls.computed:
+                    continue
+                source = cls.sources.get(key, key)
+                if source not in columns:
+                    columns.append(source)
+                steps.append((key, columns.index(source), cls.transforms.get(key)))
+            computed = [(key, cls.computed[key]) for key in cls.fields if key in cls.computed]
+            cls._plan = (tuple(columns), tuple(steps), tuple(computed))
+        return cls._plan
+
+    @classmethod
+    def columns(cls):
+        return cls.plan()[0]
+
+    @classmethod
+    def serialize_row(cls, values, context=None):
+        _, steps, computed = cls.plan()
+        row = {}
+        for key, index, transform in steps:
+            value = values[index]
+            row[key] = transform(value, context) if transform is not None else value
+        for key, function in computed:
+            row[key] = function(row, context)
+        return row
+
+    @classmethod
+    def serialize_rows(cls, rows, context=None):
+        """Serialize tuples laid out as ``columns()``."""
+        _, steps, computed = cls.plan()
+        data = []
+        append = data.append
+        for values in rows:
+            row = {}
+            for key, index, transform in steps:
+                value = values[index]
+                row[key] = transform(value, context) if transform is not None else value
+            for key, function in computed:
+                row[key] = function(row, context)
+            append(row)
+        return data
+
+    @classmethod
+    def values(cls, queryset):
+        """``queryset`` as tuples of the planned columns, annotated as needed."""
+        if cls.annotations:
+            queryset = queryset.annotate(**cls.annotations)
+        return queryset.values_list(*cls.columns())
+
+    @classmethod
+    def serialize_queryset(cls, queryset, context=None):
+        """Fetch only the planned columns of ``queryset`` and serialize them."""
+        return cls.serialize_rows(cls.values(queryset), context)
+
+    @classmethod
+    async def afetch(cls, queryset):
+        """The rows of ``values(queryset)``, read with ``aiterator()``."""
+        return [values async for values in cls.values(queryset).aiterator()]
+
+    @classmethod
+    async def aserialize_queryset(cls, queryset, context=None):
+        """``serialize_queryset`` for async code."""
+        return cls.serialize_rows(await cls.afetch(queryset), context)
@@ -0,0 +1,144 @@
+"""
+Read-replica routing for the public and dashboard read endpoints.
+
+Reads go to the primary unless the request is being served by a view
+wrapped with ``use_replica``. A URL module opts all of its views in::
+
+    urlpatterns = apply_replica_reads(urlpatterns)
+
+and single views are wrapped where they are routed::
+
+    path('public/events/', use_replica(PublicEventListView.as_view())),
+
+Only GET, HEAD and OPTIONS requests read from the replica, and only when
+a ``replica`` alias is configured in ``DATABASES``. Writes always go to
+the primary.
+
+So that users read their own writes despite replication lag,
+``PrimaryPinningMiddleware`` (config.middleware) tracks each request. A
+write during a request sends the rest of that request's reads to the
+primary. The response also sets a cookie that keeps the browser session
+on the primary for ``DB_PRIMARY_PIN_SECONDS``.
+
+Celery tasks and management commands run outside any request and always
+use the primary.
+"""
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.urls import URLPattern, URLResolver
+
+REPLICA = 'replica'
+PIN_COOKIE = 'db_primary_pin'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class RequestState:
+    """Routing state of the request being served."""
+
+    def __init__(self, pinned=False):
+        # Read from the primary: the session recently wrote, or this request did
+        self.pinned = pinned
+        self.replica_reads = False
+        self.wrote = False
+
+
+_state = ContextVar('db_request_state', default=None)
+
+
+def begin_request(pinned=False):
+    """Start tracking a request; returns the token for ``end_request``."""
+    return _state.set(RequestState(pinned))
+
+
+def end_request(token):
+    """Stop tracking the request; returns whether it wrote to the database."""
+    state = _state.get()
+    _state.reset(token)
+    return state is not None and state.wrote
+
+
+def replica_configured():
+    return REPLICA in connections.settings
+
+
+@contextmanager
+def replica_reads(request):
+    """Let the reads of ``request`` go to the replica, if it's a safe request."""
+    state = _state.get()
+    if state is None or request.method not in SAFE_METHODS:
+        yield
+        return
+    previous = state.replica_reads
+    state.replica_reads = True
+    try:
+        yield
+    finally:
+        state.replica_reads = previous
+
+
+def use_replica(view):
+    """Wrap a view function so its safe requests read from the replica."""
+    if iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            with replica_reads(request):
+                return await view(request, *args, **kwargs)
+    else:
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            with replica_reads(request):
+                return view(request, *args, **kwargs)
+    return wrapper
+
+
+def apply_replica_reads(urlpatterns):
+    """
+    Wrap every view in ``urlpatterns`` with ``use_replica``, recursing into
+    includes. Apply it after ``apply_auth_profile``, which rebuilds views.
+    """
+    patterns = []
+    for pattern in urlpatterns:
+        if isinstance(pattern, URLResolver):
+            # A new resolver, so the included module's own list stays untouched
+            pattern = URLResolver(
+                pattern.pattern,
+                apply_replica_reads(pattern.url_patterns),
+                pattern.default_kwargs,
+                pattern.app_name,
+                pattern.namespace,
+            )
+        elif isinstance(pattern, URLPattern):
+            pattern = URLPattern(pattern.pattern, use_replica(pattern.callback), pattern.default_args, pattern.name)
+        patterns.append(pattern)
+    return patterns
+
+
+class ReplicaRouter:
+    """Sends replica-eligible reads to ``replica``; everything else to the primary."""
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or not state.replica_reads or state.pinned or not replica_configured():
+            return None
+        return REPLICA
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+            state.pinned = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary
+        aliases = {DEFAULT_DB_ALIAS, REPLICA}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
@@ -0,0 +1,312 @@
+"""
+Delivery of protected media files after Django has authorized the request.
+
+Views call ``serve_file`` and the configured backend decides how the bytes
+reach the client:
+
+* ``stream``: ``FileResponse`` over the storage file. Under gunicorn the
+  WSGI ``file_wrapper`` hands local files to ``os.sendfile``.
+* ``x-accel``: an empty response with ``X-Accel-Redirect`` so nginx serves
+  the file from an ``internal`` location mapped to ``MEDIA_ROOT``.
+* ``x-sendfile``: the same hand-off for Apache/lighttpd via ``X-Sendfile``.
+* ``presigned``: a redirect to a short-lived presigned S3 URL.
+
+The worker is released as soon as the headers are written, so download
+throughput no longer depends on the number of gunicorn workers.
+
+Given a strong ``etag``, ``serve_file`` answers ``If-None-Match`` with 304
+and the ``stream`` backend honours single ``Range`` requests (guarded by
+``If-Range``), so resumed downloads only transfer the missing bytes. nginx,
+the X-Sendfile modules and S3 handle ranges themselves.
+
+Example nginx location for ``x-accel``::
+
+    location /protected-media/ {
+        internal;
+        alias /app/media/;
+    }
+"""
+import mimetypes
+import os
+from collections import namedtuple
+from datetime import timedelta
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import (
+    FileResponse,
+    HttpResponse,
+    HttpResponseNotModified,
+    HttpResponseRedirect,
+    StreamingHttpResponse,
+)
+from django.utils import timezone
+from django.utils.cache import parse_etags
+
+CHUNK_SIZE = 64 * 1024
+STARTED_KEY = 'file_delivery:started:{}'
+
+# Stand-in for a FieldFile when serving a storage path that no model field points at
+StoredFile = namedtuple('StoredFile', ['name', 'storage'])
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def _content_disposition(filename, as_attachment):
+    disposition = 'attachment' if as_attachment else 'inline'
+    try:
+        filename.encode('ascii')
+        return f'{disposition}; filename="{filename}"'
+    except UnicodeEncodeError:
+        return f"{disposition}; filename*=utf-8''{quote(filename)}"
+
+
+def not_modified(request, etag):
+    """Whether ``If-None-Match`` matches ``etag`` (weak comparison, RFC 9110)."""
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not etag or not header:
+        return False
+    etags = parse_etags(header)
+    if '*' in etags:
+        return True
+    strip = lambda value: value[2:] if value.startswith('W/') else value
+    return strip(etag) in {strip(value) for value in etags}
+
+
+def is_resumed(request, started_at=None):
+    """
+    Whether the request continues a download that started at ``started_at``:
+    it asks for a range that doesn't start at the first byte, within
+    ``DOWNLOAD_RESUME_WINDOW_SECONDS`` of the start. Views use it to avoid
+    recording the same download once per resumed chunk. A range request
+    with no download started is a new download, so ``bytes=1-`` can't be
+    used to fetch a file without it being recorded.
+    """
+    if started_at is None:
+        return False
+    window = getattr(settings, 'DOWNLOAD_RESUME_WINDOW_SECONDS', 600)
+    if started_at + timedelta(seconds=window) < timezone.now():
+        return False
+    header = request.META.get('HTTP_RANGE', '')
+    return header.startswith('bytes=') and not header[len('bytes='):].strip().startswith('0-')
+
+
+def download_started_at(key):
+    """When the download identified by ``key`` was last recorded, if within the resume window."""
+    return cache.get(STARTED_KEY.format(key))
+
+
+def start_download(key):
+    """Note that the download identified by ``key`` was recorded, for ``is_resumed``."""
+    cache.set(STARTED_KEY.format(key), timezone.now(), getattr(settings, 'DOWNLOAD_RESUME_WINDOW_SECONDS', 600))
+
+
+def requested_range(request, size, etag=None):
+    """
+    Return the ``(start, end)`` byte range requested, inclusive, or None for
+    the whole file.
+
+    Only single ranges are honoured; multi-range requests get the full
+    file, which RFC 9110 allows. A stale ``If-Range`` also yields the full
+    file. Raises ``RangeNotSatisfiable`` for ranges outside the file.
+    """
+    header = request.META.get('HTTP_RANGE', '')
+    if not header.startswith('bytes=') or ',' in header or size is None:
+        return None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    # If-Range needs a strong validator match; dates are not tracked
+    if if_range and (not etag or if_range.strip() != etag):
+        return None
+
+    start, _, end = header[len('bytes='):].strip().partition('-')
+    try:
+        if start == '':
+            # Suffix range: the last N bytes
+            length = int(end)
+            if length <= 0:
+                raise RangeNotSatisfiable()
+            return max(size - length, 0), size - 1
+        start = int(start)
+        end = int(end) if end else size - 1
+    except ValueError:
+        return None
+    if start >= size or start > end:
+        raise RangeNotSatisfiable()
+    return start, min(end, size - 1)
+
+
+def _read_range(fileobj, start, length):
+    try:
+        fileobj.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = fileobj.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        fileobj.close()
+
+
+def file_response(request, fileobj, size, etag=None):
+    """
+    Respond with ``fileobj`` in full (200), one byte range of it (206) or
+    416 when the requested range lies outside the file.
+    """
+    try:
+        byte_range = requested_range(request, size, etag)
+    except RangeNotSatisfiable:
+        fileobj.close()
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    if byte_range is None:
+        response = FileResponse(fileobj)
+        if size is not None:
+            response['Content-Length'] = size
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(_read_range(fileobj, start, end - start + 1), status=206)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = end - start + 1
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+class FileDelivery:
+    """Base delivery backend; subclasses implement ``deliver``."""
+
+    def serve(self, request, field_file, filename=None, content_type=None, as_attachment=True, etag=None):
+        """
+        Return a response delivering ``field_file``.
+
+        Raises ``FileNotFoundError`` when the file is missing from storage.
+        """
+        name = field_file.name
+        if not name:
+            raise FileNotFoundError('No file associated with this field')
+        if not_modified(request, etag):
+            response = HttpResponseNotModified()
+            response['ETag'] = etag
+            return response
+        filename = filename or os.path.basename(name)
+        content_type = content_type or mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        response = self.deliver(request, field_file.storage, name, content_type, etag)
+        if not isinstance(response, HttpResponseRedirect):
+            response['Content-Type'] = content_type
+            response['Content-Disposition'] = _content_disposition(filename, as_attachment)
+            response['X-Content-Type-Options'] = 'nosniff'
+            response['Accept-Ranges'] = 'bytes'
+            if etag:
+                response['ETag'] = etag
+        return response
+
+    def deliver(self, request, storage, name, content_type, etag=None):
+        raise NotImplementedError
+
+
+class StreamingDelivery(FileDelivery):
+    """
+    Stream through the worker; sendfile-backed for local files under gunicorn
+    when the whole file is sent.
+    """
+
+    def deliver(self, request, storage, name, content_type, etag=None):
+        if not storage.exists(name):
+            raise FileNotFoundError(name)
+        return file_response(request, storage.open(name, 'rb'), storage.size(name), etag)
+
+
+class _LocalHandOffDelivery(FileDelivery):
+    """Shared checks for the web-server hand-off backends."""
+
+    def local_path(self, storage, name):
+        try:
+            path = storage.path(name)
+        except NotImplementedError:
+            return None
+        if not os.path.exists(path):
+            raise FileNotFoundError(name)
+        return path
+
+    def deliver(self, request, storage, name, content_type, etag=None):
+        path = self.local_path(storage, name)
+        if path is None:
+            # Remote storage: the web server can't see the file
+            return StreamingDelivery().deliver(request, storage, name, content_type, etag)
+        response = HttpResponse()
+        self.hand_off(response, name, path)
+        return response
+
+    def hand_off(self, response, name, path):
+        raise NotImplementedError
+
+
+class XAccelRedirectDelivery(_LocalHandOffDelivery):
+    """Hand the transfer to nginx via an internal location."""
+
+    def hand_off(self, response, name, path):
+        prefix = getattr(settings, 'PROTECTED_MEDIA_INTERNAL_URL', '/protected-media/')
+        response['X-Accel-Redirect'] = quote(f"{prefix.rstrip('/')}/{name.lstrip('/')}")
+        # Let nginx decide on buffering and caching of the file itself
+        response['X-Accel-Buffering'] = 'no'
+
+
+class XSendfileDelivery(_LocalHandOffDelivery):
+    """Hand the transfer to Apache/lighttpd via ``X-Sendfile``."""
+
+    def hand_off(self, response, name, path):
+        response['X-Sendfile'] = path
+
+
+class PresignedUrlDelivery(FileDelivery):
+    """Redirect to a short-lived presigned URL on S3-compatible storage."""
+
+    def serve(self, request, field_file, filename=None, content_type=None, as_attachment=True, etag=None):
+        storage = field_file.storage
+        if not hasattr(storage, 'bucket_name'):
+            return StreamingDelivery().serve(request, field_file, filename, content_type, as_attachment, etag)
+        name = field_file.name
+        if not name:
+            raise FileNotFoundError('No file associated with this field')
+        if not_modified(request, etag):
+            response = HttpResponseNotModified()
+            response['ETag'] = etag
+            return response
+        filename = filename or os.path.basename(name)
+        parameters = {
+            'ResponseContentDisposition': _content_disposition(filename, as_attachment),
+            'ResponseContentType': content_type or mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+        }
+        url = storage.url(
+            name,
+            parameters=parameters,
+            expire=getattr(settings, 'PROTECTED_MEDIA_URL_EXPIRY', 300),
+        )
+        return HttpResponseRedirect(url)
+
+
+BACKENDS = {
+    'stream': StreamingDelivery,
+    'x-accel': XAccelRedirectDelivery,
+    'x-sendfile': XSendfileDelivery,
+    'presigned': PresignedUrlDelivery,
+}
+
+
+def get_backend(name=None):
+    name = name or getattr(settings, 'PROTECTED_MEDIA_DELIVERY', 'stream')
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown protected media delivery backend {name}")
+
+
+def serve_file(request, field_file, filename=None, content_type=None, as_attachment=True, etag=None):
+    """Deliver ``field_file`` with the configured backend."""
+    return get_backend().serve(request, field_file, filename, content_type, as_attachment, etag)
@@ -1,22 +1,105 @@
 import os
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
 from django.utils.cache import add_never_cache_headers, patch_cache_control
 from django.conf import settings
 from django.utils.deprecation import MiddlewareMixin
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from config import db_router
 
 class DisableCSRF(MiddlewareMixin):
     def process_request(self, request):
         setattr(request, '_dont_enforce_csrf_checks', True)
 
-class MediaCacheControlMiddleware:
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
     """
-    Middleware to add cache control headers to media files.
+    WhiteNoise that also runs as async middleware.
+
+    A sync-only middleware makes Django run every request below it in a
+    thread, which would take the async views (gallery.views.async_views)
+    off the event loop under ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
+
+
+class PrimaryPinningMiddleware:
+    """
+    Tracks each request for config.db_router. A session that wrote within
+    DB_PRIMARY_PIN_SECONDS reads from the primary, so users see their own
+    writes while the replica catches up.
     """
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
-        response = self.get_response(request)
-        
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = db_router.begin_request(self.is_pinned(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = db_router.end_request(token)
+        return self.pin(response, wrote)
+
+    async def __acall__(self, request):
+        token = db_router.begin_request(self.is_pinned(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            wrote = db_router.end_request(token)
+        return self.pin(response, wrote)
+
+    def is_pinned(self, request):
+        try:
+            return float(request.COOKIES.get(db_router.PIN_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
+
+    def pin(self, response, wrote):
+        if wrote:
+            seconds = settings.DB_PRIMARY_PIN_SECONDS
+            response.set_cookie(
+                db_router.PIN_COOKIE,
+                str(int(time.time() + seconds)),
+                max_age=seconds,
+                secure=settings.SESSION_COOKIE_SECURE,
+                httponly=True,
+                samesite=settings.SESSION_COOKIE_SAMESITE,
+            )
+        return response
+
+
+class MediaCacheControlMiddleware(MiddlewareMixin):
+    """
+    Middleware to add cache control headers to media files.
+    """
+    def process_response(self, request, response):
         # Only process successful responses
         if response.status_code != 200:
             return response
@@ -30,12 +113,8 @@ class MediaCacheControlMiddleware:
                 max_age=settings.CACHE_CONTROL_MAX_AGE,
                 s_maxage=settings.CACHE_CONTROL_MAX_AGE
             )
-            
-            # Add ETag header for conditional requests
-            if hasattr(response, 'file_to_stream'):
-                import hashlib
-                import time
-                etag = hashlib.md5(f"{response.file_to_stream.name}{os.path.getmtime(response.file_to_stream.name)}".encode()).hexdigest()
-                response['ETag'] = f'"{etag}"'
+            # No ETag is computed here: protected downloads carry strong ETags
+            # from Photo.content_hash (config.file_delivery) and public media
+            # served by the static view already has Last-Modified
         
         return response
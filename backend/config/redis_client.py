@@ -0,0 +1,31 @@
+"""
+Shared Redis connection for features that need Redis data structures
+(sets, lists, pub/sub) beyond what the Django cache API exposes.
+"""
+import asyncio
+import weakref
+
+import redis
+import redis.asyncio
+from django.conf import settings
+
+_client = None
+# redis.asyncio connections belong to the event loop that opened them
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_redis():
+    """Return a process-wide Redis client backed by a connection pool."""
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(settings.REDIS_URL)
+    return _client
+
+
+def get_async_redis():
+    """Return the ``redis.asyncio`` client of the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_clients[loop] = redis.asyncio.Redis.from_url(settings.REDIS_URL)
+    return client
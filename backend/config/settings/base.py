@@ -55,6 +55,8 @@ INSTALLED_APPS = [
     "tickets",
     "contact",
     "customer_dashboard",
+    "notifications",
+    "photographer_dashboard",
 ]
 
 SITE_ID = 1
@@ -68,6 +70,9 @@ CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
 CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
 
+# Redis used directly for sets, lists and pub/sub (see config.redis_client)
+REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/1')
+
 # Cache configuration
 CACHES = {
     'default': {
@@ -76,9 +81,17 @@ CACHES = {
     }
 }
 
+# Lifetime of the ticket availability snapshots (refreshed on inventory changes and hourly)
+TICKET_AVAILABILITY_SNAPSHOT_TTL = int(os.getenv('TICKET_AVAILABILITY_SNAPSHOT_TTL', 6 * 3600))
+
+# Offline scanner manifests: HMAC key shared with door scanners (derived from SECRET_KEY when unset)
+TICKET_MANIFEST_SIGNING_KEY = os.getenv('TICKET_MANIFEST_SIGNING_KEY')
+TICKET_MANIFEST_BLOOM_ERROR_RATE = float(os.getenv('TICKET_MANIFEST_BLOOM_ERROR_RATE', 0.001))
+
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",
+    "config.middleware.AsyncWhiteNoiseMiddleware",
+    "config.middleware.PrimaryPinningMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -111,6 +124,10 @@ TEMPLATES = [
 WSGI_APPLICATION = "config.wsgi.application"
 ASGI_APPLICATION = "config.asgi.application"
 
+# Seconds a connection is kept open for reuse by later requests; it is pinged before reuse.
+# Use 0 under ASGI, where every request runs in a new thread with its own connections.
+DB_CONN_MAX_AGE = int(os.getenv("DB_CONN_MAX_AGE", 60))
+
 # Database (MySQL, env-driven)
 DATABASES = {
     "default": {
@@ -120,6 +137,8 @@ DATABASES = {
         "PASSWORD": os.getenv("DB_PASSWORD", ""),
         "HOST": os.getenv("DB_HOST", "127.0.0.1"),
         "PORT": os.getenv("DB_PORT", "3306"),
+        "CONN_MAX_AGE": DB_CONN_MAX_AGE,
+        "CONN_HEALTH_CHECKS": True,
         "OPTIONS": {
             "charset": "utf8mb4",
             "sql_mode": "STRICT_TRANS_TABLES",
@@ -127,6 +146,31 @@ DATABASES = {
     }
 }
 
+# Read replica for the public and dashboard read endpoints (config.db_router); off when unset.
+# "sqlite" uses a local SQLite file instead; ReplicaRoutingTests (customer_dashboard/tests.py)
+# need it and are skipped without a replica.
+DB_REPLICA_HOST = os.getenv("DB_REPLICA_HOST")
+if DB_REPLICA_HOST == "sqlite":
+    DATABASES["replica"] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / "replica.sqlite3",
+    }
+elif DB_REPLICA_HOST:
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "HOST": DB_REPLICA_HOST,
+        "PORT": os.getenv("DB_REPLICA_PORT", DATABASES["default"]["PORT"]),
+        "USER": os.getenv("DB_REPLICA_USER", DATABASES["default"]["USER"]),
+        "PASSWORD": os.getenv("DB_REPLICA_PASSWORD", DATABASES["default"]["PASSWORD"]),
+        # Tests read the primary's test database through this alias
+        "TEST": {"MIRROR": "default"},
+    }
+
+DATABASE_ROUTERS = ["config.db_router.ReplicaRouter"]
+
+# Seconds a session reads from the primary after it writes (read-your-writes despite replica lag)
+DB_PRIMARY_PIN_SECONDS = int(os.getenv("DB_PRIMARY_PIN_SECONDS", 15))
+
 AUTH_USER_MODEL = "accounts.CustomUser"
 
 AUTHENTICATION_BACKENDS = [
@@ -136,6 +180,15 @@ AUTHENTICATION_BACKENDS = [
 
 SOCIALACCOUNT_ADAPTER = "accounts.adapters.CustomSocialAccountAdapter"
 
+# Google sign-in: ID tokens are verified locally against the cached JWKS (accounts.google_auth)
+GOOGLE_OAUTH2_CLIENT_ID = os.getenv("GOOGLE_OAUTH2_CLIENT_ID")
+# Endpoints are overridable so tests can run against a local stub server
+GOOGLE_JWKS_URL = os.getenv("GOOGLE_JWKS_URL", "https://www.googleapis.com/oauth2/v3/certs")
+GOOGLE_TOKENINFO_URL = os.getenv("GOOGLE_TOKENINFO_URL", "https://oauth2.googleapis.com/tokeninfo")
+GOOGLE_USERINFO_URL = os.getenv("GOOGLE_USERINFO_URL", "https://www.googleapis.com/oauth2/v3/userinfo")
+# Timeout in seconds for calls to Google
+GOOGLE_HTTP_TIMEOUT = float(os.getenv("GOOGLE_HTTP_TIMEOUT", 5))
+
 ACCOUNT_AUTHENTICATION_METHOD = "email"
 ACCOUNT_EMAIL_REQUIRED = True
 ACCOUNT_UNIQUE_EMAIL = True
@@ -153,6 +206,7 @@ REST_AUTH = {
     "USER_DETAILS_SERIALIZER": "accounts.serializers.UserSerializer",
     "REGISTER_SERIALIZER": "accounts.serializers_custom.CustomRegisterSerializer",
     "LOGIN_SERIALIZER": "accounts.serializers.CustomLoginSerializer",
+    "JWT_TOKEN_CLAIMS_SERIALIZER": "accounts.serializers.CustomTokenObtainPairSerializer",
 }
 
 # Email
@@ -164,6 +218,26 @@ EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER", "")
 EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD", "")
 DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL", "noreply@eventpng.ledgerctrl.com")
 
+# Email outbox (notifications app): batches drained by Celery over one SMTP connection
+EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", 100))
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", 5))
+EMAIL_OUTBOX_RETRY_BASE_SECONDS = int(os.getenv("EMAIL_OUTBOX_RETRY_BASE_SECONDS", 60))
+
+# Notification fan-out: recipients per chunk task and pages dispatched per coordinator run
+NOTIFICATION_FANOUT_CHUNK_SIZE = int(os.getenv("NOTIFICATION_FANOUT_CHUNK_SIZE", 500))
+NOTIFICATION_FANOUT_PAGES_PER_RUN = int(os.getenv("NOTIFICATION_FANOUT_PAGES_PER_RUN", 20))
+
+# User activity pipeline: 'redis' buffers events in a stream written in batches by Celery, 'sync' writes inline
+USER_ACTIVITY_PIPELINE = os.getenv("USER_ACTIVITY_PIPELINE", "redis")
+USER_ACTIVITY_BATCH_SIZE = int(os.getenv("USER_ACTIVITY_BATCH_SIZE", 500))
+USER_ACTIVITY_STREAM_MAXLEN = int(os.getenv("USER_ACTIVITY_STREAM_MAXLEN", 1000000))
+USER_ACTIVITY_CLAIM_IDLE_SECONDS = int(os.getenv("USER_ACTIVITY_CLAIM_IDLE_SECONDS", 300))
+# Entries that keep failing are moved to a dead-letter stream after this many deliveries
+USER_ACTIVITY_MAX_DELIVERIES = int(os.getenv("USER_ACTIVITY_MAX_DELIVERIES", 5))
+# Raw activity is kept in monthly partitions; older ones are dropped (daily rollups are kept)
+USER_ACTIVITY_RETENTION_MONTHS = int(os.getenv("USER_ACTIVITY_RETENTION_MONTHS", 12))
+USER_ACTIVITY_PARTITIONS_AHEAD = int(os.getenv("USER_ACTIVITY_PARTITIONS_AHEAD", 3))
+
 # CORS and Security Settings
 CORS_ALLOW_CREDENTIALS = True
 CORS_ALLOWED_ORIGINS = os.getenv(
@@ -217,9 +291,41 @@ STATICFILES_DIRS = [BASE_DIR / "static"] if (BASE_DIR / "static").exists() else
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Media storage backend: 'local', 's3' or 'tiered' (local disk in front of S3, see config.storages)
+MEDIA_STORAGE = os.getenv("MEDIA_STORAGE", "local")
+DEFAULT_FILE_STORAGE = "config.storages.MediaStorage"
+AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID")
+AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY")
+AWS_STORAGE_BUCKET_NAME = os.getenv("AWS_STORAGE_BUCKET_NAME")
+AWS_S3_REGION_NAME = os.getenv("AWS_S3_REGION_NAME")
+# S3-compatible endpoint, e.g. a MinIO or moto server for local testing
+AWS_S3_ENDPOINT_URL = os.getenv("AWS_S3_ENDPOINT_URL")
+# Size the 'tiered' backend keeps local copies under before evicting the least recently used
+MEDIA_LOCAL_CACHE_BYTES = int(os.getenv("MEDIA_LOCAL_CACHE_BYTES", 50 * 1024 ** 3))
+# Rebuildable renditions kept on local disk only and never replicated to S3
+MEDIA_LOCAL_ONLY_PREFIXES = tuple(
+    prefix for prefix in os.getenv("MEDIA_LOCAL_ONLY_PREFIXES", "exports/").split(",") if prefix
+)
+
+# Protected downloads: 'stream', 'x-accel' (nginx), 'x-sendfile' (Apache/lighttpd) or 'presigned' (S3)
+PROTECTED_MEDIA_DELIVERY = os.getenv("PROTECTED_MEDIA_DELIVERY", "stream")
+# nginx internal location aliased to MEDIA_ROOT, used by the 'x-accel' backend
+PROTECTED_MEDIA_INTERNAL_URL = os.getenv("PROTECTED_MEDIA_INTERNAL_URL", "/protected-media/")
+# Lifetime of presigned URLs handed out by the 'presigned' backend
+PROTECTED_MEDIA_URL_EXPIRY = int(os.getenv("PROTECTED_MEDIA_URL_EXPIRY", 300))
+# Range requests past the first byte count as resuming a download for this long after it started
+DOWNLOAD_RESUME_WINDOW_SECONDS = int(os.getenv("DOWNLOAD_RESUME_WINDOW_SECONDS", 600))
+# Pre-built gallery ZIP exports are kept as long as a download token (7 days)
+GALLERY_EXPORT_TTL = int(os.getenv("GALLERY_EXPORT_TTL", 7 * 24 * 3600))
+# Lifetime of the signed per-order download tokens
+ORDER_DOWNLOAD_TOKEN_LIFETIME = int(os.getenv("ORDER_DOWNLOAD_TOKEN_LIFETIME", 7 * 24 * 3600))
+
+# Authentication profiles views pick with config.auth_profiles.auth_profile(); these extend its defaults
+AUTH_PROFILES = {}
+
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "accounts.authentication.ClaimsJWTAuthentication",
         "rest_framework.authentication.SessionAuthentication",
         "rest_framework.authentication.BasicAuthentication",
     ],
@@ -227,9 +333,14 @@ REST_FRAMEWORK = {
         "rest_framework.permissions.AllowAny",
     ],
     "DEFAULT_RENDERER_CLASSES": [
-        "rest_framework.renderers.JSONRenderer",
+        "config.renderers.ORJSONRenderer",
         "rest_framework.renderers.BrowsableAPIRenderer",
     ],
+    "DEFAULT_PARSER_CLASSES": [
+        "config.renderers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 20,
 }
@@ -248,6 +359,39 @@ STRIPE_SECRET_KEY = os.getenv("STRIPE_SECRET_KEY")
 STRIPE_PUBLIC_KEY = os.getenv("STRIPE_PUBLIC_KEY")
 STRIPE_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET")
 
+# Paystack API clients (payments.paystack): pooled keep-alive connections with strict timeouts
+PAYSTACK_SECRET_KEY = os.getenv("PAYSTACK_SECRET_KEY")
+# Overridable so tests can run against a local fake Paystack server
+PAYSTACK_BASE_URL = os.getenv("PAYSTACK_BASE_URL", "https://api.paystack.co")
+# Seconds to establish a connection and to wait for a response
+PAYSTACK_CONNECT_TIMEOUT = float(os.getenv("PAYSTACK_CONNECT_TIMEOUT", 3))
+PAYSTACK_READ_TIMEOUT = float(os.getenv("PAYSTACK_READ_TIMEOUT", 10))
+# Retries of transient failures, with jittered exponential backoff
+PAYSTACK_MAX_RETRIES = int(os.getenv("PAYSTACK_MAX_RETRIES", 2))
+# Keep-alive connections per process
+PAYSTACK_HTTP_POOL_SIZE = int(os.getenv("PAYSTACK_HTTP_POOL_SIZE", 20))
+# Consecutive failures that open the circuit breaker, and seconds before a trial call
+PAYSTACK_BREAKER_THRESHOLD = int(os.getenv("PAYSTACK_BREAKER_THRESHOLD", 5))
+PAYSTACK_BREAKER_RESET_SECONDS = float(os.getenv("PAYSTACK_BREAKER_RESET_SECONDS", 30))
+# Background verification of pending payments (payments.reconciliation): references per run
+PAYSTACK_RECONCILE_BATCH_SIZE = int(os.getenv("PAYSTACK_RECONCILE_BATCH_SIZE", 100))
+# Verify calls in flight at once; keep it within PAYSTACK_HTTP_POOL_SIZE
+PAYSTACK_RECONCILE_CONCURRENCY = int(os.getenv("PAYSTACK_RECONCILE_CONCURRENCY", 10))
+# Seconds a reference is rechecked while Paystack still reports it pending
+PAYSTACK_RECONCILE_MAX_AGE = int(os.getenv("PAYSTACK_RECONCILE_MAX_AGE", 3600))
+# Seconds a settled result stays readable by the verify endpoint
+PAYSTACK_RESULT_TTL = int(os.getenv("PAYSTACK_RESULT_TTL", 86400))
+# Longest ?wait= the verify endpoint honours, in seconds
+PAYSTACK_VERIFY_MAX_WAIT = int(os.getenv("PAYSTACK_VERIFY_MAX_WAIT", 25))
+# Live events (notifications.live): seconds a stream token stays valid
+LIVE_EVENTS_TOKEN_MAX_AGE = int(os.getenv("LIVE_EVENTS_TOKEN_MAX_AGE", 3600))
+# Seconds an SSE stream stays open under ASGI before the client reconnects
+LIVE_EVENTS_STREAM_SECONDS = int(os.getenv("LIVE_EVENTS_STREAM_SECONDS", 300))
+# Longest long-poll wait, and the SSE window under WSGI, in seconds
+LIVE_EVENTS_POLL_SECONDS = int(os.getenv("LIVE_EVENTS_POLL_SECONDS", 25))
+# Seconds a user's recent events are kept for replay after a reconnect
+LIVE_EVENTS_RETENTION_SECONDS = int(os.getenv("LIVE_EVENTS_RETENTION_SECONDS", 3600))
+
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 SIMPLE_JWT = {
@@ -261,6 +405,9 @@ SIMPLE_JWT = {
     "AUTH_HEADER_TYPES": ("Bearer",),
     "USER_ID_FIELD": "id",
     "USER_ID_CLAIM": "user_id",
+    # Tokens carry role claims and a revocable version (accounts.tokens)
+    "TOKEN_OBTAIN_SERIALIZER": "accounts.serializers.CustomTokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "accounts.serializers.ClaimsTokenRefreshSerializer",
 }
 
 CORS_ALLOW_HEADERS = list(default_headers) + [
@@ -1,8 +1,67 @@
+"""
+Media storage backends.
+
+``MEDIA_STORAGE`` picks the backend used as the default storage:
+
+* ``local``: ``LocalMediaStorage`` on ``MEDIA_ROOT``.
+* ``s3``: ``S3MediaStorage``; every operation is a request to the bucket.
+* ``tiered``: ``TieredMediaStorage``, local disk in front of the bucket.
+
+The tiered backend writes to local disk and returns; a Celery task copies
+the file to the bucket afterwards. Local copies are tracked in Redis by
+last access, and ``evict_media_cache`` removes the least recently used
+ones that are safely replicated once the local tier outgrows
+``MEDIA_LOCAL_CACHE_BYTES``. Files whose local copy was evicted are
+fetched back from the bucket on first use.
+
+Objects uploaded by the ``s3`` backend aren't in the replication index.
+Until ``manage.py backfill_media_index`` has listed the bucket into it,
+a name missing from the index is checked against the bucket, so those
+originals are found and never overwritten by new uploads.
+
+Files under ``MEDIA_LOCAL_ONLY_PREFIXES`` are renditions that can be
+rebuilt (pre-built exports, for instance). They are never replicated and
+are deleted outright when evicted.
+
+``AWS_S3_ENDPOINT_URL`` points the bucket at an S3-compatible server
+such as MinIO or moto's server mode; ``manage.py test_storage --tiered``
+exercises the whole cycle against it.
+"""
+import logging
+import os
+import shutil
+import tempfile
+import time
+
 from django.conf import settings
-from django.core.files.storage import FileSystemStorage, get_storage_class
+from django.core.files.storage import FileSystemStorage, Storage
+from django.utils.deconstruct import deconstructible
+from redis import RedisError
 from storages.backends.s3boto3 import S3Boto3Storage
-import os
 
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+
+def _available_name(storage, name, exists=None):
+    """
+    Returns a filename that's free on the target storage system, and
+    available for new content to be written to.
+    """
+    exists = exists or storage.exists
+    # If the filename already exists, add an underscore and a number (before the extension)
+    # to avoid overwriting existing files
+    if exists(name):
+        name_parts = os.path.splitext(name)
+        counter = 1
+        while exists(f"{name_parts[0]}_{counter}{name_parts[1]}"):
+            counter += 1
+        name = f"{name_parts[0]}_{counter}{name_parts[1]}"
+    return name
+
+
+@deconstructible
 class LocalMediaStorage(FileSystemStorage):
     """
     Custom file storage for media files on the local filesystem.
@@ -15,43 +74,347 @@ class LocalMediaStorage(FileSystemStorage):
         super().__init__(location, base_url, **kwargs)
 
     def get_available_name(self, name, max_length=None):
+        return _available_name(self, name)
+
+
+@deconstructible
+class S3MediaStorage(S3Boto3Storage):
+    """
+    Custom S3 storage for media files.
+    """
+    location = 'media'
+    file_overwrite = False
+    default_acl = 'public-read'
+
+    def get_available_name(self, name, max_length=None):
+        return _available_name(self, name)
+
+
+class MediaIndex:
+    """
+    Redis bookkeeping for the tiered storage: which names still need
+    replicating, which are in the bucket, and when and how large each local
+    copy is. Failures are logged and never fail the storage operation; the
+    replication sweep and ``evict_media_cache`` catch up afterwards.
+    """
+    PENDING = 'media_tier:pending'
+    REPLICATED = 'media_tier:replicated'
+    # Set once the bucket's existing objects were added to REPLICATED
+    BACKFILLED = 'media_tier:backfilled'
+    ACCESSED = 'media_tier:accessed'
+    SIZES = 'media_tier:sizes'
+    BYTES = 'media_tier:bytes'
+
+    def _call(self, operation, default=None):
+        try:
+            return operation(get_redis())
+        except RedisError as e:
+            logger.error(f"Media tier index unavailable: {str(e)}")
+            return default
+
+    def track(self, name, size):
+        """Record a local copy of ``name`` and mark it as just used."""
+        def operation(redis):
+            if redis.hset(self.SIZES, name, size):
+                redis.incrby(self.BYTES, size)
+            redis.zadd(self.ACCESSED, {name: time.time()})
+        self._call(operation)
+
+    def touch(self, name):
+        self._call(lambda redis: redis.zadd(self.ACCESSED, {name: time.time()}, xx=True))
+
+    def untrack(self, name):
+        """Forget the local copy of ``name``."""
+        def operation(redis):
+            size = redis.hget(self.SIZES, name)
+            if redis.hdel(self.SIZES, name) and size:
+                redis.decrby(self.BYTES, int(size))
+            redis.zrem(self.ACCESSED, name)
+        self._call(operation)
+
+    def local_bytes(self):
+        return int(self._call(lambda redis: redis.get(self.BYTES), 0) or 0)
+
+    def least_recently_used(self, count):
+        return [
+            name.decode() for name in self._call(lambda redis: redis.zrange(self.ACCESSED, 0, count - 1), [])
+        ]
+
+    def add_pending(self, name):
+        self._call(lambda redis: redis.sadd(self.PENDING, name))
+
+    def pending(self, count):
+        return [name.decode() for name in self._call(lambda redis: redis.srandmember(self.PENDING, count), [])]
+
+    def mark_replicated(self, name):
+        def operation(redis):
+            pipe = redis.pipeline()
+            pipe.srem(self.PENDING, name)
+            pipe.sadd(self.REPLICATED, name)
+            pipe.execute()
+        self._call(operation)
+
+    def is_replicated(self, name):
         """
-        Returns a filename that's free on the target storage system, and
-        available for new content to be written to.
+        True or False from the index, None when it can't say: Redis is
+        unavailable, or the bucket was never backfilled into the index (or
+        the index was lost since), so a name missing from it may still be
+        in the bucket.
         """
-        # If the filename already exists, add an underscore and a number (before the extension)
-        # to avoid overwriting existing files
-        if self.exists(name):
-            name_parts = os.path.splitext(name)
-            counter = 1
-            while self.exists(f"{name_parts[0]}_{counter}{name_parts[1]}"):
-                counter += 1
-            name = f"{name_parts[0]}_{counter}{name_parts[1]}"
+        def operation(redis):
+            pipe = redis.pipeline()
+            pipe.sismember(self.REPLICATED, name)
+            pipe.exists(self.REPLICATED, self.BACKFILLED)
+            member, present = pipe.execute()
+            return True if member else (False if present == 2 else None)
+        return self._call(operation)
+
+    def backfill(self, names, batch_size=1000):
+        """Add ``names``, the objects already in the bucket, to the index; returns how many."""
+        redis = get_redis()
+        count, batch = 0, []
+        for name in names:
+            batch.append(name)
+            if len(batch) >= batch_size:
+                count += len(batch)
+                redis.sadd(self.REPLICATED, *batch)
+                batch = []
+        if batch:
+            count += len(batch)
+            redis.sadd(self.REPLICATED, *batch)
+        redis.set(self.BACKFILLED, 1)
+        return count
+
+    def forget(self, name):
+        def operation(redis):
+            pipe = redis.pipeline()
+            pipe.srem(self.PENDING, name)
+            pipe.srem(self.REPLICATED, name)
+            pipe.execute()
+        self._call(operation)
+        self.untrack(name)
+
+
+@deconstructible
+class TieredMediaStorage(Storage):
+    """
+    Local disk in front of S3: local-first writes, background replication,
+    LRU eviction of local copies and on-demand fetches of cold files.
+
+    Without a bucket configured it behaves like ``LocalMediaStorage``.
+    ``local`` and ``remote`` can be passed in to run against other stores.
+    """
+
+    def __init__(self, local=None, remote=None, index=None):
+        self.local = local or LocalMediaStorage()
+        self._remote = remote
+        self.index = index or MediaIndex()
+
+    @property
+    def remote(self):
+        if self._remote is None and getattr(settings, 'AWS_STORAGE_BUCKET_NAME', None):
+            self._remote = S3MediaStorage()
+        return self._remote
+
+    def is_local_only(self, name):
+        return name.startswith(tuple(getattr(settings, 'MEDIA_LOCAL_ONLY_PREFIXES', ())))
+
+    def remote_names(self):
+        """Every object name in the bucket, relative to the storage location."""
+        prefix = f"{self.remote.location.strip('/')}/" if self.remote.location else ''
+        for obj in self.remote.bucket.objects.filter(Prefix=prefix):
+            yield obj.key[len(prefix):]
+
+    def _in_remote(self, name):
+        replicated = self.index.is_replicated(name)
+        if replicated is None:
+            return self.remote.exists(name)
+        return replicated
+
+    # Writes
+
+    def get_available_name(self, name, max_length=None):
+        # Names are checked against the local tier and the replication index;
+        # the bucket is only asked when the index can't answer, so an S3
+        # original is never overwritten
+        def exists(candidate):
+            if self.local.exists(candidate):
+                return True
+            return self.remote is not None and self._in_remote(candidate)
+        return _available_name(self, name, exists)
+
+    def _save(self, name, content):
+        name = self.local._save(name, content)
+        self.index.track(name, self.local.size(name))
+        if self.remote is not None and not self.is_local_only(name):
+            self.index.add_pending(name)
+            self._enqueue_replication(name)
         return name
 
-# Use S3 if configured, otherwise use local storage
-if os.getenv('AWS_STORAGE_BUCKET_NAME'):
-    class MediaStorage(S3Boto3Storage):
+    def _enqueue_replication(self, name):
+        from celery import current_app
+
+        try:
+            current_app.send_task('gallery.tasks.replicate_media_file', args=[name])
+        except Exception as e:
+            # Still listed as pending, so the periodic sweep picks it up
+            logger.error(f"Error queueing replication of {name}: {str(e)}")
+
+    def replicate(self, name):
+        """Copy the local file ``name`` to the bucket. Returns False if it's no longer local."""
+        if not self.local.exists(name):
+            if self.remote.exists(name):
+                self.index.mark_replicated(name)
+            else:
+                self.index.forget(name)
+            return False
+        with self.local.open(name, 'rb') as f:
+            # Upload under the exact name; the bucket must not pick another one
+            self.remote._save(name, f)
+        self.index.mark_replicated(name)
+        return True
+
+    # Reads
+
+    def _ensure_local(self, name):
+        """Make sure ``name`` is on local disk, fetching it from the bucket if it went cold."""
+        if self.local.exists(name):
+            self.index.touch(name)
+            return
+        if self.remote is None or not self.remote.exists(name):
+            raise FileNotFoundError(name)
+        path = self.local.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Download next to the target and rename so readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as tmp, self.remote.open(name, 'rb') as source:
+                shutil.copyfileobj(source, tmp, 1024 * 1024)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.index.track(name, os.path.getsize(path))
+
+    def _open(self, name, mode='rb'):
+        self._ensure_local(name)
+        return self.local._open(name, mode)
+
+    def path(self, name):
+        # Callers of path() (X-Sendfile, X-Accel-Redirect) need the bytes on disk
+        self._ensure_local(name)
+        return self.local.path(name)
+
+    def exists(self, name):
+        if self.local.exists(name):
+            return True
+        return self.remote is not None and self._in_remote(name)
+
+    def size(self, name):
+        if self.local.exists(name):
+            return self.local.size(name)
+        if self.remote is None:
+            raise FileNotFoundError(name)
+        return self.remote.size(name)
+
+    def url(self, name):
+        if self.remote is None or self.local.exists(name) or not self._in_remote(name):
+            return self.local.url(name)
+        return self.remote.url(name)
+
+    def listdir(self, path):
+        directories, files = set(), set()
+        try:
+            local_directories, local_files = self.local.listdir(path)
+            directories.update(local_directories)
+            files.update(local_files)
+        except FileNotFoundError:
+            if self.remote is None:
+                raise
+        if self.remote is not None:
+            remote_directories, remote_files = self.remote.listdir(path)
+            directories.update(remote_directories)
+            files.update(remote_files)
+        return sorted(directories), sorted(files)
+
+    def get_accessed_time(self, name):
+        if self.local.exists(name) or self.remote is None:
+            return self.local.get_accessed_time(name)
+        return self.remote.get_accessed_time(name)
+
+    def get_created_time(self, name):
+        if self.local.exists(name) or self.remote is None:
+            return self.local.get_created_time(name)
+        return self.remote.get_created_time(name)
+
+    def get_modified_time(self, name):
+        if self.local.exists(name) or self.remote is None:
+            return self.local.get_modified_time(name)
+        return self.remote.get_modified_time(name)
+
+    # Removal
+
+    def delete(self, name):
+        self.local.delete(name)
+        if self.remote is not None and not self.is_local_only(name):
+            self.remote.delete(name)
+        self.index.forget(name)
+
+    def evict(self, name):
         """
-        Custom S3 storage for media files.
+        Drop the local copy of ``name`` if the bucket has it (or it's a
+        rebuildable rendition). Returns the bytes freed.
         """
-        location = 'media'
-        file_overwrite = False
-        default_acl = 'public-read'
-        
-        def get_available_name(self, name, max_length=None):
-            """
-            Returns a filename that's free on the target storage system, and
-            available for new content to be written to.
-            """
-            # If the filename already exists, add an underscore and a number (before the extension)
-            # to avoid overwriting existing files
-            if self.exists(name):
-                name_parts = os.path.splitext(name)
-                counter = 1
-                while self.exists(f"{name_parts[0]}_{counter}{name_parts[1]}"):
-                    counter += 1
-                name = f"{name_parts[0]}_{counter}{name_parts[1]}"
-            return name
-else:
-    MediaStorage = LocalMediaStorage
+        if not self.local.exists(name):
+            self.index.untrack(name)
+            return 0
+        if not self.is_local_only(name):
+            # Confirm with the bucket itself before dropping the only fast copy
+            if self.remote is None or not self.remote.exists(name):
+                return 0
+        size = self.local.size(name)
+        self.local.delete(name)
+        if self.is_local_only(name):
+            self.index.forget(name)
+        else:
+            self.index.untrack(name)
+        return size
+
+    def evict_until(self, max_bytes, batch_size=100):
+        """Evict least recently used local copies until the local tier fits ``max_bytes``."""
+        freed = 0
+        skipped = 0
+        while self.index.local_bytes() > max_bytes:
+            candidates = self.index.least_recently_used(skipped + batch_size)[skipped:]
+            if not candidates:
+                break
+            for name in candidates:
+                if self.index.local_bytes() <= max_bytes:
+                    break
+                released = self.evict(name)
+                if released:
+                    freed += released
+                elif self.local.exists(name):
+                    # Not replicated yet; keep it and look further down the list
+                    skipped += 1
+        return freed
+
+
+BACKENDS = {
+    'local': LocalMediaStorage,
+    's3': S3MediaStorage,
+    'tiered': TieredMediaStorage,
+}
+
+
+def get_media_storage_class(name=None):
+    name = name or getattr(settings, 'MEDIA_STORAGE', 'local')
+    try:
+        return BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown media storage backend {name}")
+
+
+# Default storage class (DEFAULT_FILE_STORAGE), chosen by MEDIA_STORAGE
+MediaStorage = get_media_storage_class()
@@ -50,6 +50,7 @@ urlpatterns = [
     path('api/contact/', include('contact.urls')),  # Contact form endpoints
     path('api/tickets/', include(('tickets.urls', 'tickets'), namespace='tickets')),  # Ticket endpoints
     path('api/customer/', include('customer_dashboard.urls')),  # Customer dashboard endpoints
+    path('api/events/', include('notifications.urls')),  # Live payment and upload events
     
     # API Documentation and Authentication
     path('api-auth/', include('rest_framework.urls')),  # For the browsable API
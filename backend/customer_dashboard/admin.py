@@ -3,19 +3,10 @@ from .models import CustomerProfile, Purchase, Favorite, Order, OrderItem
 
 @admin.register(CustomerProfile)
 class CustomerProfileAdmin(admin.ModelAdmin):
-    list_display = ('user', 'get_total_purchases', 'get_total_spent', 'created_at')
+    list_display = ('user', 'total_purchases', 'total_spent', 'total_downloads', 'created_at')
     search_fields = ('user__email', 'user__first_name', 'user__last_name')
     list_filter = ('created_at', 'updated_at')
-    
-    def get_total_purchases(self, obj):
-        return obj.user.customer_purchases.count()
-    get_total_purchases.short_description = 'Total Purchases'
-    
-    def get_total_spent(self, obj):
-        from django.db.models import Sum
-        total = obj.user.customer_purchases.aggregate(total=Sum('amount'))['total']
-        return total if total else 0
-    get_total_spent.short_description = 'Total Spent'
+    readonly_fields = ('total_purchases', 'total_spent', 'total_downloads')
 
 @admin.register(Purchase)
 class PurchaseAdmin(admin.ModelAdmin):
@@ -23,6 +23,8 @@ from .serializers import (
 )
 from gallery.models import Photo, Download as GalleryDownload
 from .utils.activity_logger import log_user_activity
+from .utils.activity_rollups import activity_stats
+from .utils.dashboard_data import get_dashboard_data
 
 User = get_user_model()
 
@@ -52,13 +54,8 @@ class PurchaseViewSet(viewsets.ModelViewSet):
         return Purchase.objects.filter(customer=self.request.user, is_active=True).order_by('-purchase_date')
     
     def perform_create(self, serializer):
+        # Profile totals are incremented by customer_dashboard.signals
         serializer.save(customer=self.request.user)
-        
-        # Update customer's purchase stats
-        profile, _ = CustomerProfile.objects.get_or_create(user=self.request.user)
-        profile.total_purchases = self.get_queryset().count()
-        profile.total_spent = self.get_queryset().aggregate(total=Sum('amount'))['total'] or 0
-        profile.save()
 
 class FavoriteViewSet(viewsets.ModelViewSet):
     """
@@ -219,136 +216,10 @@ class DashboardViewSet(viewsets.ViewSet):
     """
     permission_classes = [permissions.IsAuthenticated]
     
-    @method_decorator(cache_page(60 * 5))  # Cache for 5 minutes
     def list(self, request):
-        user = request.user
-        
-        # Get customer profile
-        profile, _ = CustomerProfile.objects.get_or_create(user=user)
-        
-        # Get purchase stats
-        purchases = Purchase.objects.filter(customer=user, is_active=True)
-        total_spent = purchases.aggregate(total=Sum('amount'))['total'] or 0
-        
-        # Get favorite stats
-        favorites_count = Favorite.objects.filter(user=user).count()
-        
-        # Get order stats
-        orders = Order.objects.filter(customer=user)
-        total_orders = orders.count()
-        
-        # Get download stats - using the correct Download model from gallery app
-        from gallery.models import Download
-        downloads = Download.objects.filter(user=user)
-        total_downloads = downloads.count()
-        
-        # Get recent purchases, favorites, downloads, and orders
-        recent_purchases = PurchaseSerializer(
-            purchases.order_by('-purchase_date')[:3], 
-            many=True,
-            context={'request': request}
-        ).data if purchases.exists() else []
-        
-        recent_favorites = FavoriteSerializer(
-            Favorite.objects.filter(user=user).select_related('photo', 'photo__gallery')
-                .order_by('-created_at')[:3],
-            many=True,
-            context={'request': request}
-        ).data if Favorite.objects.filter(user=user).exists() else []
-        
-        recent_orders = OrderSerializer(
-            orders.order_by('-created_at')[:3],
-            many=True,
-            context={'request': request}
-        ).data if orders.exists() else []
-        
-        # Get recent downloads with photo and gallery info
-        recent_downloads = DownloadSerializer(
-            downloads.select_related('photo', 'photo__gallery')
-                .order_by('-downloaded_at')[:4],
-            many=True,
-            context={'request': request}
-        ).data if downloads.exists() else []
-        
-        # Get recent activities with photo data
-        from django.contrib.contenttypes.models import ContentType
-        
-        # Get content type for Photo model
-        photo_content_type = ContentType.objects.get_for_model(Photo)
-        
-        # Get recent activities with photo data
-        recent_activities = (
-            UserActivity.objects
-            .filter(
-                user=user,
-                content_type=photo_content_type,
-                object_id__isnull=False
-            )
-            .select_related('user', 'content_type')
-            .order_by('-created_at')[:10]
-        )
-        
-        # Get all photo objects efficiently
-        photo_ids = [act.object_id for act in recent_activities if act.object_id]
-        photos = Photo.objects.in_bulk(photo_ids, field_name='id')
-        
-        # Prepare activity data with photo information
-        recent_activities_data = []
-        for act in recent_activities:
-            photo = photos.get(act.object_id) if act.object_id else None
-            
-            # Get photo data if available
-            photo_data = None
-            if photo:
-                photo_data = {
-                    'id': str(photo.id),
-                    'title': photo.title,
-                    'thumbnail_url': photo.thumbnail.url if hasattr(photo, 'thumbnail') and photo.thumbnail else None,
-                }
-            
-            activity_data = {
-                'id': str(act.id),
-                'activity_type': act.activity_type,
-                'activity_type_display': act.get_activity_type_display(),
-                'created_at': act.created_at,
-                'metadata': act.metadata,
-                'photo': photo_data
-            }
-            recent_activities_data.append(activity_data)
-        
-        # Prepare the response data to match frontend expectations
-        return Response({
-            # Profile information
-            'user': {
-                'id': user.id,
-                'name': user.get_full_name() or user.username,
-                'email': user.email,
-                'avatar': None,  # Add if you have avatar field
-            },
-            # Stats data - match frontend's expected format
-            'totalDownloads': total_downloads,
-            'purchasedPhotos': purchases.count(),
-            'favoritesCount': favorites_count,
-            'ordersCount': total_orders,
-            'totalSpent': float(total_spent),
-            
-            # Recent items - using the exact field names from frontend
-            'recent_purchases': recent_purchases,
-            'recent_favorites': recent_favorites,
-            'recent_orders': recent_orders,
-            'recent_downloads': recent_downloads,
-            'recent_activities': recent_activities_data,
-            'downloads_count': total_downloads,  # Frontend might be looking for this
-            
-            # Stats in the format the frontend might be expecting
-            'stats': {
-                'total_downloads': total_downloads,
-                'purchased_photos': purchases.count(),
-                'favorites_count': favorites_count,
-                'total_orders': total_orders,
-                'total_spent': float(total_spent),
-            }
-        })
+        # Counters come from one query and the payload is cached per user;
+        # customer_dashboard.signals drops the cache when its sources change
+        return Response(get_dashboard_data(request.user, request))
 
 
 class UserActivityViewSet(viewsets.ReadOnlyModelViewSet):
@@ -411,26 +282,8 @@ class UserActivityViewSet(viewsets.ReadOnlyModelViewSet):
     @action(detail=False, methods=['get'])
     def stats(self, request):
         """
-        Get activity statistics
+        Get activity statistics from the daily rollups
         """
-        from django.db.models import Count
-        
-        # Get activity counts by type
-        activity_stats = UserActivity.objects.filter(
-            user=request.user
-        ).values('activity_type').annotate(
-            count=Count('id')
-        ).order_by('-count')
-        
-        # Get recent activity dates
-        recent_activity = UserActivity.objects.filter(
-            user=request.user
-        ).values('created_at__date').annotate(
-            count=Count('id')
-        ).order_by('-created_at__date')[:30]  # Last 30 days
-        
-        return Response({
-            'activity_type_stats': list(activity_stats),
-            'recent_activity': list(recent_activity),
-            'total_activities': sum(item['count'] for item in activity_stats)
-        })
\ No newline at end of file
+        stats = activity_stats(request.user)
+        stats['total_activities'] = sum(item['count'] for item in stats['activity_type_stats'])
+        return Response(stats)
\ No newline at end of file
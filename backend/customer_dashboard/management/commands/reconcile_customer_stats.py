@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from customer_dashboard.utils.profile_counters import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Recompute CustomerProfile download and purchase counters from the source tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of profiles written per bulk update (default: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        updated = reconcile(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Reconciled customer profiles: {updated} updated'))
@@ -3,6 +3,7 @@ from django.contrib.auth import get_user_model
 from gallery.models import Photo
 from customer_dashboard.models import UserActivity
 from customer_dashboard.utils.activity_logger import log_user_activity
+from customer_dashboard.utils.activity_pipeline import flush
 
 User = get_user_model()
 
@@ -48,6 +49,9 @@ class Command(BaseCommand):
             }
         )
         
+        # Write the buffered events before reading them back
+        flush()
+        
         # List recent activities
         activities = UserActivity.objects.filter(user=user).order_by('-created_at')
         self.stdout.write(self.style.SUCCESS(f'Successfully logged {activities.count()} activities'))
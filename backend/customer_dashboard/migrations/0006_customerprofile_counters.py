@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_dashboard', '0005_fix_migration_issue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customerprofile',
+            name='total_downloads',
+            field=models.PositiveIntegerField(default=0, help_text='Total number of photos downloaded by the customer'),
+        ),
+        migrations.AddField(
+            model_name='customerprofile',
+            name='total_purchases',
+            field=models.PositiveIntegerField(default=0, help_text='Number of active, non-refunded purchases'),
+        ),
+        migrations.AddField(
+            model_name='customerprofile',
+            name='total_spent',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Sum of active, non-refunded purchase amounts', max_digits=12),
+        ),
+    ]
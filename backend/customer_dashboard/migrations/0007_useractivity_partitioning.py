@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def partition_activity_table(apps, schema_editor):
+    from customer_dashboard.utils.activity_partitions import partition_table
+
+    partition_table(using=schema_editor.connection.alias)
+
+
+def unpartition_activity_table(apps, schema_editor):
+    from customer_dashboard.utils.activity_partitions import unpartition_table
+
+    unpartition_table(using=schema_editor.connection.alias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('customer_dashboard', '0006_customerprofile_counters'),
+    ]
+
+    operations = [
+        # Partitioned InnoDB tables cannot have foreign keys
+        migrations.AlterField(
+            model_name='useractivity',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='activities', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='useractivity',
+            name='content_type',
+            field=models.ForeignKey(blank=True, db_constraint=False, help_text='Content type of the related object', null=True, on_delete=django.db.models.deletion.SET_NULL, to='contenttypes.contenttype'),
+        ),
+        migrations.CreateModel(
+            name='UserActivityDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('activity_type', models.CharField(choices=[('photo_like', 'Photo Like'), ('photo_unlike', 'Photo Unlike'), ('photo_download', 'Photo Download'), ('photo_view', 'Photo View'), ('gallery_view', 'Gallery View'), ('purchase', 'Purchase'), ('favorite_add', 'Add to Favorites'), ('favorite_remove', 'Remove from Favorites'), ('login', 'User Login'), ('logout', 'User Logout')], max_length=50)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity_daily_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'User Activity Daily Stats',
+                'verbose_name_plural': 'User Activity Daily Stats',
+                'ordering': ['-date'],
+                'unique_together': {('user', 'date', 'activity_type')},
+            },
+        ),
+        migrations.RunPython(partition_activity_table, unpartition_activity_table),
+    ]
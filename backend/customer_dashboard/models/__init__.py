@@ -1,4 +1,4 @@
-from .activity import UserActivity
+from .activity import UserActivity, UserActivityDailyStats
 from .customer_profile import CustomerProfile
 from .purchase import Purchase
 from .favorite import Favorite
@@ -8,6 +8,7 @@ from .download import Download
 # This makes the models available at the package level
 __all__ = [
     'UserActivity',
+    'UserActivityDailyStats',
     'CustomerProfile',
     'Purchase',
     'Favorite',
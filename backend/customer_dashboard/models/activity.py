@@ -9,6 +9,10 @@ User = get_user_model()
 class UserActivity(models.Model):
     """
     Model to track user activities across the platform
+    
+    On MySQL the table is range-partitioned by month of ``created_at``
+    (see ``utils.activity_partitions``). Partitioned InnoDB tables cannot
+    hold foreign keys, so the relations below are unconstrained.
     """
     class ActivityType(models.TextChoices):
         PHOTO_LIKE = 'photo_like', 'Photo Like'
@@ -25,7 +29,8 @@ class UserActivity(models.Model):
     user = models.ForeignKey(
         User, 
         on_delete=models.CASCADE, 
-        related_name='activities'
+        related_name='activities',
+        db_constraint=False
     )
     activity_type = models.CharField(
         max_length=50, 
@@ -36,6 +41,7 @@ class UserActivity(models.Model):
         on_delete=models.SET_NULL,
         null=True,
         blank=True,
+        db_constraint=False,
         help_text="Content type of the related object"
     )
     object_id = models.UUIDField(
@@ -75,3 +81,33 @@ class UserActivity(models.Model):
             object_id=object_id,
             metadata=metadata or {}
         )
+
+
+class UserActivityDailyStats(models.Model):
+    """
+    Per-user, per-day, per-type activity counts.
+    
+    Bumped as buffered activity batches are written and recomputed from the
+    raw table by a periodic compaction task. Rows outlive the retention
+    window of ``UserActivity`` partitions.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='activity_daily_stats'
+    )
+    date = models.DateField()
+    activity_type = models.CharField(
+        max_length=50,
+        choices=UserActivity.ActivityType.choices
+    )
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'User Activity Daily Stats'
+        verbose_name_plural = 'User Activity Daily Stats'
+        ordering = ['-date']
+        unique_together = ('user', 'date', 'activity_type')
+
+    def __str__(self):
+        return f"{self.user_id} - {self.date} - {self.activity_type}: {self.count}"
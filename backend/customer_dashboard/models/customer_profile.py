@@ -30,6 +30,23 @@ class CustomerProfile(models.Model):
     email_notifications = models.BooleanField(default=True)
     newsletter_subscription = models.BooleanField(default=False)
     
+    # Counters maintained with F() deltas by customer_dashboard.signals;
+    # reconcile_customer_stats recomputes them from the source tables
+    total_downloads = models.PositiveIntegerField(
+        default=0,
+        help_text='Total number of photos downloaded by the customer'
+    )
+    total_purchases = models.PositiveIntegerField(
+        default=0,
+        help_text='Number of active, non-refunded purchases'
+    )
+    total_spent = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        help_text='Sum of active, non-refunded purchase amounts'
+    )
+    
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
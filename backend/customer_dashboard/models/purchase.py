@@ -2,6 +2,7 @@ from django.db import models
 from django.conf import settings
 from django.utils import timezone
 from django.core.validators import MinValueValidator
+from model_utils import FieldTracker
 
 class Purchase(models.Model):
     """
@@ -38,10 +39,17 @@ class Purchase(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
     
+    tracker = FieldTracker(fields=['customer', 'amount', 'is_active', 'is_refunded'])
+    
     class Meta:
         ordering = ['-purchase_date']
         verbose_name = 'Purchase'
         verbose_name_plural = 'Purchases'
     
+    @property
+    def counts_towards_total(self):
+        """Whether the purchase is included in the customer's profile totals."""
+        return self.is_active and not self.is_refunded
+    
     def __str__(self):
         return f"{self.customer.email} - {self.photo.title if self.photo else 'Deleted Photo'} - {self.amount}"
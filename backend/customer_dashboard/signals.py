@@ -1,20 +1,91 @@
-from django.db.models.signals import post_save
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from gallery.models import Download as GalleryDownload
-from .models import CustomerProfile
+from .models import Purchase, Favorite, Order, UserActivity
+from .utils import dashboard_data, profile_counters
+
+User = get_user_model()
 
 @receiver(post_save, sender=GalleryDownload)
 def update_customer_download_count(sender, instance, created, **kwargs):
     """
-    Update the customer's download count when a new download is recorded.
+    Increment the customer's download count when a new download is recorded.
+    """
+    if created and instance.user_id:
+        profile_counters.apply_deltas(instance.user_id, total_downloads=1)
+
+
+@receiver(post_delete, sender=GalleryDownload)
+def decrement_customer_download_count(sender, instance, **kwargs):
+    if instance.user_id:
+        profile_counters.apply_deltas(instance.user_id, total_downloads=-1)
+
+
+@receiver(post_save, sender=Purchase)
+def update_customer_purchase_totals(sender, instance, created, **kwargs):
+    """
+    Move the purchase's contribution to the profile totals when it is created,
+    reassigned, repriced, deactivated or refunded.
+    """
+    after = profile_counters.purchase_contribution(
+        instance.customer_id, instance.amount, instance.counts_towards_total
+    )
+    if created:
+        before = profile_counters.purchase_contribution(None, None, False)
+    else:
+        if not any(
+            instance.tracker.has_changed(field)
+            for field in ('customer', 'amount', 'is_active', 'is_refunded')
+        ):
+            return
+        previous = instance.tracker.previous
+        before = profile_counters.purchase_contribution(
+            previous('customer'),
+            previous('amount'),
+            bool(previous('is_active')) and not previous('is_refunded'),
+        )
+    profile_counters.apply_purchase_change(before, after)
+
+
+@receiver(post_delete, sender=Purchase)
+def remove_customer_purchase_totals(sender, instance, **kwargs):
+    before = profile_counters.purchase_contribution(
+        instance.customer_id, instance.amount, instance.counts_towards_total
+    )
+    after = profile_counters.purchase_contribution(instance.customer_id, None, False)
+    profile_counters.apply_purchase_change(before, after)
+
+
+# Models feeding the customer dashboard and the field pointing at the user
+DASHBOARD_SOURCES = (
+    (Purchase, 'customer_id'),
+    (Favorite, 'user_id'),
+    (Order, 'customer_id'),
+    (GalleryDownload, 'user_id'),
+    (UserActivity, 'user_id'),
+)
+
+
+def invalidate_customer_dashboard(sender, instance, **kwargs):
+    """
+    Drop the cached dashboard of the user a saved or deleted row belongs to.
     """
-    if created and instance.user:
-        # Get or create the customer profile
-        profile, _ = CustomerProfile.objects.get_or_create(user=instance.user)
-        
-        # Update the download count
-        profile.total_downloads = GalleryDownload.objects.filter(user=instance.user).count()
-        profile.save(update_fields=['total_downloads'])
+    user_field = dict(DASHBOARD_SOURCES)[sender]
+    dashboard_data.invalidate(getattr(instance, user_field, None))
 
-# Connect the signal
-post_save.connect(update_customer_download_count, sender=GalleryDownload)
+
+for model, _ in DASHBOARD_SOURCES:
+    post_save.connect(invalidate_customer_dashboard, sender=model,
+                      dispatch_uid=f'customer_dashboard_invalidate_save_{model.__name__}')
+    post_delete.connect(invalidate_customer_dashboard, sender=model,
+                        dispatch_uid=f'customer_dashboard_invalidate_delete_{model.__name__}')
+
+
+@receiver(post_save, sender=User)
+def invalidate_customer_dashboard_user(sender, instance, created, **kwargs):
+    """
+    The dashboard embeds the user's name and email.
+    """
+    if not created:
+        dashboard_data.invalidate(instance.pk)
@@ -0,0 +1,59 @@
+from celery import shared_task
+from django.utils import timezone
+from datetime import timedelta
+import logging
+
+logger = logging.getLogger(__name__)
+
+@shared_task
+def flush_user_activity(max_batches=20):
+    """
+    Task to write buffered user activity events to the database in batches
+    """
+    from customer_dashboard.utils.activity_pipeline import flush
+
+    try:
+        count = flush(max_batches=max_batches)
+        if count:
+            logger.info(f"Wrote {count} buffered user activity events")
+        return True
+
+    except Exception as e:
+        logger.error(f"Error flushing user activity: {str(e)}")
+        return False
+
+@shared_task
+def compact_user_activity_stats(days=2):
+    """
+    Task to recompute the last ``days`` days of user activity rollups from
+    the raw table
+    """
+    from customer_dashboard.utils.activity_rollups import compact
+
+    try:
+        start_date = timezone.localdate() - timedelta(days=days - 1)
+        count = compact(start_date)
+        logger.info(f"Compacted {count} user activity stats rows since {start_date}")
+        return True
+
+    except Exception as e:
+        logger.error(f"Error compacting user activity stats: {str(e)}")
+        return False
+
+@shared_task
+def maintain_user_activity_partitions():
+    """
+    Task to create upcoming monthly user activity partitions and drop the
+    ones past the retention window
+    """
+    from customer_dashboard.utils.activity_partitions import ensure_partitions, drop_expired
+
+    try:
+        created = ensure_partitions()
+        dropped = drop_expired()
+        logger.info(f"User activity partitions: created {created}, dropped {dropped}")
+        return True
+
+    except Exception as e:
+        logger.error(f"Error maintaining user activity partitions: {str(e)}")
+        return False
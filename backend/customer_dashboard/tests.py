@@ -1,3 +1,144 @@
-from django.test import TestCase
+import json
+import time
+from unittest import skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import JsonResponse
+from django.test import RequestFactory, TestCase
+
+from django.urls import include, path
+
+from config.db_router import PIN_COOKIE, REPLICA, apply_replica_reads, use_replica
+from config.middleware import PrimaryPinningMiddleware
+
+from .models import Order
+from .utils.dashboard_data import get_dashboard_counters, get_dashboard_data
+
+User = get_user_model()
+
+
+class DashboardDataTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='customer@example.com', password='secret')
+
+    def test_counters_use_a_single_query(self):
+        Order.objects.create(customer=self.user, order_number='ORD-1')
+
+        with self.assertNumQueries(1):
+            counters = get_dashboard_counters(self.user)
+
+        self.assertEqual(counters['orders_count'], 1)
+        self.assertEqual(counters['purchased_photos'], 0)
+        self.assertEqual(counters['total_downloads'], 0)
+
+    def test_empty_dashboard_skips_recent_lists(self):
+        # Only the counter query runs when every counter is zero
+        with self.assertNumQueries(1):
+            data = get_dashboard_data(self.user)
+
+        self.assertEqual(data['ordersCount'], 0)
+        self.assertEqual(data['recent_orders'], [])
+
+    def test_cached_dashboard_does_not_query(self):
+        get_dashboard_data(self.user)
+
+        with self.assertNumQueries(0):
+            get_dashboard_data(self.user)
+
+    def test_new_order_invalidates_cache(self):
+        self.assertEqual(get_dashboard_data(self.user)['ordersCount'], 0)
+
+        Order.objects.create(customer=self.user, order_number='ORD-2')
+
+        self.assertEqual(get_dashboard_data(self.user)['ordersCount'], 1)
+
+
+@skipUnless(REPLICA in settings.DATABASES, 'Set DB_REPLICA_HOST=sqlite to test replica routing')
+class ReplicaRoutingTests(TestCase):
+    # The SQLite replica is a separate database nothing replicates to, so a
+    # read that finds the primary's order must have gone to the primary
+    databases = {'default', REPLICA} if REPLICA in settings.DATABASES else {'default'}
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.user = User.objects.create_user(email='customer@example.com', password='secret')
+        Order.objects.create(customer=self.user, order_number='ORD-1')
+
+    def serve(self, view, method='get', cookies=None, wrap=True):
+        request = getattr(self.factory, method)('/api/customer/dashboard/')
+        request.COOKIES.update(cookies or {})
+        response = PrimaryPinningMiddleware(use_replica(view) if wrap else view)(request)
+        return response, json.loads(response.content)
+
+    @staticmethod
+    def read_view(request):
+        return JsonResponse({'db': Order.objects.all().db, 'orders': Order.objects.count()})
+
+    def test_reads_outside_requests_use_the_primary(self):
+        self.assertEqual(Order.objects.all().db, 'default')
+
+    def test_safe_requests_read_from_the_replica(self):
+        def view(request):
+            return JsonResponse({'db': Order.objects.all().db, 'orders': Order.objects.count()})
+
+        response, data = self.serve(view)
+
+        self.assertEqual(data, {'db': REPLICA, 'orders': 0})
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_unsafe_requests_read_from_the_primary(self):
+        def view(request):
+            return JsonResponse({'db': Order.objects.all().db, 'orders': Order.objects.count()})
+
+        _, data = self.serve(view, method='post')
+
+        self.assertEqual(data, {'db': 'default', 'orders': 1})
+
+    def test_write_pins_the_request_and_session_to_the_primary(self):
+        def view(request):
+            Order.objects.create(customer=self.user, order_number='ORD-2')
+            return JsonResponse({'db': Order.objects.all().db, 'orders': Order.objects.count()})
+
+        response, data = self.serve(view)
+
+        self.assertEqual(data, {'db': 'default', 'orders': 2})
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], settings.DB_PRIMARY_PIN_SECONDS)
+
+    def test_pinned_session_reads_from_the_primary(self):
+        def view(request):
+            return JsonResponse({'db': Order.objects.all().db, 'orders': Order.objects.count()})
+
+        _, data = self.serve(view, cookies={PIN_COOKIE: str(int(time.time()) + 60)})
+        self.assertEqual(data, {'db': 'default', 'orders': 1})
+
+        # An expired pin is ignored
+        _, data = self.serve(view, cookies={PIN_COOKIE: str(int(time.time()) - 60)})
+        self.assertEqual(data['db'], REPLICA)
+
+    def test_unwrapped_views_read_from_the_primary(self):
+        _, data = self.serve(self.read_view, wrap=False)
+
+        self.assertEqual(data, {'db': 'default', 'orders': 1})
+
+    def test_write_cookie_pins_the_next_request(self):
+        def write_view(request):
+            Order.objects.create(customer=self.user, order_number='ORD-2')
+            return JsonResponse({})
+
+        response, _ = self.serve(write_view, method='post')
+        _, data = self.serve(self.read_view, cookies={PIN_COOKIE: response.cookies[PIN_COOKIE].value})
+
+        self.assertEqual(data, {'db': 'default', 'orders': 2})
+
+    def test_apply_replica_reads_wraps_included_views(self):
+        patterns = apply_replica_reads([
+            path('orders/', self.read_view),
+            path('nested/', include([path('orders/', self.read_view)])),
+        ])
+
+        for callback in (patterns[0].callback, patterns[1].url_patterns[0].callback):
+            _, data = self.serve(callback, wrap=False)
+            self.assertEqual(data['db'], REPLICA)
@@ -1,5 +1,8 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from config.auth_profiles import apply_auth_profile
+from config.db_router import apply_replica_reads
+
 from . import api_views
 
 router = DefaultRouter()
@@ -23,3 +26,8 @@ urlpatterns = [
     path('activities/recent/', api_views.UserActivityViewSet.as_view({'get': 'recent'}), name='recent-activities'),
     path('activities/stats/', api_views.UserActivityViewSet.as_view({'get': 'stats'}), name='activity-stats'),
 ]
+
+# Only called by the frontend with a bearer token
+urlpatterns = apply_auth_profile('jwt-only', urlpatterns)
+# Dashboards are read-heavy; GETs read from the replica when one is configured
+urlpatterns = apply_replica_reads(urlpatterns)
@@ -1,21 +1,25 @@
 from django.contrib.contenttypes.models import ContentType
-from ..models.activity import UserActivity
+from . import activity_pipeline
 
 def log_user_activity(user, activity_type, obj=None, **metadata):
     """
     Log a user activity
     
+    The event is buffered by ``activity_pipeline`` and written in batches
+    by the ``flush_user_activity`` task, so nothing is returned.
+    
     Args:
         user: The user performing the action
         activity_type: Type of activity (from UserActivity.ActivityType)
         obj: Optional related object (e.g., a Photo or Gallery instance)
         **metadata: Additional data to store with the activity
     """
-    content_type = None
+    content_type_id = None
     object_id = None
     
     if obj is not None:
-        content_type = ContentType.objects.get_for_model(obj)
+        # Served from ContentType's in-process cache after the first lookup
+        content_type_id = ContentType.objects.get_for_model(obj).id
         object_id = str(obj.id)
     
     # Add IP address if available from the request
@@ -27,11 +31,11 @@ def log_user_activity(user, activity_type, obj=None, **metadata):
         else:
             metadata['ip_address'] = request.META.get('REMOTE_ADDR')
     
-    # Record the activity
-    return UserActivity.record_activity(
-        user=user,
+    # Buffer the activity
+    activity_pipeline.enqueue(
+        user_id=user.id,
         activity_type=activity_type,
-        content_type=content_type,
+        content_type_id=content_type_id,
         object_id=object_id,
-        **metadata
+        metadata=metadata
     )
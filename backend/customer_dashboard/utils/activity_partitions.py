@@ -0,0 +1,167 @@
+"""
+Monthly range partitions and retention for the ``UserActivity`` table.
+
+On MySQL the table is partitioned by ``TO_DAYS(created_at)`` with one
+partition per month plus a ``pmax`` catch-all. ``ensure_partitions`` splits
+``pmax`` to keep a few future months ahead, and ``drop_expired`` removes
+whole partitions older than the retention window, which is a metadata
+operation instead of a DELETE over millions of rows. Other databases fall
+back to a batched DELETE.
+"""
+import logging
+from datetime import date
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+
+from ..models.activity import UserActivity
+
+logger = logging.getLogger(__name__)
+
+TABLE = UserActivity._meta.db_table
+CATCH_ALL = 'pmax'
+
+
+def is_partitioned():
+    if connection.vendor != 'mysql':
+        return False
+    return bool(existing_partitions())
+
+
+def month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def add_months(value, months):
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f'p{month:%Y%m}'
+
+
+def partition_definition(month):
+    """Partition holding ``month``: rows strictly before the next month."""
+    upper = add_months(month, 1)
+    return f"PARTITION {partition_name(month)} VALUES LESS THAN (TO_DAYS('{upper.isoformat()}'))"
+
+
+def existing_partitions(using=DEFAULT_DB_ALIAS):
+    """Names of the table's partitions in order, empty when unpartitioned."""
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT PARTITION_NAME
+            FROM information_schema.PARTITIONS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL
+            ORDER BY PARTITION_ORDINAL_POSITION
+            """,
+            [TABLE],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def ensure_partitions(today=None, months_ahead=None):
+    """Create monthly partitions up to ``months_ahead`` months from ``today``."""
+    if not is_partitioned():
+        return []
+    today = today or date.today()
+    months_ahead = months_ahead if months_ahead is not None else getattr(settings, 'USER_ACTIVITY_PARTITIONS_AHEAD', 3)
+    existing = set(existing_partitions())
+
+    missing = []
+    month = month_start(today)
+    for _ in range(months_ahead + 1):
+        if partition_name(month) not in existing:
+            missing.append(month)
+        month = add_months(month, 1)
+    # Splitting pmax only works for months after the last existing partition
+    named = sorted(name for name in existing if name != CATCH_ALL)
+    if named:
+        missing = [month for month in missing if partition_name(month) > named[-1]]
+    if not missing:
+        return []
+
+    definitions = ', '.join(partition_definition(month) for month in missing)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"ALTER TABLE {TABLE} REORGANIZE PARTITION {CATCH_ALL} INTO "
+            f"({definitions}, PARTITION {CATCH_ALL} VALUES LESS THAN MAXVALUE)"
+        )
+    created = [partition_name(month) for month in missing]
+    logger.info(f"Created user activity partitions: {', '.join(created)}")
+    return created
+
+
+def retention_cutoff(today=None, retention_months=None):
+    """First day still retained; everything before it is dropped."""
+    today = today or date.today()
+    retention_months = retention_months or getattr(settings, 'USER_ACTIVITY_RETENTION_MONTHS', 12)
+    return add_months(month_start(today), -retention_months)
+
+
+def drop_expired(today=None, retention_months=None, batch_size=10000):
+    """
+    Remove activity older than the retention window.
+
+    Returns the partitions dropped on MySQL, or the number of rows deleted
+    elsewhere.
+    """
+    cutoff = retention_cutoff(today, retention_months)
+    if not is_partitioned():
+        deleted = 0
+        while True:
+            ids = list(
+                UserActivity.objects.filter(created_at__date__lt=cutoff)
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                return deleted
+            deleted += UserActivity.objects.filter(id__in=ids).delete()[0]
+
+    # A monthly partition is expired once its whole month precedes the cutoff
+    expired = [
+        name for name in existing_partitions()
+        if name != CATCH_ALL and name < partition_name(cutoff)
+    ]
+    if expired:
+        with connection.cursor() as cursor:
+            cursor.execute(f"ALTER TABLE {TABLE} DROP PARTITION {', '.join(expired)}")
+        logger.info(f"Dropped user activity partitions: {', '.join(expired)}")
+    return expired
+
+
+def partition_table(months_ahead=3, using=DEFAULT_DB_ALIAS):
+    """
+    Convert the unpartitioned table to monthly partitions (MySQL only).
+
+    The primary key must include the partitioning column, so it becomes
+    ``(id, created_at)``; ``id`` stays auto-increment and unique.
+    """
+    if connections[using].vendor != 'mysql' or existing_partitions(using):
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"SELECT MIN(created_at) FROM {TABLE}")
+        first = cursor.fetchone()[0]
+        today = date.today()
+        month = month_start(first.date() if first else today)
+        last = add_months(month_start(today), months_ahead)
+        definitions = []
+        while month <= last:
+            definitions.append(partition_definition(month))
+            month = add_months(month, 1)
+        definitions.append(f"PARTITION {CATCH_ALL} VALUES LESS THAN MAXVALUE")
+
+        cursor.execute(f"ALTER TABLE {TABLE} DROP PRIMARY KEY, ADD PRIMARY KEY (id, created_at)")
+        cursor.execute(
+            f"ALTER TABLE {TABLE} PARTITION BY RANGE (TO_DAYS(created_at)) ({', '.join(definitions)})"
+        )
+
+
+def unpartition_table(using=DEFAULT_DB_ALIAS):
+    if connections[using].vendor != 'mysql' or not existing_partitions(using):
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {TABLE} REMOVE PARTITIONING")
+        cursor.execute(f"ALTER TABLE {TABLE} DROP PRIMARY KEY, ADD PRIMARY KEY (id)")
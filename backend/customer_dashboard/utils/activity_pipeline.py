@@ -0,0 +1,207 @@
+"""
+Buffered, append-only pipeline for ``UserActivity`` rows.
+
+``log_user_activity`` appends events to a Redis stream (one XADD, no
+database work on the request path). The ``flush_user_activity`` Celery task
+reads the stream through a consumer group and writes the events with
+``bulk_create``. Entries are only acknowledged after their batch is
+committed, and entries left pending by a worker that died mid-batch are
+reclaimed after ``USER_ACTIVITY_CLAIM_IDLE_SECONDS``, so a restart loses
+nothing. When a batch fails, its entries are retried one by one; an entry
+that still fails after ``USER_ACTIVITY_MAX_DELIVERIES`` deliveries is moved
+to the ``DEAD_LETTER_KEY`` stream so it can't block the ones behind it.
+
+Set ``USER_ACTIVITY_PIPELINE = 'sync'`` to write each event inline (and as
+the fallback when Redis is unreachable). Tests using the Redis pipeline call
+``flush()`` to drain the stream before asserting on ``UserActivity``.
+"""
+import json
+import logging
+import os
+import socket
+
+from django.conf import settings
+from django.db import transaction
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from config.redis_client import get_redis
+from ..models.activity import UserActivity
+
+logger = logging.getLogger(__name__)
+
+STREAM_KEY = 'user_activity:stream'
+DEAD_LETTER_KEY = 'user_activity:dead'
+GROUP = 'activity-writers'
+MODE_REDIS = 'redis'
+MODE_SYNC = 'sync'
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _consumer_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def _event(user_id, activity_type, content_type_id, object_id, metadata, created_at=None):
+    return {
+        'user_id': user_id,
+        'activity_type': activity_type,
+        'content_type_id': content_type_id,
+        'object_id': object_id,
+        'metadata': metadata or {},
+        'created_at': (created_at or timezone.now()).isoformat(),
+    }
+
+
+def _to_activity(event):
+    return UserActivity(
+        user_id=event['user_id'],
+        activity_type=event['activity_type'],
+        content_type_id=event['content_type_id'],
+        object_id=event['object_id'],
+        metadata=event['metadata'],
+        created_at=parse_datetime(event['created_at']),
+    )
+
+
+def _write(events):
+    from . import activity_rollups, dashboard_data
+
+    activities = [_to_activity(event) for event in events]
+    with transaction.atomic():
+        UserActivity.objects.bulk_create(activities, batch_size=1000)
+        activity_rollups.record(activities)
+    # bulk_create skips post_save, so drop the cached dashboards here
+    for user_id in {event['user_id'] for event in events}:
+        dashboard_data.invalidate(user_id)
+
+
+def enqueue(user_id, activity_type, content_type_id=None, object_id=None, metadata=None):
+    """Record one activity event, buffered in Redis unless the pipeline is synchronous."""
+    event = _event(user_id, activity_type, content_type_id, object_id, metadata)
+    if _setting('USER_ACTIVITY_PIPELINE', MODE_REDIS) == MODE_REDIS:
+        try:
+            get_redis().xadd(
+                STREAM_KEY,
+                {'event': json.dumps(event, cls=DjangoJSONEncoder)},
+                maxlen=_setting('USER_ACTIVITY_STREAM_MAXLEN', 1000000),
+                approximate=True,
+            )
+            return
+        except Exception as e:
+            logger.error(f"Could not buffer user activity, writing it inline: {str(e)}")
+    _write([event])
+
+
+def _ensure_group(client):
+    try:
+        client.xgroup_create(STREAM_KEY, GROUP, id='0', mkstream=True)
+    except Exception as e:
+        if 'BUSYGROUP' not in str(e):
+            raise
+
+
+def _decode(entries):
+    ids, events = [], []
+    for entry_id, fields in entries:
+        ids.append(entry_id)
+        try:
+            events.append((entry_id, fields[b'event'], json.loads(fields[b'event'])))
+        except (KeyError, ValueError) as e:
+            # A malformed entry would otherwise be redelivered forever
+            logger.error(f"Dropping malformed user activity entry {entry_id}: {str(e)}")
+    return ids, events
+
+
+def _write_each(client, events):
+    """
+    Write ``events`` one at a time after their batch failed. Returns the ids
+    that are done with: written, or moved to the dead-letter stream.
+    """
+    done, failed = [], []
+    for entry_id, raw, event in events:
+        try:
+            _write([event])
+            done.append(entry_id)
+        except Exception as e:
+            failed.append((entry_id, raw, str(e)))
+    if not failed:
+        return done
+
+    pipe = client.pipeline()
+    for entry_id, _, _ in failed:
+        pipe.xpending_range(STREAM_KEY, GROUP, min=entry_id, max=entry_id, count=1)
+    max_deliveries = _setting('USER_ACTIVITY_MAX_DELIVERIES', 5)
+    for (entry_id, raw, error), pending in zip(failed, pipe.execute()):
+        deliveries = pending[0]['times_delivered'] if pending else max_deliveries
+        if deliveries < max_deliveries:
+            # Stays pending; reclaimed after the idle timeout
+            logger.error(f"Could not write user activity entry {entry_id} (delivery {deliveries}): {error}")
+            continue
+        logger.error(f"Moving user activity entry {entry_id} to {DEAD_LETTER_KEY} after {deliveries} deliveries: {error}")
+        client.xadd(DEAD_LETTER_KEY, {'id': entry_id, 'event': raw, 'error': error})
+        done.append(entry_id)
+    return done
+
+
+def consume(batch_size=None, consumer=None):
+    """
+    Write one batch of buffered events to the database.
+
+    Entries abandoned by dead consumers are reclaimed first. Returns the
+    number of stream entries processed.
+    """
+    client = get_redis()
+    batch_size = batch_size or _setting('USER_ACTIVITY_BATCH_SIZE', 500)
+    consumer = consumer or _consumer_name()
+    _ensure_group(client)
+
+    idle_ms = _setting('USER_ACTIVITY_CLAIM_IDLE_SECONDS', 300) * 1000
+    _, claimed, *_ = client.xautoclaim(STREAM_KEY, GROUP, consumer, idle_ms, start_id='0-0', count=batch_size)
+    # Reclaimed entries can be tombstones of ids trimmed from the stream
+    tombstones = [entry_id for entry_id, fields in claimed if not fields]
+    if tombstones:
+        client.xack(STREAM_KEY, GROUP, *tombstones)
+    entries = [(entry_id, fields) for entry_id, fields in claimed if fields]
+    if not entries:
+        response = client.xreadgroup(GROUP, consumer, {STREAM_KEY: '>'}, count=batch_size)
+        entries = response[0][1] if response else []
+    if not entries:
+        return 0
+
+    ids, events = _decode(entries)
+    done = ids
+    if events:
+        try:
+            _write([event for _, _, event in events])
+        except Exception as e:
+            logger.error(f"Error writing user activity batch, retrying entries one by one: {str(e)}")
+            written = set(_write_each(client, events))
+            malformed = set(ids) - {entry_id for entry_id, _, _ in events}
+            done = [entry_id for entry_id in ids if entry_id in written or entry_id in malformed]
+    # Acknowledge only after the batch is committed
+    if done:
+        pipe = client.pipeline()
+        pipe.xack(STREAM_KEY, GROUP, *done)
+        pipe.xdel(STREAM_KEY, *done)
+        pipe.execute()
+    return len(ids)
+
+
+def flush(max_batches=None):
+    """Drain the buffered events into the database; returns the number written."""
+    if _setting('USER_ACTIVITY_PIPELINE', MODE_REDIS) != MODE_REDIS:
+        return 0
+    total = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        processed = consume()
+        if not processed:
+            break
+        total += processed
+        batches += 1
+    return total
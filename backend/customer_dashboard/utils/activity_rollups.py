@@ -0,0 +1,114 @@
+"""
+Maintenance and reads of the ``UserActivityDailyStats`` rollups.
+"""
+import logging
+from collections import Counter, defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from ..models.activity import UserActivity, UserActivityDailyStats
+from .activity_partitions import retention_cutoff
+
+logger = logging.getLogger(__name__)
+
+
+def day_of(value):
+    return timezone.localtime(value).date() if value else timezone.localdate()
+
+
+def bump(user_id, date, activity_type, delta):
+    """Add ``delta`` to one rollup row, creating it if needed."""
+    if not user_id or not delta:
+        return
+    rows = UserActivityDailyStats.objects.filter(user_id=user_id, date=date, activity_type=activity_type)
+    if rows.update(count=F('count') + delta):
+        return
+    try:
+        with transaction.atomic():
+            UserActivityDailyStats.objects.create(
+                user_id=user_id, date=date, activity_type=activity_type, count=delta
+            )
+    except IntegrityError:
+        # Created concurrently; apply the delta to that row instead
+        rows.update(count=F('count') + delta)
+
+
+def record(activities):
+    """Bump the rollups for a batch of newly written ``UserActivity`` rows."""
+    counts = Counter(
+        (activity.user_id, day_of(activity.created_at), activity.activity_type)
+        for activity in activities
+    )
+    for (user_id, date, activity_type), delta in counts.items():
+        bump(user_id, date, activity_type, delta)
+
+
+def compact(start_date, end_date=None):
+    """
+    Recompute rollup rows for ``start_date``..``end_date`` from the raw table.
+
+    Only days still inside the retention window can be recomputed; older
+    rollups are kept as they are. Returns the number of rows written.
+
+    The window's rows are locked before the raw table is read, and
+    rewritten in place, so a ``bump`` made during the rebuild waits for it
+    and then applies on top of the recomputed counts.
+    """
+    end_date = end_date or timezone.localdate()
+    # Raw rows before the cutoff are gone; recomputing would zero their rollups
+    start_date = max(start_date, retention_cutoff(timezone.localdate()))
+
+    with transaction.atomic():
+        existing = UserActivityDailyStats.objects.filter(date__gte=start_date, date__lte=end_date)
+        locked = {
+            (row.user_id, row.date, row.activity_type): row
+            for row in existing.select_for_update().order_by('pk')
+        }
+
+        rows = defaultdict(int)
+        activities = UserActivity.objects.filter(
+            created_at__date__gte=start_date, created_at__date__lte=end_date
+        ).order_by()
+        for row in activities.annotate(day=TruncDate('created_at')).values(
+            'user_id', 'day', 'activity_type'
+        ).annotate(total=Count('id')):
+            rows[(row['user_id'], row['day'], row['activity_type'])] = row['total']
+
+        changed, created = [], []
+        for (user_id, date, activity_type), count in rows.items():
+            row = locked.pop((user_id, date, activity_type), None)
+            if row is None:
+                created.append(
+                    UserActivityDailyStats(user_id=user_id, date=date, activity_type=activity_type, count=count)
+                )
+                continue
+            row.count = count
+            changed.append(row)
+        UserActivityDailyStats.objects.bulk_update(changed, ['count'], batch_size=1000)
+        UserActivityDailyStats.objects.bulk_create(created, batch_size=1000)
+        # Nothing left in the raw table for these
+        if locked:
+            UserActivityDailyStats.objects.filter(pk__in=[row.pk for row in locked.values()]).delete()
+    return len(rows)
+
+
+def activity_stats(user, days=30):
+    """Build the ``UserActivityViewSet.stats`` payload from the rollup rows."""
+    rollups = UserActivityDailyStats.objects.filter(user=user)
+    activity_type_stats = rollups.values('activity_type').annotate(
+        count=Sum('count')
+    ).order_by('-count')
+    recent_activity = rollups.values('date').annotate(
+        count=Sum('count')
+    ).order_by('-date')[:days]
+
+    return {
+        'activity_type_stats': list(activity_type_stats),
+        # Keep the key produced by the former created_at__date grouping
+        'recent_activity': [
+            {'created_at__date': row['date'], 'count': row['count']} for row in recent_activity
+        ],
+    }
@@ -0,0 +1,187 @@
+"""
+Data service behind the customer dashboard.
+
+All counters are gathered in a single query using correlated subqueries on
+the user row; the recent-item lists are only queried when their counter is
+non-zero. The assembled payload is cached per user and invalidated by the
+signals in ``customer_dashboard.signals`` whenever one of its sources
+changes.
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db.models import Count, DecimalField, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from gallery.models import Photo, Download as GalleryDownload
+from ..models import Purchase, Favorite, Order, UserActivity
+
+User = get_user_model()
+
+CACHE_KEY = 'customer_dashboard:{}'
+CACHE_TIMEOUT = 60 * 5
+
+
+def cache_key(user_id):
+    return CACHE_KEY.format(user_id)
+
+
+def invalidate(user_id):
+    """Drop the cached dashboard of ``user_id``."""
+    if user_id:
+        cache.delete(cache_key(user_id))
+
+
+def _count(queryset, user_field):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{user_field: OuterRef('pk')})
+            .order_by().values(user_field).annotate(total=Count('pk')).values('total'),
+            output_field=IntegerField(),
+        ),
+        Value(0),
+    )
+
+
+def _sum(queryset, user_field, field):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{user_field: OuterRef('pk')})
+            .order_by().values(user_field).annotate(total=Sum(field)).values('total'),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        ),
+        Value(0),
+        output_field=DecimalField(max_digits=12, decimal_places=2),
+    )
+
+
+def get_dashboard_counters(user):
+    """Return every dashboard counter for ``user`` in one database round trip."""
+    active_purchases = Purchase.objects.filter(is_active=True)
+    return User.objects.filter(pk=user.pk).annotate(
+        total_downloads=_count(GalleryDownload.objects.all(), 'user'),
+        purchased_photos=_count(active_purchases, 'customer'),
+        total_spent=_sum(active_purchases, 'customer', 'amount'),
+        favorites_count=_count(Favorite.objects.all(), 'user'),
+        orders_count=_count(Order.objects.all(), 'customer'),
+        activities_count=_count(UserActivity.objects.all(), 'user'),
+    ).values(
+        'total_downloads', 'purchased_photos', 'total_spent',
+        'favorites_count', 'orders_count', 'activities_count',
+    ).get()
+
+
+def _recent_activities(user):
+    photo_content_type = ContentType.objects.get_for_model(Photo)
+    activities = list(
+        UserActivity.objects
+        .filter(user=user, content_type=photo_content_type, object_id__isnull=False)
+        .order_by('-created_at')[:10]
+    )
+
+    # Get all photo objects efficiently
+    photo_ids = [act.object_id for act in activities if act.object_id]
+    photos = Photo.objects.in_bulk(photo_ids, field_name='id') if photo_ids else {}
+
+    data = []
+    for act in activities:
+        photo = photos.get(act.object_id) if act.object_id else None
+        photo_data = None
+        if photo:
+            photo_data = {
+                'id': str(photo.id),
+                'title': photo.title,
+                'thumbnail_url': photo.thumbnail.url if hasattr(photo, 'thumbnail') and photo.thumbnail else None,
+            }
+        data.append({
+            'id': str(act.id),
+            'activity_type': act.activity_type,
+            'activity_type_display': act.get_activity_type_display(),
+            'created_at': act.created_at,
+            'metadata': act.metadata,
+            'photo': photo_data,
+        })
+    return data
+
+
+def build_dashboard(user, request=None):
+    """Assemble the dashboard payload for ``user`` from the database."""
+    from ..serializers import (
+        PurchaseSerializer,
+        FavoriteSerializer,
+        OrderSerializer,
+        DownloadSerializer,
+    )
+
+    counters = get_dashboard_counters(user)
+    context = {'request': request}
+    total_downloads = counters['total_downloads']
+    total_spent = float(counters['total_spent'] or 0)
+
+    recent_purchases = PurchaseSerializer(
+        Purchase.objects.filter(customer=user, is_active=True).order_by('-purchase_date')[:3],
+        many=True,
+        context=context
+    ).data if counters['purchased_photos'] else []
+
+    recent_favorites = FavoriteSerializer(
+        Favorite.objects.filter(user=user).select_related('photo', 'photo__gallery')
+            .order_by('-created_at')[:3],
+        many=True,
+        context=context
+    ).data if counters['favorites_count'] else []
+
+    recent_orders = OrderSerializer(
+        Order.objects.filter(customer=user).order_by('-created_at')[:3],
+        many=True,
+        context=context
+    ).data if counters['orders_count'] else []
+
+    recent_downloads = DownloadSerializer(
+        GalleryDownload.objects.filter(user=user).select_related('photo', 'photo__gallery')
+            .order_by('-downloaded_at')[:4],
+        many=True,
+        context=context
+    ).data if total_downloads else []
+
+    recent_activities = _recent_activities(user) if counters['activities_count'] else []
+
+    # Keep the response shape the frontend expects
+    return {
+        'user': {
+            'id': user.id,
+            'name': user.get_full_name() or user.username,
+            'email': user.email,
+            'avatar': None,
+        },
+        'totalDownloads': total_downloads,
+        'purchasedPhotos': counters['purchased_photos'],
+        'favoritesCount': counters['favorites_count'],
+        'ordersCount': counters['orders_count'],
+        'totalSpent': total_spent,
+
+        'recent_purchases': recent_purchases,
+        'recent_favorites': recent_favorites,
+        'recent_orders': recent_orders,
+        'recent_downloads': recent_downloads,
+        'recent_activities': recent_activities,
+        'downloads_count': total_downloads,
+
+        'stats': {
+            'total_downloads': total_downloads,
+            'purchased_photos': counters['purchased_photos'],
+            'favorites_count': counters['favorites_count'],
+            'total_orders': counters['orders_count'],
+            'total_spent': total_spent,
+        }
+    }
+
+
+def get_dashboard_data(user, request=None):
+    """Return the cached dashboard payload for ``user``, building it on a miss."""
+    key = cache_key(user.pk)
+    data = cache.get(key)
+    if data is None:
+        data = build_dashboard(user, request)
+        cache.set(key, data, CACHE_TIMEOUT)
+    return data
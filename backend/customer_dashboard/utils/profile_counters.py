@@ -0,0 +1,113 @@
+"""
+Delta maintenance and reconciliation of the ``CustomerProfile`` counters.
+
+Signals apply atomic ``F()`` increments and decrements as downloads and
+purchases are created, deleted or refunded, so recording an event no longer
+rescans the customer's history. ``reconcile`` recomputes every profile from
+the source tables and repairs drift from bulk updates that bypass signals.
+"""
+import logging
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, Sum, Value, When
+
+from ..models import CustomerProfile, Purchase
+
+logger = logging.getLogger(__name__)
+
+COUNTERS = ('total_downloads', 'total_purchases', 'total_spent')
+
+
+def _expression(field, delta):
+    if delta > 0:
+        return F(field) + delta
+    # Never let drift push a counter below zero; the unsigned MySQL columns
+    # would reject the subtraction outright
+    return Case(
+        When(**{f'{field}__gte': -delta}, then=F(field) + delta),
+        default=Value(Decimal('0') if field == 'total_spent' else 0),
+    )
+
+
+def apply_deltas(user_id, **deltas):
+    """Apply counter deltas to the profile of ``user_id``, creating it if needed."""
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not user_id or not deltas:
+        return
+    updates = {field: _expression(field, delta) for field, delta in deltas.items()}
+    profiles = CustomerProfile.objects.filter(user_id=user_id)
+    if profiles.update(**updates):
+        return
+    initial = {field: max(delta, 0) for field, delta in deltas.items()}
+    try:
+        with transaction.atomic():
+            CustomerProfile.objects.create(user_id=user_id, **initial)
+    except IntegrityError:
+        # Created concurrently; apply the delta to that row instead
+        profiles.update(**updates)
+
+
+def purchase_contribution(customer_id, amount, counted):
+    """The ``(customer_id, purchases, spent)`` a purchase adds to its profile."""
+    if not customer_id or not counted:
+        return customer_id, 0, Decimal('0')
+    return customer_id, 1, amount or Decimal('0')
+
+
+def apply_purchase_change(before, after):
+    """Move a purchase's contribution from its previous state to its new one."""
+    before_user, before_count, before_spent = before
+    after_user, after_count, after_spent = after
+    if before_user == after_user:
+        apply_deltas(
+            after_user,
+            total_purchases=after_count - before_count,
+            total_spent=after_spent - before_spent,
+        )
+        return
+    apply_deltas(before_user, total_purchases=-before_count, total_spent=-before_spent)
+    apply_deltas(after_user, total_purchases=after_count, total_spent=after_spent)
+
+
+def reconcile(batch_size=1000):
+    """
+    Recompute the counters of every profile with grouped queries.
+
+    Profiles are created for customers that have downloads or purchases but
+    no profile yet. Returns the number of profiles whose counters changed.
+    """
+    from gallery.models import Download as GalleryDownload
+
+    downloads = dict(
+        GalleryDownload.objects.filter(user__isnull=False).order_by()
+        .values('user_id').annotate(total=Count('id')).values_list('user_id', 'total')
+    )
+    purchases = {
+        row['customer_id']: (row['total'], row['spent'] or Decimal('0'))
+        for row in Purchase.objects.filter(is_active=True, is_refunded=False).order_by()
+        .values('customer_id').annotate(total=Count('id'), spent=Sum('amount'))
+    }
+
+    CustomerProfile.objects.bulk_create(
+        [CustomerProfile(user_id=user_id) for user_id in set(downloads) | set(purchases)],
+        batch_size=batch_size,
+        ignore_conflicts=True,
+    )
+
+    changed = []
+    for profile in CustomerProfile.objects.only('id', 'user_id', *COUNTERS).iterator(chunk_size=batch_size):
+        total_purchases, total_spent = purchases.get(profile.user_id, (0, Decimal('0')))
+        values = {
+            'total_downloads': downloads.get(profile.user_id, 0),
+            'total_purchases': total_purchases,
+            'total_spent': total_spent,
+        }
+        if any(getattr(profile, field) != value for field, value in values.items()):
+            for field, value in values.items():
+                setattr(profile, field, value)
+            changed.append(profile)
+
+    CustomerProfile.objects.bulk_update(changed, COUNTERS, batch_size=batch_size)
+    logger.info(f"Reconciled customer profile counters: {len(changed)} profiles updated")
+    return len(changed)
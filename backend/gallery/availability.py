@@ -0,0 +1,243 @@
+"""
+Materialized ticket availability snapshots.
+
+Every ``EventTicket`` of an upcoming ticketed event gets a snapshot in the
+cache holding its serialized listing payload together with the values the
+listing endpoints filter on (remaining quantity, sale window, active flags).
+``AvailableTicketsViewSet`` and ``EventWithTicketsViewSet`` answer their list
+actions from these snapshots, so a listing costs two cache round trips
+instead of several queries per ticket.
+
+Snapshots are refreshed per event whenever inventory changes (see
+``gallery.signals``), rebuilt periodically, and the sale-window state is
+re-evaluated by a beat task whenever a ``sale_start``/``sale_end`` passes.
+"""
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_KEY = 'ticket_availability:{}'
+INDEX_KEY = 'ticket_availability:index'
+
+
+def _snapshot_ttl():
+    return getattr(settings, 'TICKET_AVAILABILITY_SNAPSHOT_TTL', 6 * 3600)
+
+
+def _timestamp(value):
+    return value.timestamp() if value else None
+
+
+def _event_payload(event):
+    """Serialize the event part of ``EventWithTicketsSerializer`` once per event."""
+    from .serializers import EventWithTicketsSerializer
+
+    fields = [f for f in EventWithTicketsSerializer.Meta.fields if f != 'tickets']
+    serializer = EventWithTicketsSerializer(event, context={})
+    payload = {}
+    for name in fields:
+        field = serializer.fields[name]
+        attribute = field.get_attribute(event)
+        payload[name] = field.to_representation(attribute) if attribute is not None else None
+    return payload
+
+
+def build_snapshot(event_ticket, event_payload=None):
+    """
+    Build the cached snapshot for a single ``EventTicket``.
+
+    ``event_payload`` can be passed in when several tickets of the same event
+    are built together so the event is only serialized once.
+    """
+    from .serializers import EventTicketSerializer, EventTicketListSerializer
+
+    event = event_ticket.event
+    remaining = event_ticket.remaining_quantity
+    now = timezone.now()
+
+    listing = dict(EventTicketListSerializer(event_ticket).data)
+    ticket = dict(EventTicketSerializer(event_ticket).data)
+    listing['remaining_quantity'] = remaining
+    ticket['remaining_quantity'] = remaining
+
+    on_sale = (
+        event_ticket.is_active
+        and (event_ticket.sale_start is None or event_ticket.sale_start <= now)
+        and (event_ticket.sale_end is None or event_ticket.sale_end >= now)
+        and (remaining is None or remaining > 0)
+    )
+
+    return {
+        'id': event_ticket.id,
+        'event_id': event.id,
+        'event_date': event.date.isoformat(),
+        'has_tickets': event.has_tickets,
+        'is_active': event_ticket.is_active,
+        'price': str(event_ticket.price),
+        'currency': event_ticket.currency,
+        'quantity_available': event_ticket.quantity_available,
+        'remaining_quantity': remaining,
+        'sale_start': _timestamp(event_ticket.sale_start),
+        'sale_end': _timestamp(event_ticket.sale_end),
+        'on_sale': on_sale,
+        'listing': listing,
+        'ticket': ticket,
+        'event': event_payload if event_payload is not None else _event_payload(event),
+        'refreshed_at': now.isoformat(),
+    }
+
+
+def _snapshot_queryset():
+    from .ticket_models.models import EventTicket
+
+    return EventTicket.objects.filter(
+        event__has_tickets=True,
+        event__date__gte=timezone.now().date(),
+    ).select_related(
+        'event', 'ticket_type', 'ticket_type__group', 'ticket_type__level'
+    ).order_by('event__date', 'event_id', 'ticket_type__group__name', 'ticket_type__level__display_order')
+
+
+def _store(tickets):
+    """Build and store snapshots for ``tickets``; returns the number written."""
+    snapshots = {}
+    event_payloads = {}
+    for event_ticket in tickets:
+        if event_ticket.event_id not in event_payloads:
+            event_payloads[event_ticket.event_id] = _event_payload(event_ticket.event)
+        snapshots[SNAPSHOT_KEY.format(event_ticket.id)] = build_snapshot(
+            event_ticket, event_payloads[event_ticket.event_id]
+        )
+    if snapshots:
+        cache.set_many(snapshots, _snapshot_ttl())
+    return len(snapshots)
+
+
+def _store_index():
+    ids = list(_snapshot_queryset().values_list('id', flat=True))
+    cache.set(INDEX_KEY, ids, _snapshot_ttl())
+    return ids
+
+
+def rebuild_all():
+    """Rebuild every snapshot and the index from the database."""
+    count = _store(_snapshot_queryset())
+    _store_index()
+    return count
+
+
+def refresh_events(event_ids):
+    """Refresh the snapshots of all tickets belonging to ``event_ids``."""
+    from .ticket_models.models import EventTicket
+
+    tickets = EventTicket.objects.filter(event_id__in=event_ids).select_related(
+        'event', 'ticket_type', 'ticket_type__group', 'ticket_type__level'
+    )
+    count = _store(tickets)
+    _store_index()
+    return count
+
+
+def refresh_sale_window_boundaries(since, until):
+    """
+    Refresh tickets whose ``sale_start`` or ``sale_end`` fell in ``(since, until]``.
+
+    The listing endpoints compare the stored timestamps against the current
+    time, so this only keeps the precomputed ``on_sale`` flag accurate.
+    """
+    from django.db.models import Q
+
+    boundary = (
+        Q(sale_start__gt=since, sale_start__lte=until)
+        | Q(sale_end__gt=since, sale_end__lte=until)
+    )
+    return _store(_snapshot_queryset().filter(boundary))
+
+
+def get_snapshots():
+    """
+    Return every indexed snapshot in index order, or ``None`` on a cache miss.
+
+    A missing index or a missing snapshot means the cache is cold or was
+    evicted; callers should fall back to the database and schedule a rebuild.
+    """
+    try:
+        ids = cache.get(INDEX_KEY)
+        if ids is None:
+            return None
+        keys = [SNAPSHOT_KEY.format(ticket_id) for ticket_id in ids]
+        found = cache.get_many(keys)
+    except Exception as e:
+        logger.error(f"Error reading ticket availability snapshots: {str(e)}")
+        return None
+    if len(found) != len(keys):
+        return None
+    return [found[key] for key in keys]
+
+
+def _is_listable(snapshot, today):
+    return snapshot['has_tickets'] and snapshot['event_date'] >= today
+
+
+def available_ticket_rows(snapshots):
+    """Rows for ``AvailableTicketsViewSet``: active tickets currently on sale."""
+    today = timezone.now().date().isoformat()
+    now_ts = timezone.now().timestamp()
+    return [
+        snapshot['listing'] for snapshot in snapshots
+        if _is_listable(snapshot, today)
+        and snapshot['is_active']
+        and snapshot['sale_start'] is not None and snapshot['sale_start'] <= now_ts
+        and snapshot['sale_end'] is not None and snapshot['sale_end'] >= now_ts
+    ]
+
+
+def events_with_tickets_rows(snapshots, request=None):
+    """
+    Rows for ``EventWithTicketsViewSet``: upcoming events with at least one
+    active ticket still on sale, each carrying all of its tickets.
+    """
+    today = timezone.now().date().isoformat()
+    now_ts = timezone.now().timestamp()
+    events = {}
+    tickets = {}
+    selling = set()
+    for snapshot in snapshots:
+        if not _is_listable(snapshot, today):
+            continue
+        event_id = snapshot['event_id']
+        events.setdefault(event_id, snapshot['event'])
+        tickets.setdefault(event_id, []).append(snapshot['ticket'])
+        if (
+            snapshot['is_active']
+            and snapshot['sale_end'] is not None and snapshot['sale_end'] >= now_ts
+            and (snapshot['quantity_available'] or 0) > 0
+        ):
+            selling.add(event_id)
+
+    rows = []
+    for event_id in selling:
+        row = dict(events[event_id])
+        row['tickets'] = tickets[event_id]
+        if request is not None and row.get('cover_image_url'):
+            row['cover_image_url'] = request.build_absolute_uri(row['cover_image_url'])
+        rows.append(row)
+
+    # Match Event.Meta.ordering (-date, name)
+    rows.sort(key=lambda row: row['name'] or '')
+    rows.sort(key=lambda row: row['date'], reverse=True)
+    return rows
+
+
+def schedule_rebuild():
+    """Queue a full rebuild without letting a broker outage break the request."""
+    from .tasks import rebuild_ticket_availability
+
+    try:
+        rebuild_ticket_availability.delay()
+    except Exception as e:
+        logger.error(f"Could not schedule ticket availability rebuild: {str(e)}")
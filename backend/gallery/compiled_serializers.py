@@ -0,0 +1,121 @@
+"""
+Compiled read-only serializers for photo and gallery payloads.
+
+They produce the payloads of the corresponding serializers in
+``gallery.serializers`` from ``values_list`` tuples (see
+``config.compiled_serializers``). ``gallery.read_paths`` prepares their
+context: the media URL builders, the user's likes and the uploaders.
+"""
+from django.contrib.auth import get_user_model
+from django.db.models import BooleanField, Count, ExpressionWrapper, Q
+
+from config.compiled_serializers import CompiledSerializer
+
+from .models import Event, Gallery, Photo
+
+User = get_user_model()
+
+
+def media_url(name, context):
+    """Media URL from the request's builder (see ``gallery.read_paths.media_url_builder``)."""
+    return context['media_url'](name)
+
+
+def storage_url(name, context):
+    """Media URL relative to the site, like ``FieldFile.url``."""
+    return context['storage_url'](name)
+
+
+def _is_liked(row, context):
+    return row['id'] in context.get('liked_photo_ids', ()) if context else False
+
+
+def _uploader(user_id, context):
+    return context['uploaders'].get(user_id)
+
+
+def _creator(user_id, context):
+    return context['creators'].get(user_id)
+
+
+def _event_cover(event_id, context):
+    return context['covers'].get(event_id)
+
+
+def _is_private(row, context):
+    return row['privacy'] == 'private'
+
+
+def _is_verified(row, context):
+    if row['privacy'] != 'private':
+        return None
+    return str(row['id']) in context['verified_events']
+
+
+class GridPhotoSerializer(CompiledSerializer):
+    """A photo in a gallery or event grid."""
+    model = Photo
+    fields = (
+        'id', 'title', 'description', 'image', 'width', 'height',
+        'created_at', 'like_count', 'is_liked'
+    )
+    annotations = {'total_likes': Count('likes', distinct=True)}
+    sources = {'like_count': 'total_likes'}
+    transforms = {'image': media_url}
+    computed = {'is_liked': _is_liked}
+
+
+class GalleryPhotoSerializer(GridPhotoSerializer):
+    """A grid photo with its gallery id, for grouping several galleries' photos."""
+    fields = GridPhotoSerializer.fields + ('gallery_id',)
+
+
+class GallerySummarySerializer(CompiledSerializer):
+    """A gallery in an event payload, without its photos."""
+    model = Gallery
+    fields = ('id', 'title', 'description', 'created_at', 'updated_at')
+
+
+class UploaderSerializer(CompiledSerializer):
+    """The uploader nested in public photo payloads (``accounts.serializers.UserSerializer`` fields)."""
+    model = User
+    fields = ('id', 'email', 'full_name', 'is_photographer', 'date_joined', 'phone_number', 'bio')
+
+
+class PublicPhotoSerializer(CompiledSerializer):
+    """A photo in a public gallery listing (``gallery.serializers.PhotoSerializer`` fields)."""
+    model = Photo
+    fields = (
+        'id', 'title', 'description', 'image', 'image_url', 'thumbnail_url',
+        'width', 'height', 'file_size', 'mime_type', 'is_featured',
+        'is_public', 'order', 'created_at', 'updated_at', 'uploaded_by'
+    )
+    sources = {'image_url': 'image', 'thumbnail_url': 'image', 'uploaded_by': 'uploaded_by_id'}
+    transforms = {
+        'image': media_url,
+        'image_url': storage_url,
+        'thumbnail_url': storage_url,
+        'uploaded_by': _uploader,
+    }
+
+
+class EventCreatorSerializer(CompiledSerializer):
+    """The creator nested in public event listings."""
+    model = User
+    fields = ('id', 'email', 'first_name', 'last_name')
+
+
+class PublicEventListSerializer(CompiledSerializer):
+    """An event in the public listing (``gallery.serializers.PublicEventSerializer`` fields)."""
+    model = Event
+    fields = (
+        'id', 'name', 'slug', 'description', 'date', 'location',
+        'privacy', 'is_private', 'is_verified', 'created_by',
+        'created_at', 'updated_at', 'cover_image', 'requires_pin'
+    )
+    annotations = {
+        'pin_required': ExpressionWrapper(Q(privacy='private', pin__isnull=False), output_field=BooleanField()),
+    }
+    sources = {'created_by': 'created_by_id', 'cover_image': 'id', 'requires_pin': 'pin_required'}
+    transforms = {'created_by': _creator, 'cover_image': _event_cover}
+    computed = {'is_private': _is_private, 'is_verified': _is_verified}
@@ -0,0 +1,223 @@
+"""
+Whole-gallery ZIP exports.
+
+Archives are streamed on the fly: entries are stored (photos are already
+compressed), files are read from media storage in chunks and each chunk is
+yielded as soon as ``zipfile`` has written it, so memory use is constant
+regardless of gallery size. ZIP64 is used automatically for large members
+and archives.
+
+Large exports can be pre-built by ``build_gallery_export``. The archive is
+stored under a name derived from the photo set, so buyers of the same set
+share it, and its location is cached for ``GALLERY_EXPORT_TTL`` (the
+lifetime of a download token). Only one build per photo set is queued at a
+time (``claim_build``), however often clients poll.
+"""
+import hashlib
+import io
+import logging
+import os
+import tempfile
+import zipfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from .models import Photo, Download
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+EXPORT_DIR = 'exports/galleries'
+# Held while a build is queued or running; expires in case the worker dies
+BUILD_LOCK_SECONDS = 3600
+
+
+def _ttl():
+    return getattr(settings, 'GALLERY_EXPORT_TTL', 7 * 24 * 3600)
+
+
+class _StreamSink(io.RawIOBase):
+    """Write-only, unseekable buffer that ``zipfile`` writes into and we drain."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def exportable_photos(gallery, user):
+    """
+    Photos of ``gallery`` that ``user`` may export: all of them for the
+    photographer and staff, public ones of a free gallery, otherwise the
+    photos covered by the user's paid orders.
+    """
+    from payments.models import Order
+
+    photos = Photo.objects.filter(gallery=gallery)
+    if user.is_superuser or user.is_staff or gallery.photographer_id == user.id:
+        return photos
+    if not gallery.price and gallery.is_public:
+        return photos.filter(is_public=True)
+    return photos.filter(
+        order_items__order__user=user,
+        order_items__order__status=Order.STATUS_PAID,
+    ).distinct()
+
+
+def _entries(photos):
+    """``(arcname, name, size, created_at)`` for every photo, in a stable order."""
+    entries = []
+    seen = set()
+    for photo_id, name, size, created_at in photos.order_by('order', 'created_at', 'id').values_list(
+        'id', 'image', 'file_size', 'created_at'
+    ):
+        if not name:
+            continue
+        arcname = os.path.basename(name)
+        if arcname in seen:
+            arcname = f'{photo_id}_{arcname}'
+        seen.add(arcname)
+        entries.append((arcname, name, size, created_at))
+    return entries
+
+
+def export_digest(photos):
+    """Identifier of a photo set's archive; changes whenever a photo is added, removed or replaced."""
+    digest = hashlib.sha256()
+    for photo_id, image, content_hash in photos.order_by('id').values_list('id', 'image', 'content_hash'):
+        digest.update(f'{photo_id}:{image}:{content_hash};'.encode())
+    return digest.hexdigest()[:32]
+
+
+def stream_archive(photos, storage=None):
+    """Yield a stored ZIP64 archive of ``photos`` chunk by chunk."""
+    storage = storage or default_storage
+    sink = _StreamSink()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+        for arcname, name, size, created_at in _entries(photos):
+            info = zipfile.ZipInfo(arcname, date_time=timezone.localtime(created_at).timetuple()[:6])
+            info.compress_type = zipfile.ZIP_STORED
+            try:
+                with storage.open(name, 'rb') as source:
+                    info.file_size = size if size is not None else storage.size(name)
+                    with archive.open(info, 'w', force_zip64=info.file_size >= zipfile.ZIP64_LIMIT) as target:
+                        for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+                            target.write(chunk)
+                            yield sink.drain()
+            except FileNotFoundError:
+                logger.error(f"Skipping missing file {name} in gallery export")
+                continue
+            yield sink.drain()
+    # Central directory
+    yield sink.drain()
+
+
+def archive_filename(gallery):
+    return f'{gallery.slug or gallery.pk}.zip'
+
+
+def _cache_key(gallery_id, digest):
+    return f'gallery_export:{gallery_id}:{digest}'
+
+
+def prebuilt_archive(gallery_id, digest):
+    """Storage name of a pre-built archive for this photo set, if one is ready."""
+    name = cache.get(_cache_key(gallery_id, digest))
+    if name and default_storage.exists(name):
+        return name
+    return None
+
+
+def _building_key(gallery_id, digest):
+    return f'gallery_export:building:{gallery_id}:{digest}'
+
+
+def claim_build(gallery_id, digest):
+    """Whether the caller should queue a build of this photo set; False while one is under way."""
+    return cache.add(_building_key(gallery_id, digest), True, BUILD_LOCK_SECONDS)
+
+
+def release_build(gallery_id, digest):
+    cache.delete(_building_key(gallery_id, digest))
+
+
+def build_archive(gallery_id, photo_ids, digest):
+    """Write the archive to media storage via a temporary file and cache its location."""
+    photos = Photo.objects.filter(gallery_id=gallery_id, id__in=photo_ids)
+    name = f'{EXPORT_DIR}/{gallery_id}/{digest}.zip'
+    if not default_storage.exists(name):
+        with tempfile.TemporaryFile() as tmp:
+            for chunk in stream_archive(photos):
+                tmp.write(chunk)
+            tmp.seek(0)
+            saved = default_storage.save(name, File(tmp))
+        if saved != name:
+            # Another build stored the same photo set first; keep the exact name
+            default_storage.delete(saved)
+    cache.set(_cache_key(gallery_id, digest), name, _ttl())
+    return name
+
+
+def purge_expired(now=None):
+    """Delete pre-built archives older than ``GALLERY_EXPORT_TTL``; returns how many were removed."""
+    cutoff = (now or timezone.now()) - timedelta(seconds=_ttl())
+    removed = 0
+    try:
+        gallery_dirs, _ = default_storage.listdir(EXPORT_DIR)
+    except FileNotFoundError:
+        return 0
+    for gallery_dir in gallery_dirs:
+        _, files = default_storage.listdir(f'{EXPORT_DIR}/{gallery_dir}')
+        for filename in files:
+            name = f'{EXPORT_DIR}/{gallery_dir}/{filename}'
+            if default_storage.get_modified_time(name) < cutoff:
+                default_storage.delete(name)
+                removed += 1
+    return removed
+
+
+def record_export(user, photos):
+    """
+    Record one ``Download`` per exported photo with a single INSERT.
+
+    ``bulk_create`` skips the per-row signals, so the counters they keep are
+    bumped here in aggregate.
+    """
+    from customer_dashboard.utils import dashboard_data, profile_counters
+    from photographer_dashboard.rollups import bump
+
+    rows = list(photos.values_list('id', 'gallery__photographer_id'))
+    if not rows:
+        return 0
+    now = timezone.now()
+    Download.objects.bulk_create(
+        [Download(user=user, photo_id=photo_id, downloaded_at=now) for photo_id, _ in rows],
+        batch_size=1000,
+    )
+    try:
+        profile_counters.apply_deltas(user.id, total_downloads=len(rows))
+        dashboard_data.invalidate(user.id)
+        per_photographer = {}
+        for _, photographer_id in rows:
+            per_photographer[photographer_id] = per_photographer.get(photographer_id, 0) + 1
+        for photographer_id, count in per_photographer.items():
+            bump(photographer_id, timezone.localdate(now), downloads=count)
+    except Exception as e:
+        # Counters are repaired by their reconciliation jobs
+        logger.error(f"Error updating download counters after gallery export: {str(e)}")
+    return len(rows)
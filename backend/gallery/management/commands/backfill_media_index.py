@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from config.storages import TieredMediaStorage
+
+
+class Command(BaseCommand):
+    help = (
+        "List the bucket into the tiered storage's replication index, so objects "
+        "uploaded by the 's3' backend are known without asking the bucket. Run it "
+        "when switching MEDIA_STORAGE to 'tiered' (and after losing the Redis index)"
+    )
+
+    def handle(self, *args, **options):
+        storage = TieredMediaStorage()
+        if storage.remote is None:
+            raise CommandError('AWS_STORAGE_BUCKET_NAME is not set; there is no bucket to backfill from')
+        count = storage.index.backfill(storage.remote_names())
+        self.stdout.write(self.style.SUCCESS(f"Added {count} bucket objects to the media index"))
@@ -0,0 +1,110 @@
+import time
+import uuid
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+
+from config.renderers import ORJSONRenderer
+from gallery.compiled_serializers import GridPhotoSerializer
+from gallery.models import Photo
+from gallery.read_paths import media_url_builder
+
+
+class ModelGridPhotoSerializer(serializers.ModelSerializer):
+    """The GridPhotoSerializer payload built the ModelSerializer way."""
+    image = serializers.SerializerMethodField()
+    like_count = serializers.IntegerField(source='total_likes', read_only=True)
+    is_liked = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Photo
+        fields = GridPhotoSerializer.fields
+
+    def get_image(self, obj):
+        return obj.image.url if obj.image else None
+
+    def get_is_liked(self, obj):
+        return obj.id in self.context.get('liked_photo_ids', ())
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare ModelSerializer + JSONRenderer against the compiled photo serializer + '
+        'ORJSONRenderer on synthetic photo grids (no database access)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=[1000, 10000],
+            help='Photo counts to benchmark (default: 1000 10000)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Runs per measurement; the fastest is reported (default: 5)'
+        )
+
+    def make_rows(self, size):
+        now = timezone.now()
+        rows = []
+        for index in range(size):
+            rows.append((
+                uuid.uuid4(),
+                f'Photo {index}',
+                'A photo taken at the event',
+                f'gallery/benchmark/{uuid.uuid4()}.jpg',
+                4000,
+                3000,
+                now - timedelta(seconds=index),
+                index % 17,
+            ))
+        return rows
+
+    def make_instances(self, rows, columns):
+        # What a queryset would hand to the ModelSerializer
+        instances = []
+        for values in rows:
+            photo = Photo(**{column: value for column, value in zip(columns, values) if column != 'total_likes'})
+            photo.total_likes = values[columns.index('total_likes')]
+            instances.append(photo)
+        return instances
+
+    def measure(self, function, repeat):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            function()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best * 1000
+
+    def handle(self, *args, **options):
+        columns = list(GridPhotoSerializer.columns())
+        for size in options['sizes']:
+            rows = self.make_rows(size)
+            liked = {values[0] for values in rows[::10]}
+            context = {'liked_photo_ids': liked, 'media_url': media_url_builder()}
+
+            def model_path():
+                # Building instances is part of what a queryset costs this path
+                instances = self.make_instances(rows, columns)
+                data = ModelGridPhotoSerializer(instances, many=True, context=context).data
+                return JSONRenderer().render(data)
+
+            def compiled_path():
+                data = GridPhotoSerializer.serialize_rows(rows, context)
+                return ORJSONRenderer().render(data)
+
+            model_ms = self.measure(model_path, options['repeat'])
+            compiled_ms = self.measure(compiled_path, options['repeat'])
+            self.stdout.write(
+                f'{size:>6} photos: ModelSerializer+JSONRenderer {model_ms:9.1f} ms, '
+                f'compiled+ORJSONRenderer {compiled_ms:9.1f} ms ({model_ms / compiled_ms:.1f}x faster)'
+            )
@@ -48,4 +48,131 @@ class Command(BaseCommand):
             stats_task.interval = daily_schedule
             stats_task.save()
         
+        # Create schedules for ticket availability snapshots
+        hourly_schedule, created = IntervalSchedule.objects.get_or_create(
+            every=1,
+            period=IntervalSchedule.HOURS,
+        )
+        minute_schedule, created = IntervalSchedule.objects.get_or_create(
+            every=1,
+            period=IntervalSchedule.MINUTES,
+        )
+        five_minute_schedule, created = IntervalSchedule.objects.get_or_create(
+            every=5,
+            period=IntervalSchedule.MINUTES,
+        )
+        ten_second_schedule, created = IntervalSchedule.objects.get_or_create(
+            every=10,
+            period=IntervalSchedule.SECONDS,
+        )
+        
+        for name, task_name, interval, description in [
+            (
+                'Rebuild Ticket Availability',
+                'gallery.tasks.rebuild_ticket_availability',
+                hourly_schedule,
+                'Rebuilds all ticket availability snapshots hourly',
+            ),
+            (
+                'Refresh Ticket Sale Windows',
+                'gallery.tasks.refresh_ticket_sale_windows',
+                minute_schedule,
+                'Refreshes ticket snapshots whose sale window opened or closed',
+            ),
+            (
+                'Drain Email Outbox',
+                'notifications.tasks.drain_email_outbox',
+                minute_schedule,
+                'Sends queued emails that are due, including retries',
+            ),
+            (
+                'Resume Stalled Notification Fan-outs',
+                'notifications.tasks.resume_stalled_fanouts',
+                five_minute_schedule,
+                'Restarts notification fan-outs that stopped making progress',
+            ),
+            (
+                'Compact Photographer Stats',
+                'photographer_dashboard.tasks.compact_photographer_stats',
+                hourly_schedule,
+                'Recomputes the last two days of photographer stats rollups',
+            ),
+            (
+                'Flush User Activity',
+                'customer_dashboard.tasks.flush_user_activity',
+                ten_second_schedule,
+                'Writes buffered user activity events in batches',
+            ),
+            (
+                'Compact User Activity Stats',
+                'customer_dashboard.tasks.compact_user_activity_stats',
+                hourly_schedule,
+                'Recomputes the last two days of user activity rollups',
+            ),
+            (
+                'Maintain User Activity Partitions',
+                'customer_dashboard.tasks.maintain_user_activity_partitions',
+                daily_schedule,
+                'Adds upcoming monthly activity partitions and drops expired ones',
+            ),
+            (
+                'Purge Gallery Exports',
+                'gallery.tasks.purge_gallery_exports',
+                daily_schedule,
+                'Deletes pre-built gallery ZIP exports past their lifetime',
+            ),
+            (
+                'Replicate Pending Media',
+                'gallery.tasks.replicate_pending_media',
+                five_minute_schedule,
+                'Copies locally written media files that are not yet in S3',
+            ),
+            (
+                'Evict Media Cache',
+                'gallery.tasks.evict_media_cache',
+                five_minute_schedule,
+                'Removes least recently used local media copies above the cache size',
+            ),
+            (
+                'Reconcile Paystack Payments',
+                'payments.tasks.reconcile_paystack_payments',
+                ten_second_schedule,
+                'Verifies queued Paystack references and publishes their results',
+            ),
+            (
+                'Enqueue Pending Paystack Transactions',
+                'payments.tasks.enqueue_pending_paystack_transactions',
+                five_minute_schedule,
+                'Queues pending Paystack transactions the webhook has not settled',
+            ),
+        ]:
+            periodic_task, created = PeriodicTask.objects.get_or_create(
+                name=name,
+                task=task_name,
+                defaults={
+                    'interval': interval,
+                    'enabled': True,
+                    'description': description,
+                }
+            )
+            if not created:
+                periodic_task.interval = interval
+                periodic_task.save()
+        
+        # The nightly compaction covers the dashboard's 60-day comparison window
+        nightly_task, created = PeriodicTask.objects.get_or_create(
+            name='Compact Photographer Stats (60 days)',
+            task='photographer_dashboard.tasks.compact_photographer_stats',
+            defaults={
+                'interval': daily_schedule,
+                'kwargs': '{"days": 61}',
+                'enabled': True,
+                'description': 'Recomputes the last 61 days of photographer stats rollups nightly',
+            }
+        )
+        
+        if not created:
+            nightly_task.interval = daily_schedule
+            nightly_task.save()
+        
         self.stdout.write(self.style.SUCCESS('Successfully initialized Celery Beat tasks'))
@@ -0,0 +1,120 @@
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        'Load test the sync (WSGI) and async (ASGI) public read endpoints at rising '
+        'numbers of concurrent connections. Start each server with one worker, e.g. '
+        '"gunicorn config.wsgi -w 1 --threads 4 -b :8000" and '
+        '"gunicorn config.asgi:application -w 1 -k uvicorn.workers.UvicornWorker -b :8001"'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sync-url', default='http://127.0.0.1:8000', help='WSGI server (default: http://127.0.0.1:8000)')
+        parser.add_argument('--async-url', default='http://127.0.0.1:8001', help='ASGI server (default: http://127.0.0.1:8001)')
+        parser.add_argument(
+            '--sync-path',
+            default='/api/gallery/public/events/',
+            help='Endpoint on the WSGI server (default: /api/gallery/public/events/)'
+        )
+        parser.add_argument(
+            '--async-path',
+            default='/api/gallery/async/public/events/',
+            help='Endpoint on the ASGI server (default: /api/gallery/async/public/events/)'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            nargs='+',
+            default=[10, 50, 200, 500],
+            help='Concurrent connections to hold open (default: 10 50 200 500)'
+        )
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds per measurement (default: 10)')
+        parser.add_argument('--timeout', type=float, default=10.0, help='Seconds before a request counts as failed (default: 10)')
+
+    async def fetch(self, url, timeout):
+        """One request on a fresh connection; returns the status code."""
+        parts = urlsplit(url)
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+
+        async def request():
+            reader, writer = await asyncio.open_connection(parts.hostname, port, ssl=parts.scheme == 'https' or None)
+            try:
+                path = parts.path + (f'?{parts.query}' if parts.query else '')
+                writer.write(
+                    f'GET {path} HTTP/1.1\r\nHost: {parts.netloc}\r\n'
+                    f'Accept: application/json\r\nConnection: close\r\n\r\n'.encode()
+                )
+                await writer.drain()
+                status_line = await reader.readline()
+                await reader.read()
+                return int(status_line.split()[1])
+            finally:
+                writer.close()
+
+        return await asyncio.wait_for(request(), timeout)
+
+    async def measure(self, url, concurrency, duration, timeout):
+        latencies = []
+        errors = 0
+        deadline = time.perf_counter() + duration
+
+        async def client():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    status = await self.fetch(url, timeout)
+                except (OSError, asyncio.TimeoutError, IndexError, ValueError):
+                    status = None
+                if status == 200:
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+
+        def percentile(fraction):
+            return latencies[min(int(len(latencies) * fraction), len(latencies) - 1)] * 1000 if latencies else 0.0
+
+        return {
+            'ok': len(latencies),
+            'errors': errors,
+            'rps': len(latencies) / elapsed,
+            'p50': percentile(0.50),
+            'p99': percentile(0.99),
+        }
+
+    async def run(self, options):
+        targets = [
+            ('wsgi', options['sync_url'].rstrip('/') + options['sync_path']),
+            ('asgi', options['async_url'].rstrip('/') + options['async_path']),
+        ]
+        capacity = {}
+        for label, url in targets:
+            self.stdout.write(f'{label}: {url}')
+            for concurrency in options['concurrency']:
+                result = await self.measure(url, concurrency, options['duration'], options['timeout'])
+                self.stdout.write(
+                    f'  {concurrency:>5} connections: {result["rps"]:8.1f} req/s, '
+                    f'p50 {result["p50"]:7.1f} ms, p99 {result["p99"]:7.1f} ms, '
+                    f'{result["ok"]} ok, {result["errors"]} failed'
+                )
+                total = result['ok'] + result['errors']
+                # Capacity: the most connections served with under 1% failures
+                if total and result['errors'] / total < 0.01:
+                    capacity[label] = max(concurrency, capacity.get(label, 0))
+
+        for label, _ in targets:
+            self.stdout.write(f'{label} capacity: {capacity.get(label, 0)} concurrent connections')
+
+    def handle(self, *args, **options):
+        asyncio.run(self.run(options))
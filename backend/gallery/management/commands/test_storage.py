@@ -6,7 +6,18 @@ import os
 class Command(BaseCommand):
     help = 'Test the file storage system'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tiered',
+            action='store_true',
+            help='Exercise replication, eviction and cold fetch of the tiered storage '
+                 '(point AWS_S3_ENDPOINT_URL at MinIO or a moto server)',
+        )
+
     def handle(self, *args, **options):
+        if options['tiered']:
+            return self.test_tiered()
+
         self.stdout.write("=== Testing File Storage ===")
         self.stdout.write(f"Storage class: {default_storage.__class__.__module__}.{default_storage.__class__.__name__}")
         
@@ -46,3 +57,40 @@ class Command(BaseCommand):
             self.stdout.write(self.style.ERROR(f"Error: {e}"))
             import traceback
             self.stdout.write(self.style.ERROR(traceback.format_exc()))
+
+    def test_tiered(self):
+        from config.storages import TieredMediaStorage
+
+        self.stdout.write("=== Testing Tiered Storage ===")
+        storage = TieredMediaStorage()
+        if storage.remote is None:
+            self.stdout.write(self.style.ERROR("AWS_STORAGE_BUCKET_NAME is not set"))
+            return
+
+        test_content = b"This is a tiered storage test file."
+        saved_path = None
+        try:
+            saved_path = storage.save('test_tiered_storage.txt', ContentFile(test_content))
+            self.stdout.write(self.style.SUCCESS(f"Saved locally: {storage.local.exists(saved_path)}"))
+
+            # Replicate inline instead of waiting for the Celery worker
+            storage.replicate(saved_path)
+            self.stdout.write(f"Replicated to S3: {storage.remote.exists(saved_path)}")
+
+            freed = storage.evict(saved_path)
+            self.stdout.write(f"Evicted local copy ({freed} bytes): {not storage.local.exists(saved_path)}")
+
+            with storage.open(saved_path, 'rb') as f:
+                content = f.read()
+            self.stdout.write(f"Cold fetch matches: {content == test_content}")
+            self.stdout.write(f"Local copy restored: {storage.local.exists(saved_path)}")
+
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f"Error: {e}"))
+            import traceback
+            self.stdout.write(self.style.ERROR(traceback.format_exc()))
+
+        finally:
+            if saved_path:
+                storage.delete(saved_path)
+                self.stdout.write(self.style.SUCCESS("Test file deleted."))
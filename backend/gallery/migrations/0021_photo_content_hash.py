@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gallery', '0020_add_order_to_eventregistration'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='photo',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, help_text='SHA-256 of the original image, used as its strong ETag', max_length=64),
+        ),
+    ]
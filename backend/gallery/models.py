@@ -1,5 +1,6 @@
 import os
 import uuid
+import hashlib
 import random
 import string
 from django.db import models
@@ -492,8 +493,8 @@ class Gallery(models.Model):
         
     photo_count = property(_get_photo_count, _set_photo_count)
     
-    # Track changes to is_public field for notifications
-    tracker = FieldTracker(fields=['is_public'])
+    # Track changes to is_public (notifications) and is_active (photographer stats rollups)
+    tracker = FieldTracker(fields=['is_public', 'is_active'])
 
 
 class Photo(models.Model):
@@ -537,6 +538,12 @@ class Photo(models.Model):
     height = models.PositiveIntegerField(editable=False, null=True)
     file_size = models.PositiveBigIntegerField(editable=False, null=True)
     mime_type = models.CharField(max_length=100, editable=False, blank=True)
+    content_hash = models.CharField(
+        max_length=64,
+        editable=False,
+        blank=True,
+        help_text="SHA-256 of the original image, used as its strong ETag"
+    )
     is_featured = models.BooleanField(default=False)
     is_public = models.BooleanField(
         default=True,
@@ -579,7 +586,41 @@ class Photo(models.Model):
                 # If there's an error processing the image, still save the model
                 pass
         
+        # Hash newly uploaded files while they are still in memory or on local temp storage
+        if self.image and not getattr(self.image, '_committed', True):
+            try:
+                self.content_hash = self.hash_file(self.image)
+            except Exception:
+                self.content_hash = ''
+        
         super().save(*args, **kwargs)
+    
+    @staticmethod
+    def hash_file(file, chunk_size=1024 * 1024):
+        """SHA-256 hex digest of ``file``, read in chunks and rewound."""
+        digest = hashlib.sha256()
+        file.seek(0)
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            digest.update(chunk)
+        file.seek(0)
+        return digest.hexdigest()
+    
+    def ensure_content_hash(self):
+        """Return the stored content hash, computing it for photos uploaded before it existed."""
+        if not self.content_hash and self.image:
+            with self.image.storage.open(self.image.name, 'rb') as f:
+                self.content_hash = self.hash_file(f)
+            Photo.objects.filter(pk=self.pk).update(content_hash=self.content_hash)
+        return self.content_hash
+    
+    @property
+    def etag(self):
+        """Strong ETag of the original image, None when the file can't be read."""
+        try:
+            content_hash = self.ensure_content_hash()
+        except OSError:
+            return None
+        return f'"{content_hash}"' if content_hash else None
         
     def serve_protected_image(self, request):
         """Serve the image with security headers to prevent hotlinking and downloads."""
@@ -588,8 +629,26 @@ class Photo(models.Model):
         from wsgiref.util import FileWrapper
         import os
         
+        from django.http import HttpResponseNotModified
+        from config.file_delivery import file_response, not_modified
+        
         if not self.image or not os.path.exists(self.image.path):
             raise Http404("Image not found")
+        
+        # The watermarked rendition is derived from the original and the
+        # watermark text, so both go into its ETag
+        text = f" {self.gallery.photographer.username if self.gallery.photographer else 'EventPNG'}"
+        original_etag = self.etag
+        etag = None
+        if original_etag:
+            text_hash = hashlib.sha256(text.encode()).hexdigest()[:12]
+            etag = f'"{original_etag.strip(chr(34))}-wm-{text_hash}"'
+        # Either rendition may have been served before (see the fallback below)
+        for candidate in (etag, original_etag):
+            if not_modified(request, candidate):
+                response = HttpResponseNotModified()
+                response['ETag'] = candidate
+                return response
             
         # Get the image file
         image = open(self.image.path, 'rb')
@@ -638,8 +697,7 @@ class Photo(models.Model):
             except IOError:
                 font = ImageFont.load_default()
                 
-            # Add watermark text
-            text = f" {self.gallery.photographer.username if self.gallery.photographer else 'EventPNG'}"
+            # Add watermark text (computed above for the ETag)
             
             # Get text bounding box and calculate dimensions
             bbox = draw.textbbox((0, 0), text, font=font)
@@ -669,8 +727,12 @@ class Photo(models.Model):
             watermarked.save(buffer, format=img.format or 'PNG')
             buffer.seek(0)
             
-            # Create a response with security headers
-            response = FileResponse(buffer, content_type=f"image/{img.format.lower() or 'png'}")
+            # Create a response with security headers; Range requests are
+            # answered from the rendered buffer
+            response = file_response(request, buffer, buffer.getbuffer().nbytes, etag)
+            response['Content-Type'] = f"image/{img.format.lower() or 'png'}"
+            if etag:
+                response['ETag'] = etag
             
             # Set security headers to prevent downloads and hotlinking
             response['Content-Disposition'] = f'inline; filename="{os.path.basename(self.image.name)}"'
@@ -688,8 +750,11 @@ class Photo(models.Model):
             logger = logging.getLogger(__name__)
             
             # Fall back to serving the original image
-            return FileResponse(open(self.image.path, 'rb'), 
-                              content_type=self.mime_type or 'image/jpeg')
+            response = file_response(request, open(self.image.path, 'rb'), self.image.size, original_etag)
+            response['Content-Type'] = self.mime_type or 'image/jpeg'
+            if original_etag:
+                response['ETag'] = original_etag
+            return response
         
         # If this is the first photo in the gallery, set it as the cover
         if self.gallery and not self.gallery.cover_photo:
@@ -0,0 +1,138 @@
+"""
+Model-free read paths for photo grids.
+
+Photo lists are read as ``values_list`` tuples of only the columns the
+payload needs and serialized with the compiled serializers, so no
+``Photo`` instances (and no ``FieldTracker`` bookkeeping) are created.
+
+Media URLs skip the storage backend's ``url()`` where possible. For
+backends whose URLs are a fixed prefix followed by the file name (local
+storage, S3 with a custom domain or without query-string signing), the
+prefix is worked out once and URLs are built by string concatenation. An
+absolute prefix is likewise built once per request. Signed URLs and the
+tiered storage (whose URL depends on where each file currently lives) go
+through ``url()`` for every file.
+"""
+import asyncio
+from functools import lru_cache
+
+from django.contrib.auth import get_user_model
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.utils.encoding import filepath_to_uri
+from storages.backends.s3boto3 import S3Boto3Storage
+
+from config.storages import TieredMediaStorage
+
+from .compiled_serializers import GridPhotoSerializer, PublicPhotoSerializer, UploaderSerializer
+from .models import Like
+
+User = get_user_model()
+
+_PROBE = '__url_prefix_probe__'
+
+
+@lru_cache(maxsize=8)
+def url_prefix(storage):
+    """
+    The prefix such that ``prefix + filepath_to_uri(name)`` equals
+    ``storage.url(name)``, or None if URLs can't be derived from names.
+    """
+    if isinstance(storage, TieredMediaStorage):
+        return url_prefix(storage.local) if storage.remote is None else None
+    if isinstance(storage, FileSystemStorage):
+        return storage.base_url
+    if isinstance(storage, S3Boto3Storage):
+        if storage.querystring_auth and (not storage.custom_domain or storage.cloudfront_signer):
+            return None
+        url = storage.url(_PROBE)
+        if '?' in url or not url.endswith(_PROBE):
+            return None
+        return url[:-len(_PROBE)]
+    return None
+
+
+def media_url_builder(request=None, storage=None):
+    """
+    A function mapping a stored file name to its URL, absolute when
+    ``request`` is given, and None for empty names.
+    """
+    storage = storage or default_storage
+    prefix = url_prefix(storage)
+    absolute = request is not None and hasattr(request, 'build_absolute_uri')
+
+    if prefix is None:
+        if absolute:
+            return lambda name: request.build_absolute_uri(storage.url(name)) if name else None
+        return lambda name: storage.url(name) if name else None
+
+    if absolute and not prefix.startswith(('http://', 'https://', '//')):
+        prefix = request.build_absolute_uri(prefix)
+    return lambda name: prefix + filepath_to_uri(name).lstrip('/') if name else None
+
+
+def liked_photo_ids(request, photos):
+    """Ids among ``photos`` (a queryset) that the request's user has liked, in one query."""
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return set()
+    return set(
+        Like.objects.filter(user=user, photo__in=photos.values('id')).values_list('photo_id', flat=True)
+    )
+
+
+def photo_context(request, photos):
+    """Context for ``GridPhotoSerializer`` and its subclasses over ``photos``."""
+    return {
+        'media_url': media_url_builder(request),
+        'liked_photo_ids': liked_photo_ids(request, photos),
+    }
+
+
+def grid_photos(photos, request=None):
+    """Grid payloads of ``photos`` with like counts and the user's likes."""
+    return GridPhotoSerializer.serialize_queryset(photos, photo_context(request, photos))
+
+
+def public_photos(photos, request=None):
+    """
+    ``PublicPhotoListView`` payloads of ``photos``: one query for the photos
+    and one for their uploaders.
+    """
+    rows = list(photos.values_list(*PublicPhotoSerializer.columns()))
+    uploader_index = PublicPhotoSerializer.columns().index('uploaded_by_id')
+    uploader_ids = {row[uploader_index] for row in rows if row[uploader_index] is not None}
+    uploaders = {}
+    if uploader_ids:
+        for uploader in UploaderSerializer.serialize_queryset(User.objects.filter(id__in=uploader_ids)):
+            uploaders[uploader['id']] = uploader
+    context = {
+        'media_url': media_url_builder(request),
+        'storage_url': media_url_builder(),
+        'uploaders': uploaders,
+    }
+    return PublicPhotoSerializer.serialize_rows(rows, context)
+
+
+async def agrid_photos(photos, request=None):
+    """
+    ``grid_photos`` for async code. The async read tier serves anonymous
+    requests, so there are no likes to look up.
+    """
+    return await GridPhotoSerializer.aserialize_queryset(photos, {'media_url': media_url_builder(request)})
+
+
+async def apublic_photos(photos, request=None):
+    """
+    ``public_photos`` for async code. The uploaders are selected with a
+    subquery so both queries are issued together.
+    """
+    rows, uploaders = await asyncio.gather(
+        PublicPhotoSerializer.afetch(photos),
+        UploaderSerializer.aserialize_queryset(User.objects.filter(id__in=photos.values('uploaded_by_id'))),
+    )
+    context = {
+        'media_url': media_url_builder(request),
+        'storage_url': media_url_builder(),
+        'uploaders': {uploader['id']: uploader for uploader in uploaders},
+    }
+    return PublicPhotoSerializer.serialize_rows(rows, context)
@@ -1,8 +1,9 @@
-from django.db.models import Count
 from rest_framework import serializers
 from .models import Event, Gallery, Photo, Download, Like
 from .ticket_models.models import EventTicket, TicketType
 from accounts.serializers import UserSerializer
+from .compiled_serializers import GalleryPhotoSerializer, GallerySummarySerializer
+from .read_paths import grid_photos, photo_context
 
 class TicketTypeSerializer(serializers.ModelSerializer):
     """Serializer for ticket types."""
@@ -156,46 +157,24 @@ class PublicEventDetailSerializer(serializers.ModelSerializer):
         return None
         
     def get_galleries(self, obj):
-        # Use the prefetched galleries_data if available, otherwise query them with annotations
-        galleries = getattr(obj, 'galleries_data', None) or Gallery.objects.filter(
-            event=obj,
-            is_public=True
-        ).prefetch_related(
-            'photos__likes',  # Prefetch likes for N+1 optimization
-            'photos__likes__user'  # Prefetch users who liked for N+1 optimization
-        )
+        # Use the prefetched galleries_data if available, otherwise the event's public galleries
+        galleries_data = getattr(obj, 'galleries_data', None)
+        if galleries_data:
+            galleries = Gallery.objects.filter(id__in=[gallery.id for gallery in galleries_data])
+        else:
+            galleries = Gallery.objects.filter(event=obj, is_public=True)
         
-        # Get the current user from the request context
-        request = self.context.get('request')
+        # Photos of all galleries in one query, with like counts and the
+        # current user's likes resolved up front instead of per photo
+        photos = Photo.objects.filter(gallery__in=galleries.values('id'), is_public=True)
+        context = photo_context(self.context.get('request'), photos)
+        photos_by_gallery = {}
+        for photo in GalleryPhotoSerializer.serialize_queryset(photos, context):
+            photos_by_gallery.setdefault(photo.pop('gallery_id'), []).append(photo)
         
-        # Manually build the gallery data with like information
-        gallery_data = []
-        for gallery in galleries:
-            # Get photos with like counts
-            photos_data = []
-            for photo in gallery.photos.filter(is_public=True):
-                photos_data.append({
-                    'id': photo.id,
-                    'title': photo.title,
-                    'description': photo.description,
-                    'image': request.build_absolute_uri(photo.image.url) if request and hasattr(request, 'build_absolute_uri') else photo.image.url,
-                    'width': photo.width,
-                    'height': photo.height,
-                    'created_at': photo.created_at,
-                    'like_count': photo.likes.count(),
-                    'is_liked': photo.likes.filter(user=request.user).exists() if request and request.user.is_authenticated else False
-                })
-            
-            # Add gallery data with photos
-            gallery_data.append({
-                'id': gallery.id,
-                'title': gallery.title,
-                'description': gallery.description,
-                'photos': photos_data,
-                'created_at': gallery.created_at,
-                'updated_at': gallery.updated_at
-            })
-            
+        gallery_data = GallerySummarySerializer.serialize_queryset(galleries)
+        for gallery in gallery_data:
+            gallery['photos'] = photos_by_gallery.get(gallery['id'], [])
         return gallery_data
 
 
@@ -365,33 +344,9 @@ class GalleryDetailSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
     
     def get_photos(self, obj):
-        # Get public photos for the gallery with like counts
-        # Using 'total_likes' as the annotation name to avoid conflict with the model's like_count field
-        photos = obj.photos.filter(is_public=True).annotate(
-            total_likes=Count('likes', distinct=True)
-        )
-        
-        # Get the current user from the request context
-        request = self.context.get('request')
-        
-        # Create a list to store photo data with like status
-        photo_data = []
-        
-        for photo in photos:
-            photo_dict = {
-                'id': photo.id,
-                'title': photo.title,
-                'description': photo.description,
-                'image': request.build_absolute_uri(photo.image.url) if request and hasattr(request, 'build_absolute_uri') else photo.image.url,
-                'width': photo.width,
-                'height': photo.height,
-                'created_at': photo.created_at,
-                'like_count': photo.total_likes if hasattr(photo, 'total_likes') else photo.likes.count(),
-                'is_liked': photo.likes.filter(user=request.user).exists() if request and request.user.is_authenticated else False
-            }
-            photo_data.append(photo_dict)
-            
-        return photo_data
+        # Public photos read as tuples, with like counts and the current
+        # user's likes resolved in two queries for the whole gallery
+        return grid_photos(obj.photos.filter(is_public=True), self.context.get('request'))
     
     def get_event(self, obj):
         if not obj.event:
@@ -1,11 +1,11 @@
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_save, pre_save, post_delete
 from django.dispatch import receiver
 from django.conf import settings
-from django.core.mail import send_mail, mail_admins
-from django.template.loader import render_to_string
+from django.core.mail import mail_admins
 from django.db import transaction
 from django.utils import timezone
-from .models import Gallery, Event
+from .models import Gallery, Event, EventRegistration
+from .ticket_models.models import EventTicket
 from accounts.models import CustomUser
 
 
@@ -73,47 +73,18 @@ def _create_default_ticket(event):
 
 def send_gallery_notification(gallery):
     """
-    Send notification to all users about a new gallery
+    Start the fan-out of the new gallery notification to all subscribed users.
+    
+    The email is rendered once; recipients are paged through in chunks by
+    Celery workers and each user is notified at most once per gallery.
     """
-    subject = f'New Gallery Available: {gallery.title}'
-
-    # Get all active users who should receive notifications
-    users = CustomUser.objects.filter(
-        is_active=True,
-        notification_preferences__new_gallery_emails=True
-    ).distinct()
-
-    if not users.exists():
-        return
-
-    # Prepare email content
-    context = {
-        'gallery': gallery,
-        'event': gallery.event,
-        'site_name': 'EvenPng',  # Fixed site name
-        'frontend_url': getattr(settings, 'FRONTEND_URL', 'https://eventpng.com'),  # Frontend URL
-        'site_url': getattr(settings, 'SITE_URL', 'https://eventpng.com'),  # Keep for backward compatibility
-    }
-
-    html_content = render_to_string('emails/new_gallery_notification.html', context)
+    from notifications.fanout import start_gallery_fanout
+    from notifications.tasks import run_notification_fanout
 
-    # Send to each user
-    for user in users:
-        try:
-            send_mail(
-                subject=subject,
-                message=html_content,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[user.email],
-                html_message=html_content,
-                fail_silently=True,  # suppress crashes in production
-            )
-        except Exception as e:
-            mail_admins(
-                subject=f"Failed to send gallery notification to {user.email}",
-                message=f"Error: {str(e)}",
-                fail_silently=True
-            )
+    job, created = start_gallery_fanout(gallery)
+    if created:
+        transaction.on_commit(lambda: run_notification_fanout.delay(job.pk))
+    return job
 
 
 @receiver(post_save, sender=Gallery)
@@ -139,12 +110,61 @@ def handle_gallery_status_change(sender, instance, created, **kwargs):
         except Gallery.DoesNotExist:
             pass
 
-    # Trigger notifications
-    try:
-        send_gallery_notification(instance)
-    except Exception as e:
-        mail_admins(
-            subject=f"Failed to send gallery notification for {instance.title}",
-            message=f"Error: {str(e)}",
-            fail_silently=True
-        )
+    # Queue notifications in a worker once the gallery is committed
+    from .tasks import send_gallery_notification_task
+
+    gallery_id = instance.pk
+
+    def _schedule():
+        try:
+            send_gallery_notification_task.delay(gallery_id)
+        except Exception as e:
+            mail_admins(
+                subject=f"Failed to send gallery notification for {instance.title}",
+                message=f"Error: {str(e)}",
+                fail_silently=True
+            )
+
+    transaction.on_commit(_schedule)
+
+
+def _schedule_availability_refresh(event_id):
+    """Refresh an event's ticket availability snapshots once the transaction commits"""
+    from .tasks import refresh_ticket_availability
+
+    def _refresh():
+        try:
+            refresh_ticket_availability.delay([event_id])
+        except Exception as e:
+            import logging
+            logger = logging.getLogger(__name__)
+            logger.error(f"Could not schedule availability refresh for event {event_id}: {str(e)}")
+
+    transaction.on_commit(_refresh)
+
+
+@receiver(post_save, sender=EventTicket)
+@receiver(post_delete, sender=EventTicket)
+def refresh_ticket_availability_on_ticket_change(sender, instance, **kwargs):
+    """
+    Price, quantity and sale window changes invalidate the ticket's snapshot
+    """
+    _schedule_availability_refresh(instance.event_id)
+
+
+@receiver(post_save, sender=EventRegistration)
+@receiver(post_delete, sender=EventRegistration)
+def refresh_ticket_availability_on_registration(sender, instance, **kwargs):
+    """
+    Registrations change the remaining quantity of the event's tickets
+    """
+    _schedule_availability_refresh(instance.event_id)
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+def refresh_ticket_availability_on_event_change(sender, instance, **kwargs):
+    """
+    Event details are embedded in every ticket snapshot of the event
+    """
+    _schedule_availability_refresh(instance.pk)
@@ -73,3 +73,180 @@ def update_gallery_stats():
     except Exception as e:
         logger.error(f"Error updating gallery stats: {str(e)}")
         return False
+
+@shared_task
+def rebuild_ticket_availability():
+    """
+    Task to rebuild every ticket availability snapshot
+    """
+    from gallery import availability
+
+    try:
+        count = availability.rebuild_all()
+        logger.info(f"Rebuilt {count} ticket availability snapshots")
+        return True
+
+    except Exception as e:
+        logger.error(f"Error rebuilding ticket availability: {str(e)}")
+        return False
+
+@shared_task
+def refresh_ticket_availability(event_ids):
+    """
+    Task to refresh the availability snapshots of the given events' tickets
+    """
+    from gallery import availability
+
+    try:
+        count = availability.refresh_events(event_ids)
+        logger.info(f"Refreshed {count} ticket availability snapshots for events {event_ids}")
+        return True
+
+    except Exception as e:
+        logger.error(f"Error refreshing ticket availability for events {event_ids}: {str(e)}")
+        return False
+
+@shared_task
+def refresh_ticket_sale_windows():
+    """
+    Task to refresh snapshots of tickets whose sale window opened or closed
+    since the previous run
+    """
+    from gallery import availability
+    from datetime import timedelta
+
+    try:
+        now = timezone.now()
+        since = cache.get('ticket_availability:last_window_check') or now - timedelta(minutes=5)
+        count = availability.refresh_sale_window_boundaries(since, now)
+        cache.set('ticket_availability:last_window_check', now, None)
+        if count:
+            logger.info(f"Refreshed {count} ticket availability snapshots at sale window boundaries")
+        return True
+
+    except Exception as e:
+        logger.error(f"Error refreshing ticket sale windows: {str(e)}")
+        return False
+
+@shared_task
+def send_gallery_notification_task(gallery_id):
+    """
+    Task to start the notification fan-out for a gallery made public
+    """
+    from gallery.models import Gallery
+    from gallery.signals import send_gallery_notification
+
+    try:
+        gallery = Gallery.objects.select_related('event').get(pk=gallery_id)
+        job = send_gallery_notification(gallery)
+        logger.info(f"Started notification fan-out {job.pk} for gallery {gallery_id}")
+        return True
+
+    except Exception as e:
+        logger.error(f"Error queueing notifications for gallery {gallery_id}: {str(e)}")
+        return False
+
+@shared_task
+def build_gallery_export(gallery_id, photo_ids, digest):
+    """
+    Task to pre-build a gallery ZIP export into media storage
+    """
+    from gallery.export import build_archive, release_build
+
+    try:
+        name = build_archive(gallery_id, photo_ids, digest)
+        logger.info(f"Built gallery export {name} with {len(photo_ids)} photos")
+        return True
+
+    except Exception as e:
+        logger.error(f"Error building export for gallery {gallery_id}: {str(e)}")
+        return False
+
+    finally:
+        release_build(gallery_id, digest)
+
+@shared_task
+def purge_gallery_exports():
+    """
+    Task to delete pre-built gallery exports past their lifetime
+    """
+    from gallery.export import purge_expired
+
+    try:
+        removed = purge_expired()
+        logger.info(f"Purged {removed} expired gallery exports")
+        return True
+
+    except Exception as e:
+        logger.error(f"Error purging gallery exports: {str(e)}")
+        return False
+
+def _announce_processed_photos(names):
+    """Tell the uploaders of the photos among ``names`` that their files reached S3."""
+    from django.core.files.storage import default_storage
+    from gallery.models import Photo
+    from notifications import live
+
+    photos = Photo.objects.filter(image__in=names).values('id', 'gallery_id', 'uploaded_by_id', 'image')
+    for photo in photos:
+        live.publish(photo['uploaded_by_id'], live.PHOTO_PROCESSED, {
+            'photo_id': photo['id'],
+            'gallery_id': photo['gallery_id'],
+            'image': default_storage.url(photo['image']),
+        })
+
+@shared_task
+def replicate_media_file(name):
+    """
+    Task to copy a locally written media file to the S3 tier
+    """
+    from django.core.files.storage import default_storage
+
+    try:
+        if default_storage.replicate(name):
+            _announce_processed_photos([name])
+        logger.info(f"Replicated media file {name}")
+        return True
+
+    except Exception as e:
+        # Still listed as pending; replicate_pending_media retries it
+        logger.error(f"Error replicating media file {name}: {str(e)}")
+        return False
+
+@shared_task
+def replicate_pending_media(batch_size=500):
+    """
+    Task to replicate media files whose replication task was lost or failed
+    """
+    from django.core.files.storage import default_storage
+
+    try:
+        if not hasattr(default_storage, 'replicate') or default_storage.remote is None:
+            return True
+        names = default_storage.index.pending(batch_size)
+        replicated = [name for name in names if default_storage.replicate(name)]
+        _announce_processed_photos(replicated)
+        logger.info(f"Replicated {len(names)} pending media files")
+        return True
+
+    except Exception as e:
+        logger.error(f"Error replicating pending media files: {str(e)}")
+        return False
+
+@shared_task
+def evict_media_cache():
+    """
+    Task to evict least recently used local media copies above MEDIA_LOCAL_CACHE_BYTES
+    """
+    from django.core.files.storage import default_storage
+
+    try:
+        if not hasattr(default_storage, 'evict_until'):
+            return True
+        freed = default_storage.evict_until(settings.MEDIA_LOCAL_CACHE_BYTES)
+        logger.info(f"Evicted {freed} bytes of local media copies")
+        return True
+
+    except Exception as e:
+        logger.error(f"Error evicting local media copies: {str(e)}")
+        return False
@@ -1,5 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from config.db_router import use_replica
 from .views import *  # This will import all views including the ones from base_views and cached_views
 from .views_photo import ProtectedImageView
 from .views.ticket_views import (
@@ -18,6 +19,7 @@ urlpatterns = [
     path('galleries/', GalleryListView.as_view(), name='gallery-list'),
     path('galleries/create/', GalleryCreateView.as_view(), name='gallery-create'),
     path('galleries/<int:pk>/', GalleryDetailView.as_view(), name='gallery-detail'),
+    path('galleries/<int:gallery_id>/export/', GalleryExportView.as_view(), name='gallery-export'),
     
     # Photo endpoints - using UUID for photo_id
     path('galleries/<int:gallery_id>/photos/', PhotoListView.as_view(), name='photo-list'),
@@ -25,13 +27,13 @@ urlpatterns = [
     path('photos/<uuid:photo_id>/download/', DownloadPhotoView.as_view(), name='download-photo'),
     path('photos/<uuid:photo_id>/protected/', ProtectedImageView.as_view(), name='protected-photo'),
     
-    # Public endpoints (no authentication required)
-    path('public/galleries/', PublicGalleryListView.as_view(), name='public-gallery-list'),
-    path('public/galleries/by-id/<int:pk>/', PublicGalleryDetailByIdView.as_view(), name='public-gallery-detail-by-id'),
-    path('public/galleries/<slug:slug>/', PublicGalleryDetailView.as_view(), name='public-gallery-detail'),
+    # Public endpoints (no authentication required), read from the replica when one is configured
+    path('public/galleries/', use_replica(PublicGalleryListView.as_view()), name='public-gallery-list'),
+    path('public/galleries/by-id/<int:pk>/', use_replica(PublicGalleryDetailByIdView.as_view()), name='public-gallery-detail-by-id'),
+    path('public/galleries/<slug:slug>/', use_replica(PublicGalleryDetailView.as_view()), name='public-gallery-detail'),
     path('public/galleries/<int:pk>/', redirect_id_to_slug, name='public-gallery-id-redirect'),
-    path('public/galleries/<int:gallery_id>/photos/', PublicPhotoListView.as_view(), name='public-gallery-photos'),
-    path('public/photos/<int:pk>/', PublicPhotoDetailView.as_view(), name='public-photo-detail'),
+    path('public/galleries/<int:gallery_id>/photos/', use_replica(PublicPhotoListView.as_view()), name='public-gallery-photos'),
+    path('public/photos/<int:pk>/', use_replica(PublicPhotoDetailView.as_view()), name='public-photo-detail'),
     
     # Stats endpoints
     path('stats/', StatsView.as_view(), name='platform-stats'),
@@ -41,11 +43,17 @@ urlpatterns = [
     # Event endpoints
     path('events/', EventListView.as_view(), name='event-list'),
     path('events/<int:pk>/', EventDetailView.as_view(), name='event-detail'),
-    path('public/events/', PublicEventListView.as_view(), name='public-event-list'),
-    path('public/events/<int:pk>/', PublicEventDetailView.as_view(), name='public-event-detail'),
-    path('public/events/slug/<slug:slug>/', PublicEventBySlugView.as_view(), name='public-event-detail-by-slug'),
+    path('public/events/', use_replica(PublicEventListView.as_view()), name='public-event-list'),
+    path('public/events/<int:pk>/', use_replica(PublicEventDetailView.as_view()), name='public-event-detail'),
+    path('public/events/slug/<slug:slug>/', use_replica(PublicEventBySlugView.as_view()), name='public-event-detail-by-slug'),
     path('events/<slug:slug>/verify-pin/', VerifyEventPinView.as_view(), name='verify-event-pin'),
     
+    # Async read tier (served natively under ASGI, see gallery.views.async_views)
+    path('async/public/events/', use_replica(AsyncPublicEventListView.as_view()), name='async-public-event-list'),
+    path('async/public/events/slug/<slug:slug>/', use_replica(AsyncPublicEventBySlugView.as_view()), name='async-public-event-detail-by-slug'),
+    path('async/public/galleries/<slug:slug>/', use_replica(AsyncPublicGalleryDetailView.as_view()), name='async-public-gallery-detail'),
+    path('async/public/galleries/<int:gallery_id>/photos/', use_replica(AsyncPublicPhotoListView.as_view()), name='async-public-gallery-photos'),
+    
     # Ticket endpoints
     path('events/with-tickets/', EventWithTicketsViewSet.as_view({'get': 'list'}), name='events-with-tickets'),
     path('tickets/available/', AvailableTicketsViewSet.as_view({'get': 'list'}), name='available-tickets'),
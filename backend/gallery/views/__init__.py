@@ -5,9 +5,13 @@ from .base_views import (
     StatsView, LikePhotoView, UnlikePhotoView, UserLikedPhotosView,
     RecentGalleriesView, OngoingGalleriesView, GalleryListView,
     GalleryCreateView, GalleryDetailView, PhotoListView, PhotoDetailView,
-    DownloadPhotoView, PublicGalleryListView, PublicGalleryDetailByIdView,
+    DownloadPhotoView, GalleryExportView, PublicGalleryListView, PublicGalleryDetailByIdView,
     PublicGalleryDetailView, PublicPhotoDetailView, PublicPhotoListView,
     EventListView, EventDetailView, PublicEventListView, PublicEventDetailView,
     PublicEventBySlugView, VerifyEventPinView, redirect_id_to_slug, event_stats, 
     public_event_detail_page
 )
+from .async_views import (
+    AsyncPublicEventListView, AsyncPublicEventBySlugView,
+    AsyncPublicGalleryDetailView, AsyncPublicPhotoListView
+)
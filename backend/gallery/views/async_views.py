@@ -0,0 +1,225 @@
+"""
+Async read tier for the public event, gallery and photo endpoints.
+
+These are plain Django async views, because DRF 3.14 has no async
+support. They run natively under ASGI, for example with
+``gunicorn config.asgi:application -k uvicorn.workers.UvicornWorker``.
+Under WSGI, Django runs each one in its own event loop.
+
+Rows are read with ``aget`` and ``aiterator`` over ``values``
+querysets and serialized with the compiled serializers. Photo lists are
+cached with the async cache API and share their cache entries with
+``PublicPhotoListView``. Independent lookups are awaited together with
+``asyncio.gather``: the session, cache reads, and queries joined
+through subqueries instead of ids. Django 4.2 runs one request's
+queries in turn on that request's thread, so what gather overlaps is
+their waits. While any of them is pending, the worker's event loop
+serves other connections instead of holding a thread.
+
+Payloads match the sync views as an anonymous user sees them. The tier
+does no authentication, so ``is_liked`` is always false.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Max, Q
+from django.http import HttpResponse
+from django.views import View
+
+from config.renderers import ORJSONRenderer
+from gallery.compiled_serializers import (
+    EventCreatorSerializer, GalleryPhotoSerializer, GallerySummarySerializer,
+    PublicEventListSerializer, UploaderSerializer
+)
+from gallery.models import Event, EventCoverImage, Gallery, Photo
+from gallery.read_paths import agrid_photos, apublic_photos, media_url_builder
+
+from .base_views import public_photos_cache_key, search_events
+
+User = get_user_model()
+
+NOT_FOUND = {'detail': 'Not found.'}
+
+
+def json_response(data, status=200):
+    return HttpResponse(ORJSONRenderer().render(data), status=status, content_type='application/json')
+
+
+async def fetch_rows(queryset):
+    return [row async for row in queryset.aiterator()]
+
+
+async def verified_events(request):
+    """The private events unlocked in this session, loaded off the event loop."""
+    return await sync_to_async(request.session.get)('verified_events', [])
+
+
+async def _first_covers(events, media_url):
+    """Map of event id to the URL of its first cover, for the events of ``events``."""
+    covers = {}
+    cover_images = EventCoverImage.objects.filter(event__in=events.values('id')).values_list('event_id', 'image')
+    async for event_id, image in cover_images.aiterator():
+        if event_id not in covers:
+            covers[event_id] = media_url(image)
+    return covers
+
+
+class AsyncPublicEventListView(View):
+    """Async ``PublicEventListView``: the event listing with search and category filters."""
+
+    async def get(self, request):
+        events = search_events(
+            Event.objects.all(),
+            request.GET.get('search', '').strip(),
+            request.GET.get('category', '').strip()
+        )
+        media_url = media_url_builder(request)
+
+        event_rows, creators, covers, verified = await asyncio.gather(
+            PublicEventListSerializer.afetch(events),
+            EventCreatorSerializer.aserialize_queryset(User.objects.filter(id__in=events.values('created_by_id'))),
+            _first_covers(events, media_url),
+            verified_events(request),
+        )
+        context = {
+            'creators': {creator['id']: creator for creator in creators},
+            'covers': covers,
+            'verified_events': verified,
+        }
+        return json_response(PublicEventListSerializer.serialize_rows(event_rows, context))
+
+
+class AsyncPublicEventBySlugView(View):
+    """Async ``PublicEventBySlugView``: an event with its public galleries and their photos."""
+
+    async def get(self, request, slug):
+        verified = await verified_events(request)
+        try:
+            event = await Event.objects.filter(
+                Q(privacy='public') |
+                Q(privacy='private', pin__isnull=True) |
+                Q(privacy='private', pin__in=verified)
+            ).values(
+                'id', 'name', 'slug', 'description', 'date', 'location', 'privacy', 'created_at',
+                'created_by__first_name', 'created_by__last_name', 'created_by__email'
+            ).aget(slug=slug)
+        except Event.DoesNotExist:
+            return json_response(NOT_FOUND, status=404)
+
+        media_url = media_url_builder(request)
+        galleries = Gallery.objects.filter(event_id=event['id'], is_public=True)
+        photos = Photo.objects.filter(gallery__in=galleries.values('id'), is_public=True)
+        covers = EventCoverImage.objects.filter(event_id=event['id']).values_list('is_primary', 'image')
+
+        gallery_data, photo_rows, cover_rows = await asyncio.gather(
+            GallerySummarySerializer.aserialize_queryset(galleries),
+            GalleryPhotoSerializer.afetch(photos),
+            fetch_rows(covers),
+        )
+
+        photos_by_gallery = {}
+        for photo in GalleryPhotoSerializer.serialize_rows(photo_rows, {'media_url': media_url}):
+            photos_by_gallery.setdefault(photo.pop('gallery_id'), []).append(photo)
+        for gallery in gallery_data:
+            gallery['photos'] = photos_by_gallery.get(gallery['id'], [])
+
+        # The primary cover, or else the first one
+        cover = next((image for is_primary, image in cover_rows if is_primary), None)
+        if cover is None and cover_rows:
+            cover = cover_rows[0][1]
+
+        full_name = f"{event['created_by__first_name'] or ''} {event['created_by__last_name'] or ''}".strip()
+        return json_response({
+            'id': event['id'],
+            'name': event['name'],
+            'slug': event['slug'],
+            'description': event['description'],
+            'date': event['date'],
+            'location': event['location'],
+            'cover_photo': media_url(cover),
+            'galleries': gallery_data,
+            'created_by': full_name or event['created_by__email'],
+            'is_private': event['privacy'] != 'public',
+            'created_at': event['created_at'],
+        })
+
+
+class AsyncPublicGalleryDetailView(View):
+    """Async ``PublicGalleryDetailView``: a public gallery by slug with its public photos."""
+
+    async def get(self, request, slug):
+        galleries = Gallery.objects.filter(is_public=True)
+        event_id = request.GET.get('event_id')
+        if event_id:
+            try:
+                galleries = galleries.filter(event_id=int(event_id))
+            except (ValueError, TypeError):
+                pass  # Ignore invalid event_id
+        try:
+            gallery = await galleries.values(
+                'id', 'title', 'slug', 'description', 'photographer_id', 'cover_photo__image',
+                'event_id', 'event__name', 'event__slug', 'event__date', 'created_at', 'updated_at'
+            ).aget(slug=slug)
+        except Gallery.DoesNotExist:
+            return json_response(NOT_FOUND, status=404)
+
+        media_url = media_url_builder(request)
+        photos = Photo.objects.filter(gallery_id=gallery['id'], is_public=True)
+        lookups = [
+            agrid_photos(photos, request),
+            UploaderSerializer.aserialize_queryset(User.objects.filter(id=gallery['photographer_id'])),
+        ]
+        if not gallery['cover_photo__image']:
+            # No cover photo: the gallery's first public photo stands in
+            lookups.append(photos.values_list('image', flat=True).afirst())
+        photo_data, photographers, *fallback_cover = await asyncio.gather(*lookups)
+        cover = gallery['cover_photo__image'] or (fallback_cover[0] if fallback_cover else None)
+
+        event = None
+        if gallery['event_id']:
+            event = {
+                'id': gallery['event_id'],
+                'name': gallery['event__name'],
+                'slug': gallery['event__slug'],
+                'date': gallery['event__date'],
+            }
+        return json_response({
+            'id': gallery['id'],
+            'title': gallery['title'],
+            'slug': gallery['slug'],
+            'description': gallery['description'],
+            'photos': photo_data,
+            'event': event,
+            'photographer': photographers[0] if photographers else None,
+            'cover_photo': media_url(cover),
+            'created_at': gallery['created_at'],
+            'updated_at': gallery['updated_at'],
+        })
+
+
+class AsyncPublicPhotoListView(View):
+    """Async ``PublicPhotoListView``: a public gallery's public photos, cached per gallery revision."""
+
+    async def get(self, request, gallery_id):
+        last_update = (await Photo.objects.filter(
+            gallery_id=gallery_id,
+            is_public=True
+        ).aaggregate(last_update=Max('updated_at')))['last_update']
+        cache_key = public_photos_cache_key(gallery_id, last_update)
+
+        if request.GET.get('refresh_cache') != 'true':
+            cached_data = await cache.aget(cache_key)
+            if cached_data is not None:
+                return json_response(cached_data)
+
+        photos = Photo.objects.filter(
+            gallery_id=gallery_id,
+            is_public=True,
+            gallery__is_public=True
+        ).order_by('order', 'created_at')
+        response_data = await apublic_photos(photos, request)
+
+        await cache.aset(cache_key, response_data, timeout=60 * 60)  # 1 hour cache
+        return json_response(response_data)
@@ -23,6 +23,8 @@ User = get_user_model()
 from gallery.serializers import GalleryListSerializer, LikeSerializer
 from gallery import serializers
 from accounts.permissions import IsOwnerOrReadOnly, IsPhotographer, IsStaffOrSuperuser
+from config.auth_profiles import auth_profile
+from gallery.read_paths import public_photos
 
 class StatsView(APIView):
     """
@@ -362,11 +364,25 @@ class PhotoDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 
 class DownloadPhotoView(generics.CreateAPIView):
-    """View for downloading a photo (records the download)."""
+    """
+    View for downloading a photo.
+    
+    POST records the download and serves the file. GET only resumes a
+    download a POST recorded, within the resume window, so download
+    managers can fetch the missing bytes with Range/If-Range requests. It
+    has no side effects and so needs no CSRF protection; any other GET is
+    answered with 405.
+    """
     serializer_class = serializers.DownloadSerializer
     permission_classes = [permissions.IsAuthenticated]
     
+    def get(self, request, *args, **kwargs):
+        return self.serve(request, record=False)
+    
     def create(self, request, *args, **kwargs):
+        return self.serve(request, record=True)
+    
+    def serve(self, request, record):
         photo_id = self.kwargs.get('photo_id')
         try:
             photo = Photo.objects.get(id=photo_id)
@@ -384,53 +400,50 @@ class DownloadPhotoView(generics.CreateAPIView):
                     status=status.HTTP_403_FORBIDDEN
                 )
         
-        # Record the download
-        download = Download.objects.create(
-            user=request.user,
-            photo=photo,
-            ip_address=self.get_client_ip(request)
-        )
-        
-        # Log the download activity
-        from customer_dashboard.utils.activity_logger import log_user_activity
-        from customer_dashboard.models.activity import UserActivity
+        from config.file_delivery import download_started_at, is_resumed, not_modified, serve_file, start_download
         
-        log_user_activity(
-            user=request.user,
-            activity_type=UserActivity.ActivityType.PHOTO_DOWNLOAD,  # Use the enum value
-            obj=photo,
-            metadata={
-                'photo_id': str(photo.id),
-                'photo_title': getattr(photo, 'title', 'Untitled'),
-                'gallery_id': str(photo.gallery_id) if hasattr(photo, 'gallery_id') and photo.gallery_id else None,
-                'gallery_title': photo.gallery.title if hasattr(photo, 'gallery') and photo.gallery else None
-            }
-        )
+        etag = photo.etag
+        download_key = f'photo:{photo.id}:{etag}:user:{request.user.id}'
+        started_at = download_started_at(download_key)
+        if not record and not (started_at and (is_resumed(request, started_at) or not_modified(request, etag))):
+            return Response(
+                {"detail": "Start the download with POST; GET only resumes a started download."},
+                status=status.HTTP_405_METHOD_NOT_ALLOWED
+            )
+        # Resumed chunks and revalidations belong to a download already recorded
+        if record and not is_resumed(request, started_at) and not not_modified(request, etag):
+            start_download(download_key)
+            # Record the download
+            download = Download.objects.create(
+                user=request.user,
+                photo=photo,
+                ip_address=self.get_client_ip(request)
+            )
         
-        # Serve the file for download
-        from django.http import FileResponse
-        import os
+            # Log the download activity
+            from customer_dashboard.utils.activity_logger import log_user_activity
+            from customer_dashboard.models.activity import UserActivity
         
-        # Get the file path
-        file_path = photo.image.path
+            log_user_activity(
+                user=request.user,
+                activity_type=UserActivity.ActivityType.PHOTO_DOWNLOAD,  # Use the enum value
+                obj=photo,
+                metadata={
+                    'photo_id': str(photo.id),
+                    'photo_title': getattr(photo, 'title', 'Untitled'),
+                    'gallery_id': str(photo.gallery_id) if hasattr(photo, 'gallery_id') and photo.gallery_id else None,
+                    'gallery_title': photo.gallery.title if hasattr(photo, 'gallery') and photo.gallery else None
+                }
+            )
         
-        # Check if file exists
-        if not os.path.exists(file_path):
+        # Hand the transfer to the configured delivery backend
+        try:
+            return serve_file(request, photo.image, content_type=photo.mime_type or None, etag=etag)
+        except FileNotFoundError:
             return Response(
                 {"detail": "File not found"},
                 status=status.HTTP_404_NOT_FOUND
             )
-        
-        # Open the file and create a response
-        file = open(file_path, 'rb')
-        response = FileResponse(file)
-        
-        # Set the content type and headers for download
-        response['Content-Type'] = 'application/octet-stream'
-        response['Content-Disposition'] = f'attachment; filename="{os.path.basename(file_path)}"'
-        response['Content-Length'] = os.path.getsize(file_path)
-        
-        return response
     
     def get_client_ip(self, request):
         """Helper method to get the client's IP address."""
@@ -441,12 +454,79 @@ class DownloadPhotoView(generics.CreateAPIView):
             ip = request.META.get('REMOTE_ADDR')
         return ip
 
+class GalleryExportView(APIView):
+    """
+    Download every photo of a gallery the user is entitled to as one ZIP.
+    
+    The archive is streamed on the fly unless a pre-built copy for the same
+    photo set exists. ``?prebuild=1`` queues a background build instead and
+    returns 202; the client polls the same URL until the archive is served.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request, gallery_id, *args, **kwargs):
+        from django.core.files.storage import default_storage
+        from django.http import StreamingHttpResponse
+        from config.file_delivery import (
+            StoredFile, download_started_at, is_resumed, not_modified, serve_file, start_download
+        )
+        from gallery import export
+        from gallery.tasks import build_gallery_export
+        
+        gallery = get_object_or_404(Gallery, id=gallery_id)
+        photos = export.exportable_photos(gallery, request.user)
+        photo_ids = [str(photo_id) for photo_id in photos.values_list('id', flat=True)]
+        if not photo_ids:
+            return Response(
+                {"detail": "You don't have any photos to export from this gallery."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        digest = export.export_digest(photos)
+        etag = f'"{digest}"'
+        filename = export.archive_filename(gallery)
+        
+        prebuilt = export.prebuilt_archive(gallery.id, digest)
+        if prebuilt:
+            download_key = f'export:{gallery.id}:{digest}:user:{request.user.id}'
+            # Resumed chunks and revalidations belong to an export already recorded
+            if not is_resumed(request, download_started_at(download_key)) and not not_modified(request, etag):
+                start_download(download_key)
+                export.record_export(request.user, photos)
+            return serve_file(
+                request, StoredFile(prebuilt, default_storage),
+                filename=filename, content_type='application/zip', etag=etag
+            )
+        
+        if request.query_params.get('prebuild'):
+            # Polls while the archive is being built don't queue another build
+            if export.claim_build(gallery.id, digest):
+                try:
+                    build_gallery_export.delay(gallery.id, photo_ids, digest)
+                except Exception:
+                    export.release_build(gallery.id, digest)
+                    raise
+            return Response(
+                {"status": "building", "photos": len(photo_ids)},
+                status=status.HTTP_202_ACCEPTED
+            )
+        
+        export.record_export(request.user, photos)
+        response = StreamingHttpResponse(export.stream_archive(photos), content_type='application/zip')
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        # Let nginx pass chunks straight through
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
 class PublicGalleryListView(generics.ListAPIView):
     """
     View for listing public galleries with caching.
     Implements caching with 1-hour TTL and proper cache invalidation.
     """
     serializer_class = serializers.GalleryListSerializer
+    # Responses are cached for everyone, so there is no user to resolve
+    authentication_classes = auth_profile('public-anonymous')
     permission_classes = [permissions.AllowAny]
     
     def get_cache_key(self):
@@ -595,12 +675,22 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 import json
 
+def public_photos_cache_key(gallery_id, last_update=None):
+    """Cache key of a gallery's public photo list, versioned by its latest photo update."""
+    if last_update:
+        # Use the last update timestamp as part of the cache key
+        return f'gallery_photos_{gallery_id}_{int(last_update.timestamp())}'
+    return f'gallery_photos_{gallery_id}'
+
+
 class PublicPhotoListView(generics.ListAPIView):
     """
     View for listing public photos in a gallery with caching.
     Implements caching with 1-hour TTL and proper cache invalidation.
     """
     serializer_class = serializers.PhotoSerializer
+    # Responses are cached for everyone, so there is no user to resolve
+    authentication_classes = auth_profile('public-anonymous')
     permission_classes = [permissions.AllowAny]
     pagination_class = None
     
@@ -619,14 +709,12 @@ class PublicPhotoListView(generics.ListAPIView):
                 last_update=models.Max('updated_at')
             )['last_update']
             
-            if last_update:
-                # Use the last update timestamp as part of the cache key
-                return f'gallery_photos_{gallery_id}_{int(last_update.timestamp())}'
+            return public_photos_cache_key(gallery_id, last_update)
         except Exception as e:
             logger.warning(f"Could not get last update time for gallery {gallery_id}: {e}")
             
         # Fallback to a simpler key if we can't get the last update time
-        return f'gallery_photos_{gallery_id}'
+        return public_photos_cache_key(gallery_id)
     
     def get_queryset(self):
         gallery_id = self.kwargs.get('gallery_id')
@@ -638,6 +726,23 @@ class PublicPhotoListView(generics.ListAPIView):
             is_public=True,
             gallery__is_public=True
         ).order_by('order', 'created_at')
+    
+    def list(self, request, *args, **kwargs):
+        """Serve photos from tuples (see gallery.read_paths), cached per gallery revision."""
+        bypass_cache = request.query_params.get('refresh_cache') == 'true'
+        cache_key = self.get_cache_key()
+        
+        if cache_key and not bypass_cache:
+            cached_data = cache.get(cache_key)
+            if cached_data is not None:
+                return Response(cached_data)
+        
+        response_data = public_photos(self.filter_queryset(self.get_queryset()), request)
+        
+        if cache_key:
+            cache.set(cache_key, response_data, timeout=60 * 60)  # 1 hour cache
+            
+        return Response(response_data)
 
 
 class EventListView(generics.ListCreateAPIView):
@@ -710,6 +815,44 @@ class EventDetailView(generics.RetrieveUpdateDestroyAPIView):
 import logging
 logger = logging.getLogger(__name__)
 
+
+def search_events(queryset, search_query, category):
+    """Events of ``queryset`` matching every search term and the category, newest first."""
+    # Apply search filter if search query is provided
+    if search_query:
+        # Split the search query into individual words
+        search_terms = search_query.split()
+        
+        # Create a list to hold all the Q objects
+        q_objects = []
+        
+        # For each search term, create a Q object that searches in all relevant fields
+        for term in search_terms:
+            q_objects.append(
+                Q(name__icontains=term) |
+                Q(description__icontains=term) |
+                Q(location__icontains=term)
+            )
+        
+        # Combine all Q objects with AND operator to find events that match all search terms
+        # This means an event must contain all search terms (in any field) to be included
+        if q_objects:
+            # Start with the first Q object
+            combined_q = q_objects[0]
+            # Add remaining Q objects with AND operator
+            for q in q_objects[1:]:
+                combined_q &= q
+            # Apply the combined Q object to the queryset
+            queryset = queryset.filter(combined_q)
+    
+    # Apply category filter if provided
+    if category and category.lower() != 'all':
+        queryset = queryset.filter(category__iexact=category)
+    
+    # Order by date (newest first) and then by name
+    return queryset.order_by('-date', 'name')
+
+
 class PublicEventListView(generics.ListAPIView):
     """
     View for listing all events (no authentication required).
@@ -720,51 +863,17 @@ class PublicEventListView(generics.ListAPIView):
     - category: Filter events by category (exact match)
     """
     serializer_class = serializers.PublicEventSerializer
-    authentication_classes = []  # Disable all authentication
+    authentication_classes = auth_profile('public-anonymous')
     permission_classes = [permissions.AllowAny]  # Explicitly allow any user
     pagination_class = None
     
     def get_queryset(self):
         """Return filtered and ordered events."""
-        queryset = Event.objects.all()
-        
-        # Get search parameters
-        search_query = self.request.query_params.get('search', '').strip()
-        category = self.request.query_params.get('category', '').strip()
-        
-        # Apply search filter if search query is provided
-        if search_query:
-            # Split the search query into individual words
-            search_terms = search_query.split()
-            
-            # Create a list to hold all the Q objects
-            q_objects = []
-            
-            # For each search term, create a Q object that searches in all relevant fields
-            for term in search_terms:
-                q_objects.append(
-                    Q(name__icontains=term) |
-                    Q(description__icontains=term) |
-                    Q(location__icontains=term)
-                )
-            
-            # Combine all Q objects with AND operator to find events that match all search terms
-            # This means an event must contain all search terms (in any field) to be included
-            if q_objects:
-                # Start with the first Q object
-                combined_q = q_objects[0]
-                # Add remaining Q objects with AND operator
-                for q in q_objects[1:]:
-                    combined_q &= q
-                # Apply the combined Q object to the queryset
-                queryset = queryset.filter(combined_q)
-        
-        # Apply category filter if provided
-        if category and category.lower() != 'all':
-            queryset = queryset.filter(category__iexact=category)
-        
-        # Order by date (newest first) and then by name
-        return queryset.order_by('-date', 'name')
+        return search_events(
+            Event.objects.all(),
+            self.request.query_params.get('search', '').strip(),
+            self.request.query_params.get('category', '').strip()
+        )
     
     def get_serializer_context(self):
         """Add request to serializer context."""
@@ -10,6 +10,7 @@ import logging
 
 from ..models import Event, EventRegistration
 from ..ticket_models.models import EventTicket, TicketType
+from .. import availability
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
@@ -185,6 +186,19 @@ class EventWithTicketsViewSet(viewsets.ReadOnlyModelViewSet):
             'covers'  # Prefetch cover images
         ).distinct()
         
+    def list(self, request, *args, **kwargs):
+        """Answer from the availability snapshot, falling back to the database on a cache miss."""
+        snapshots = availability.get_snapshots()
+        if snapshots is None:
+            availability.schedule_rebuild()
+            return super().list(request, *args, **kwargs)
+        
+        rows = availability.events_with_tickets_rows(snapshots, request)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(rows)
+        
     def get_serializer_context(self):
         """
         Extra context provided to the serializer class.
@@ -358,3 +372,16 @@ class AvailableTicketsViewSet(viewsets.ReadOnlyModelViewSet):
             sale_start__lte=now,  # Sale has started
             sale_end__gte=now,    # Sale hasn't ended
         ).select_related('event', 'ticket_type').order_by('event__date')
+    
+    def list(self, request, *args, **kwargs):
+        """Answer from the availability snapshot, falling back to the database on a cache miss."""
+        snapshots = availability.get_snapshots()
+        if snapshots is None:
+            availability.schedule_rebuild()
+            return super().list(request, *args, **kwargs)
+        
+        rows = availability.available_ticket_rows(snapshots)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(rows)
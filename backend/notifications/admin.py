@@ -0,0 +1,37 @@
+from django.contrib import admin
+from .models import EmailContent, OutboundEmail, NotificationFanout
+
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('to_email', 'subject', 'status', 'attempts', 'next_attempt_at', 'sent_at', 'created_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('to_email', 'content__subject')
+    readonly_fields = ('created_at', 'sent_at', 'claimed_at', 'last_error')
+    list_select_related = ('content',)
+    actions = ['retry_now']
+
+    def subject(self, obj):
+        return obj.content.subject
+    subject.admin_order_field = 'content__subject'
+
+    @admin.action(description='Retry selected emails now')
+    def retry_now(self, request, queryset):
+        from django.utils import timezone
+        updated = queryset.exclude(status=OutboundEmail.STATUS_SENT).update(
+            status=OutboundEmail.STATUS_PENDING, next_attempt_at=timezone.now()
+        )
+        self.message_user(request, f'{updated} email(s) queued for retry.')
+
+
+@admin.register(EmailContent)
+class EmailContentAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'created_at')
+    search_fields = ('subject',)
+
+
+@admin.register(NotificationFanout)
+class NotificationFanoutAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'object_id', 'status', 'chunks_dispatched', 'recipients_queued', 'created_at', 'completed_at')
+    list_filter = ('kind', 'status')
+    readonly_fields = ('cursor', 'chunks_dispatched', 'recipients_queued', 'created_at', 'updated_at', 'completed_at')
@@ -0,0 +1,134 @@
+"""
+Chunked fan-out of notifications to every subscribed user.
+
+A coordinator task walks the recipients with a keyset-paged query
+(``id > cursor ORDER BY id LIMIT n``), hands each page to a chunk task and
+checkpoints the cursor on the ``NotificationFanout`` row. Chunk tasks run in
+parallel and queue outbox emails keyed by ``<kind>:<object>:<user>``, so a
+chunk replayed after a crash never mails anyone twice.
+"""
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .models import NotificationFanout
+from . import outbox
+
+logger = logging.getLogger(__name__)
+
+
+def _chunk_size():
+    return getattr(settings, 'NOTIFICATION_FANOUT_CHUNK_SIZE', 500)
+
+
+def _pages_per_run():
+    return getattr(settings, 'NOTIFICATION_FANOUT_PAGES_PER_RUN', 20)
+
+
+def gallery_recipients():
+    from accounts.models import CustomUser
+
+    return CustomUser.objects.filter(
+        is_active=True,
+        notification_preferences__new_gallery_emails=True
+    )
+
+
+def render_gallery_content(gallery):
+    """Render the new gallery email once for the whole fan-out."""
+    context = {
+        'gallery': gallery,
+        'event': gallery.event,
+        'site_name': 'EvenPng',  # Fixed site name
+        'frontend_url': getattr(settings, 'FRONTEND_URL', 'https://eventpng.com'),
+        'site_url': getattr(settings, 'SITE_URL', 'https://eventpng.com'),
+    }
+    html_content = render_to_string('emails/new_gallery_notification.html', context)
+    return outbox.create_content(
+        f'New Gallery Available: {gallery.title}',
+        text_body=html_content,
+        html_body=html_content,
+    )
+
+
+def start_gallery_fanout(gallery):
+    """
+    Create (or return) the fan-out job for ``gallery``.
+
+    The unique (kind, object_id) row is what de-duplicates notifications: a
+    gallery toggled public twice reuses the existing job.
+    """
+    job, created = NotificationFanout.objects.get_or_create(
+        kind=NotificationFanout.KIND_NEW_GALLERY,
+        object_id=str(gallery.pk),
+    )
+    if job.content_id is None:
+        job.content = render_gallery_content(gallery)
+        job.save(update_fields=['content', 'updated_at'])
+    return job, created
+
+
+def dispatch_pages(job):
+    """
+    Dispatch up to a run's worth of recipient pages for ``job``.
+
+    Returns True when every recipient has been dispatched, False when pages
+    remain, and None when another coordinator took over. The cursor is
+    advanced with a compare-and-set so two coordinators can't keep walking
+    the same pages.
+    """
+    from .tasks import send_fanout_chunk
+
+    if job.kind != NotificationFanout.KIND_NEW_GALLERY:
+        raise ValueError(f"Unknown fan-out kind {job.kind}")
+
+    recipients = gallery_recipients()
+    chunk_size = _chunk_size()
+
+    for _ in range(_pages_per_run()):
+        page = list(
+            recipients.filter(id__gt=job.cursor).order_by('id').values_list('id', 'email')[:chunk_size]
+        )
+        if not page:
+            NotificationFanout.objects.filter(pk=job.pk).update(
+                status=NotificationFanout.STATUS_COMPLETED,
+                completed_at=timezone.now(),
+                updated_at=timezone.now(),
+            )
+            return True
+
+        # Dispatch before checkpointing: a crash in between replays the
+        # page, which the outbox dedupe keys turn into a no-op
+        send_fanout_chunk.delay(job.pk, [list(row) for row in page])
+
+        next_cursor = page[-1][0]
+        advanced = NotificationFanout.objects.filter(pk=job.pk, cursor=job.cursor).update(
+            cursor=next_cursor,
+            chunks_dispatched=F('chunks_dispatched') + 1,
+            updated_at=timezone.now(),
+        )
+        if not advanced:
+            # Another coordinator moved the cursor; let it carry on
+            return None
+        job.cursor = next_cursor
+
+    return False
+
+
+def queue_chunk(job, rows):
+    """Queue outbox emails for one chunk of ``(user_id, email)`` rows."""
+    recipients = [
+        (email, f'{job.kind}:{job.object_id}:{user_id}') for user_id, email in rows
+    ]
+    with transaction.atomic():
+        # Chunks of a job take turns, so a replayed chunk counts only the rows it inserted
+        list(NotificationFanout.objects.select_for_update().filter(pk=job.pk).values_list('pk', flat=True))
+        queued = outbox.enqueue_for_content(job.content, recipients)
+        NotificationFanout.objects.filter(pk=job.pk).update(
+            recipients_queued=F('recipients_queued') + queued
+        )
+    return queued
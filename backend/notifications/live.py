@@ -0,0 +1,214 @@
+"""
+Live events pushed to a user: a paid order, issued tickets, processed photos.
+
+``publish`` appends an event to the user's Redis stream, which keeps the
+last ``STREAM_MAXLEN`` events for ``LIVE_EVENTS_RETENTION_SECONDS``. It
+also publishes the event on the user's pub/sub channel. Clients read
+events in one of two ways:
+
+- Server-sent events from ``EventStreamView``. Under ASGI, each event
+  loop holds one pub/sub connection (``Hub``), which fans the user
+  channels out to the streams open on that worker. A stream lasts
+  ``LIVE_EVENTS_STREAM_SECONDS``, since Django 4.2 doesn't notice
+  disconnected clients. ``EventSource`` then reconnects with
+  ``Last-Event-ID``, and the events it missed are replayed from the
+  stream. Under WSGI a stream would hold a thread per client, so the
+  view serves a single long-poll window and the client reconnects.
+- JSON long polling from ``EventPollView``, with a blocking ``XREAD``.
+
+Both endpoints authenticate with a signed token from ``issue_token``.
+Checking the token needs no database or Redis lookup. Publishing is best
+effort: the database stays authoritative, so errors are only logged.
+"""
+import asyncio
+import json
+import logging
+import re
+import weakref
+
+from django.conf import settings
+from django.core import signing
+
+from config.redis_client import get_async_redis, get_redis
+
+logger = logging.getLogger(__name__)
+
+ORDER_PAID = 'order.paid'
+PAYMENT_FAILED = 'payment.failed'
+TICKET_ISSUED = 'ticket.issued'
+PHOTO_PROCESSED = 'photo.processed'
+
+STREAM_KEY = 'live:user:{}:events'
+CHANNEL = 'live:user:{}'
+STREAM_MAXLEN = 100
+# Listeners buffer this many events; a slower one catches up from the stream after reconnecting
+QUEUE_SIZE = 100
+KEEPALIVE_SECONDS = 15
+RETRY_MILLISECONDS = 1000
+
+TOKEN_SALT = 'notifications.live-events'
+EVENT_ID = re.compile(r'^\d+-\d+$')
+
+
+def issue_token(user_id):
+    return signing.dumps(user_id, salt=TOKEN_SALT)
+
+
+def user_from_token(token):
+    """The user id signed into ``token``, or None if it's invalid or expired."""
+    try:
+        return signing.loads(token, salt=TOKEN_SALT, max_age=settings.LIVE_EVENTS_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return None
+
+
+def clean_event_id(value):
+    """``value`` if it's a stream entry id, else None."""
+    return value if value and EVENT_ID.match(value) else None
+
+
+def publish(user_id, event, data):
+    """Push ``event`` to ``user_id``; returns its id, or None if Redis was unavailable."""
+    if user_id is None:
+        return None
+    try:
+        client = get_redis()
+        key = STREAM_KEY.format(user_id)
+        payload = json.dumps(data, default=str)
+        event_id = client.xadd(key, {'event': event, 'data': payload}, maxlen=STREAM_MAXLEN, approximate=True).decode()
+        pipe = client.pipeline()
+        pipe.expire(key, settings.LIVE_EVENTS_RETENTION_SECONDS)
+        pipe.publish(CHANNEL.format(user_id), json.dumps({'id': event_id, 'event': event, 'data': payload}))
+        pipe.execute()
+        return event_id
+    except Exception as e:
+        logger.error(f"Error publishing {event} event to user {user_id}: {str(e)}")
+        return None
+
+
+def _entries(entries):
+    return [
+        {'id': event_id.decode(), 'event': fields[b'event'].decode(), 'data': fields[b'data'].decode()}
+        for event_id, fields in entries
+    ]
+
+
+def read(user_id, last_id=None, wait=0):
+    """
+    Events after ``last_id``, waiting up to ``wait`` seconds for one.
+    Without ``last_id`` only new events are returned. Returns the events
+    and the id to read from next.
+    """
+    client = get_redis()
+    key = STREAM_KEY.format(user_id)
+    if last_id is None:
+        newest = client.xrevrange(key, count=1)
+        last_id = newest[0][0].decode() if newest else '0-0'
+    # block=0 would wait forever
+    block = int(wait * 1000) if wait > 0 else None
+    response = client.xread({key: last_id}, count=STREAM_MAXLEN, block=block)
+    events = _entries(response[0][1]) if response else []
+    return events, events[-1]['id'] if events else last_id
+
+
+def frame(event):
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {event['data']}\n\n"
+
+
+def _after(event_id, last_id):
+    return tuple(map(int, event_id.split('-'))) > tuple(map(int, last_id.split('-')))
+
+
+class Hub:
+    """One pub/sub connection per event loop, fanning user channels out to local listeners."""
+
+    def __init__(self):
+        self.pubsub = get_async_redis().pubsub(ignore_subscribe_messages=True)
+        self.listeners = {}
+        self.reader = None
+
+    async def subscribe(self, user_id):
+        channel = CHANNEL.format(user_id)
+        queue = asyncio.Queue(QUEUE_SIZE)
+        listeners = self.listeners.setdefault(channel, set())
+        listeners.add(queue)
+        if len(listeners) == 1:
+            await self.pubsub.subscribe(channel)
+        if self.reader is None or self.reader.done():
+            self.reader = asyncio.create_task(self.read())
+        return queue
+
+    async def unsubscribe(self, user_id, queue):
+        channel = CHANNEL.format(user_id)
+        listeners = self.listeners.get(channel, set())
+        listeners.discard(queue)
+        if not listeners and self.listeners.pop(channel, None) is not None:
+            await self.pubsub.unsubscribe(channel)
+
+    async def read(self):
+        # Stops once nobody listens; the next subscribe starts it again
+        while self.listeners:
+            try:
+                message = await self.pubsub.get_message(timeout=1.0)
+            except Exception as e:
+                logger.error(f"Error reading live events: {str(e)}")
+                await asyncio.sleep(1)
+                continue
+            if message is None:
+                continue
+            for queue in self.listeners.get(message['channel'].decode(), ()):
+                try:
+                    queue.put_nowait(json.loads(message['data']))
+                except asyncio.QueueFull:
+                    pass
+
+
+_hubs = weakref.WeakKeyDictionary()
+
+
+def get_hub():
+    loop = asyncio.get_running_loop()
+    hub = _hubs.get(loop)
+    if hub is None:
+        hub = _hubs[loop] = Hub()
+    return hub
+
+
+async def _replay(user_id, last_id):
+    entries = await get_async_redis().xrange(STREAM_KEY.format(user_id), min=f'({last_id}', count=STREAM_MAXLEN)
+    return _entries(entries)
+
+
+async def astream(user_id, last_id, duration):
+    """Server-sent events for ``user_id`` for ``duration`` seconds, from after ``last_id``."""
+    hub = get_hub()
+    queue = await hub.subscribe(user_id)
+    try:
+        yield f'retry: {RETRY_MILLISECONDS}\n\n'
+        if last_id:
+            for event in await _replay(user_id, last_id):
+                yield frame(event)
+                last_id = event['id']
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + duration
+        while (remaining := deadline - loop.time()) > 0:
+            try:
+                event = await asyncio.wait_for(queue.get(), min(remaining, KEEPALIVE_SECONDS))
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            # Already sent by the replay
+            if last_id and not _after(event['id'], last_id):
+                continue
+            yield frame(event)
+            last_id = event['id']
+    finally:
+        await hub.unsubscribe(user_id, queue)
+
+
+def stream_once(user_id, last_id, wait):
+    """Server-sent events for a single long-poll window, for WSGI."""
+    yield f'retry: {RETRY_MILLISECONDS}\n\n'
+    events, _ = read(user_id, last_id, wait)
+    for event in events:
+        yield frame(event)
@@ -0,0 +1,38 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboundemail',
+            name='dedupe_key',
+            field=models.CharField(blank=True, help_text='Set for fan-out emails so each recipient is queued at most once', max_length=191, null=True, unique=True),
+        ),
+        migrations.CreateModel(
+            name='NotificationFanout',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('new_gallery', 'New gallery')], max_length=50)),
+                ('object_id', models.CharField(max_length=64)),
+                ('status', models.CharField(choices=[('running', 'Running'), ('completed', 'Completed')], default='running', max_length=20)),
+                ('cursor', models.BigIntegerField(default=0, help_text='Last user id dispatched')),
+                ('chunks_dispatched', models.PositiveIntegerField(default=0)),
+                ('recipients_queued', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('content', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='fanouts', to='notifications.emailcontent')),
+            ],
+            options={
+                'verbose_name': 'Notification Fan-out',
+                'verbose_name_plural': 'Notification Fan-outs',
+                'unique_together': {('kind', 'object_id')},
+            },
+        ),
+    ]
@@ -0,0 +1,124 @@
+from django.db import models
+from django.utils import timezone
+
+
+class EmailContent(models.Model):
+    """
+    Rendered subject and bodies of an email.
+
+    Rendered once and shared by every ``OutboundEmail`` of the same batch, so
+    a notification sent to thousands of subscribers is rendered and stored
+    once.
+    """
+    subject = models.CharField(max_length=255)
+    text_body = models.TextField(blank=True)
+    html_body = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Email Content'
+        verbose_name_plural = 'Email Contents'
+
+    def __str__(self):
+        return self.subject
+
+
+class OutboundEmail(models.Model):
+    """
+    A single queued email in the outbox, drained by Celery workers.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_SENDING = 'sending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENDING, 'Sending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    content = models.ForeignKey(
+        EmailContent,
+        on_delete=models.CASCADE,
+        related_name='emails'
+    )
+    to_email = models.EmailField()
+    from_email = models.CharField(max_length=255, blank=True)
+    reply_to = models.CharField(max_length=255, blank=True)
+    attachments = models.JSONField(
+        default=list,
+        blank=True,
+        help_text='List of {"name", "path", "mimetype"}; path is a media storage name'
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    dedupe_key = models.CharField(
+        max_length=191,
+        unique=True,
+        null=True,
+        blank=True,
+        help_text='Set for fan-out emails so each recipient is queued at most once'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Outbound Email'
+        verbose_name_plural = 'Outbound Emails'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='notif_outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.to_email} - {self.get_status_display()}"
+
+
+class NotificationFanout(models.Model):
+    """
+    Progress of a notification fanned out to every subscribed user.
+
+    One row per (kind, object) de-duplicates the notification, and ``cursor``
+    checkpoints the last user id dispatched, so a crashed job resumes where it
+    stopped instead of starting over.
+    """
+    KIND_NEW_GALLERY = 'new_gallery'
+    KIND_CHOICES = [
+        (KIND_NEW_GALLERY, 'New gallery'),
+    ]
+
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_CHOICES = [
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_COMPLETED, 'Completed'),
+    ]
+
+    kind = models.CharField(max_length=50, choices=KIND_CHOICES)
+    object_id = models.CharField(max_length=64)
+    content = models.ForeignKey(
+        EmailContent,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='fanouts'
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_RUNNING)
+    cursor = models.BigIntegerField(default=0, help_text='Last user id dispatched')
+    chunks_dispatched = models.PositiveIntegerField(default=0)
+    recipients_queued = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Notification Fan-out'
+        verbose_name_plural = 'Notification Fan-outs'
+        unique_together = ('kind', 'object_id')
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.object_id} - {self.get_status_display()}"
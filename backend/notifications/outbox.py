@@ -0,0 +1,258 @@
+"""
+Transactional email outbox.
+
+Code that used to send mail inline now calls ``enqueue_email``, which stores
+the rendered content and one ``OutboundEmail`` row per recipient inside the
+caller's transaction. Celery workers drain the outbox with ``drain``,
+sending each batch over a single SMTP connection and retrying failures with
+exponential backoff.
+"""
+import logging
+import random
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import EmailContent, OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+METRICS_KEY = 'email_outbox:metrics'
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _attachment_specs(attachments):
+    return [
+        {'name': name, 'path': path, 'mimetype': mimetype}
+        for name, path, mimetype in (attachments or [])
+    ]
+
+
+def create_content(subject, text_body='', html_body=''):
+    """Store rendered content to be shared by one or more queued emails."""
+    return EmailContent.objects.create(
+        subject=subject,
+        text_body=text_body or '',
+        html_body=html_body or '',
+    )
+
+
+def enqueue_for_content(content, recipients, from_email=None, reply_to=None, attachments=None):
+    """
+    Queue emails for existing ``content``.
+
+    ``recipients`` is a list of email addresses or ``(email, dedupe_key)``
+    pairs. Rows whose dedupe key was already queued are skipped, so a chunk
+    of a fan-out can safely be queued twice. Returns the number of rows
+    inserted; callers that can race on the same keys should serialize on a
+    lock of their own for the count to be exact.
+    """
+    from_email = from_email or _setting('DEFAULT_FROM_EMAIL', 'noreply@example.com')
+    attachment_specs = _attachment_specs(attachments)
+    rows = []
+    for recipient in recipients:
+        email, dedupe_key = recipient if isinstance(recipient, (list, tuple)) else (recipient, None)
+        if not email:
+            continue
+        rows.append(OutboundEmail(
+            content=content,
+            to_email=email,
+            from_email=from_email,
+            reply_to=reply_to or '',
+            attachments=attachment_specs,
+            dedupe_key=dedupe_key,
+        ))
+    if not rows:
+        return 0
+
+    # ignore_conflicts doesn't report which rows it dropped
+    dedupe_keys = [row.dedupe_key for row in rows if row.dedupe_key]
+    existing = OutboundEmail.objects.filter(dedupe_key__in=dedupe_keys).count() if dedupe_keys else 0
+    OutboundEmail.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+    schedule_drain()
+    return len(rows) - existing
+
+
+def enqueue_email(recipients, subject, text_body='', html_body='', from_email=None,
+                  reply_to=None, attachments=None):
+    """
+    Queue one email per recipient sharing the same rendered content.
+
+    ``attachments`` is a list of ``(name, storage_path, mimetype)`` tuples
+    read from media storage when the email is sent. Returns the number of
+    emails queued. A drain is scheduled once the surrounding transaction
+    commits.
+    """
+    recipients = [email for email in recipients if email]
+    if not recipients:
+        return 0
+
+    with transaction.atomic():
+        content = create_content(subject, text_body, html_body)
+        return enqueue_for_content(
+            content, recipients, from_email=from_email, reply_to=reply_to, attachments=attachments
+        )
+
+
+def schedule_drain():
+    """Kick a worker after commit; the beat task covers a broker outage."""
+    from .tasks import drain_email_outbox
+
+    def _drain():
+        try:
+            drain_email_outbox.delay()
+        except Exception as e:
+            logger.error(f"Could not schedule email outbox drain: {str(e)}")
+
+    transaction.on_commit(_drain)
+
+
+def _claim(batch_size):
+    """Lock a batch of due emails and mark them as sending."""
+    now = timezone.now()
+    stale = now - timedelta(seconds=_setting('EMAIL_OUTBOX_CLAIM_TIMEOUT', 600))
+
+    # Emails claimed by a worker that died mid-batch go back to the queue
+    OutboundEmail.objects.filter(
+        status=OutboundEmail.STATUS_SENDING, claimed_at__lt=stale
+    ).update(status=OutboundEmail.STATUS_PENDING)
+
+    with transaction.atomic():
+        ids = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=OutboundEmail.STATUS_PENDING, next_attempt_at__lte=now)
+            .order_by('id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if ids:
+            OutboundEmail.objects.filter(id__in=ids).update(
+                status=OutboundEmail.STATUS_SENDING, claimed_at=now
+            )
+    return ids
+
+
+def _read_attachment(spec, cached):
+    path = spec['path']
+    if path not in cached:
+        with default_storage.open(path, 'rb') as f:
+            cached[path] = f.read()
+    return cached[path]
+
+
+def _build_message(email, connection, attachment_cache):
+    content = email.content
+    message = EmailMultiAlternatives(
+        subject=content.subject,
+        body=content.text_body or content.html_body,
+        from_email=email.from_email or None,
+        to=[email.to_email],
+        reply_to=[email.reply_to] if email.reply_to else None,
+        connection=connection,
+    )
+    if content.html_body:
+        message.attach_alternative(content.html_body, 'text/html')
+    for spec in email.attachments:
+        message.attach(spec['name'], _read_attachment(spec, attachment_cache), spec.get('mimetype'))
+    return message
+
+
+def _backoff(attempts):
+    base = _setting('EMAIL_OUTBOX_RETRY_BASE_SECONDS', 60)
+    delay = min(base * (2 ** (attempts - 1)), _setting('EMAIL_OUTBOX_RETRY_MAX_SECONDS', 6 * 3600))
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def _record_metrics(sent, failed, elapsed):
+    rate = sent / elapsed if elapsed > 0 else 0.0
+    try:
+        metrics = cache.get(METRICS_KEY) or {'total_sent': 0, 'total_failed': 0}
+        metrics.update({
+            'total_sent': metrics.get('total_sent', 0) + sent,
+            'total_failed': metrics.get('total_failed', 0) + failed,
+            'last_batch_sent': sent,
+            'last_batch_failed': failed,
+            'last_batch_seconds': round(elapsed, 3),
+            'last_batch_per_second': round(rate, 2),
+            'last_batch_at': timezone.now().isoformat(),
+        })
+        cache.set(METRICS_KEY, metrics, None)
+    except Exception as e:
+        logger.error(f"Error recording email outbox metrics: {str(e)}")
+    logger.info(f"Email outbox batch: {sent} sent, {failed} failed in {elapsed:.2f}s ({rate:.1f}/s)")
+
+
+def get_metrics():
+    """Throughput counters of the outbox drains plus the current backlog."""
+    metrics = dict(cache.get(METRICS_KEY) or {})
+    metrics['pending'] = OutboundEmail.objects.filter(status=OutboundEmail.STATUS_PENDING).count()
+    metrics['failed'] = OutboundEmail.objects.filter(status=OutboundEmail.STATUS_FAILED).count()
+    return metrics
+
+
+def drain(batch_size=None):
+    """
+    Send one batch of due emails over a single SMTP connection.
+
+    Returns the number of emails claimed, so callers can loop until it is 0.
+    """
+    batch_size = batch_size or _setting('EMAIL_OUTBOX_BATCH_SIZE', 100)
+    ids = _claim(batch_size)
+    if not ids:
+        return 0
+
+    started = time.monotonic()
+    emails = list(OutboundEmail.objects.filter(id__in=ids).select_related('content').order_by('id'))
+    max_attempts = _setting('EMAIL_OUTBOX_MAX_ATTEMPTS', 5)
+    sent_ids = []
+    failures = []
+    attachment_cache = {}
+
+    connection = get_connection()
+    try:
+        connection.open()
+        for email in emails:
+            try:
+                message = _build_message(email, connection, attachment_cache)
+                connection.send_messages([message])
+                sent_ids.append(email.id)
+            except Exception as e:
+                failures.append((email, str(e)))
+    except Exception as e:
+        # Could not even connect: the whole remainder of the batch is retried
+        handled = set(sent_ids) | {email.id for email, _ in failures}
+        failures.extend((email, str(e)) for email in emails if email.id not in handled)
+    finally:
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    now = timezone.now()
+    if sent_ids:
+        OutboundEmail.objects.filter(id__in=sent_ids).update(
+            status=OutboundEmail.STATUS_SENT, sent_at=now, claimed_at=None, last_error=''
+        )
+    for email, error in failures:
+        attempts = email.attempts + 1
+        give_up = attempts >= max_attempts
+        OutboundEmail.objects.filter(id=email.id).update(
+            status=OutboundEmail.STATUS_FAILED if give_up else OutboundEmail.STATUS_PENDING,
+            attempts=attempts,
+            next_attempt_at=now if give_up else now + _backoff(attempts),
+            claimed_at=None,
+            last_error=error[:2000],
+        )
+        log = logger.error if give_up else logger.warning
+        log(f"Email {email.id} to {email.to_email} failed (attempt {attempts}): {error}")
+
+    _record_metrics(len(sent_ids), len(failures), time.monotonic() - started)
+    return len(emails)
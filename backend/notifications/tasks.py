@@ -0,0 +1,91 @@
+from celery import shared_task
+from django.conf import settings
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+@shared_task
+def drain_email_outbox():
+    """
+    Task to send queued emails in batches until the outbox is empty or the
+    time budget runs out
+    """
+    from notifications import outbox
+
+    budget = getattr(settings, 'EMAIL_OUTBOX_DRAIN_SECONDS', 50)
+    deadline = time.monotonic() + budget
+    total = 0
+
+    try:
+        while time.monotonic() < deadline:
+            claimed = outbox.drain()
+            if not claimed:
+                break
+            total += claimed
+        return total
+
+    except Exception as e:
+        logger.error(f"Error draining email outbox: {str(e)}")
+        return total
+
+@shared_task
+def run_notification_fanout(job_id):
+    """
+    Task to dispatch the next pages of a fan-out job, re-queueing itself
+    until every recipient has been dispatched
+    """
+    from notifications import fanout
+    from notifications.models import NotificationFanout
+
+    try:
+        job = NotificationFanout.objects.get(pk=job_id)
+        if job.status == NotificationFanout.STATUS_COMPLETED:
+            return True
+        if fanout.dispatch_pages(job) is False:
+            run_notification_fanout.delay(job_id)
+        return True
+
+    except Exception as e:
+        logger.error(f"Error running notification fan-out {job_id}: {str(e)}")
+        return False
+
+@shared_task(bind=True, autoretry_for=(Exception,), retry_backoff=True, retry_kwargs={'max_retries': 8}, acks_late=True)
+def send_fanout_chunk(self, job_id, rows):
+    """
+    Task to queue outbox emails for one chunk of fan-out recipients. The
+    coordinator has already moved its cursor past the chunk, so failures
+    are retried and the message is only acked once the chunk is queued
+    """
+    from notifications import fanout
+    from notifications.models import NotificationFanout
+
+    try:
+        job = NotificationFanout.objects.select_related('content').get(pk=job_id)
+        return fanout.queue_chunk(job, rows)
+
+    except Exception as e:
+        logger.error(f"Error queueing fan-out chunk for job {job_id}: {str(e)}")
+        raise
+
+@shared_task
+def resume_stalled_fanouts():
+    """
+    Task to restart fan-out jobs whose coordinator stopped making progress
+    """
+    from datetime import timedelta
+    from django.utils import timezone
+    from notifications.models import NotificationFanout
+
+    stalled_before = timezone.now() - timedelta(
+        seconds=getattr(settings, 'NOTIFICATION_FANOUT_STALL_SECONDS', 600)
+    )
+    job_ids = list(
+        NotificationFanout.objects.filter(
+            status=NotificationFanout.STATUS_RUNNING, updated_at__lt=stalled_before
+        ).values_list('id', flat=True)
+    )
+    for job_id in job_ids:
+        logger.warning(f"Resuming stalled notification fan-out {job_id}")
+        run_notification_fanout.delay(job_id)
+    return len(job_ids)
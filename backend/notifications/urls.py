@@ -0,0 +1,11 @@
+from django.urls import path
+
+from .views import EventPollView, EventStreamView, LiveEventsTokenView
+
+app_name = 'notifications'
+
+urlpatterns = [
+    path('token/', LiveEventsTokenView.as_view(), name='live-events-token'),
+    path('stream/', EventStreamView.as_view(), name='live-events-stream'),
+    path('poll/', EventPollView.as_view(), name='live-events-poll'),
+]
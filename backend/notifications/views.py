@@ -0,0 +1,71 @@
+import json
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from . import live
+
+INVALID_TOKEN = {'detail': 'Invalid or expired live events token.'}
+
+
+class LiveEventsTokenView(APIView):
+    """Token for the live event endpoints, which ``EventSource`` can't send headers to."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        return Response({
+            'token': live.issue_token(request.user.id),
+            'expires_in': settings.LIVE_EVENTS_TOKEN_MAX_AGE
+        })
+
+
+class EventStreamView(View):
+    """
+    Server-sent events for the token's user. Under ASGI the stream stays
+    open for ``LIVE_EVENTS_STREAM_SECONDS``; under WSGI it covers one
+    long-poll window. Either way ``EventSource`` reconnects on its own.
+    """
+
+    async def get(self, request):
+        user_id = live.user_from_token(request.GET.get('token', ''))
+        if user_id is None:
+            return JsonResponse(INVALID_TOKEN, status=401)
+        last_id = live.clean_event_id(request.headers.get('Last-Event-ID') or request.GET.get('last_id'))
+
+        if isinstance(request, ASGIRequest):
+            events = live.astream(user_id, last_id, settings.LIVE_EVENTS_STREAM_SECONDS)
+        else:
+            events = live.stream_once(user_id, last_id, settings.LIVE_EVENTS_POLL_SECONDS)
+        response = StreamingHttpResponse(events, content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # Stops nginx from buffering the stream
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
+class EventPollView(View):
+    """
+    Long-poll fallback: the token's events after ``last_id``, waiting up to
+    ``wait`` seconds (capped at ``LIVE_EVENTS_POLL_SECONDS``) for one. Pass
+    the returned ``last_id`` to the next poll.
+    """
+
+    def get(self, request):
+        user_id = live.user_from_token(request.GET.get('token', ''))
+        if user_id is None:
+            return JsonResponse(INVALID_TOKEN, status=401)
+        try:
+            wait = min(float(request.GET.get('wait', settings.LIVE_EVENTS_POLL_SECONDS)), settings.LIVE_EVENTS_POLL_SECONDS)
+        except ValueError:
+            wait = 0
+
+        events, last_id = live.read(user_id, live.clean_event_id(request.GET.get('last_id')), wait)
+        return JsonResponse({
+            'events': [{**event, 'data': json.loads(event['data'])} for event in events],
+            'last_id': last_id
+        })
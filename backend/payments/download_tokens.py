@@ -0,0 +1,140 @@
+"""
+Order-scoped download tokens.
+
+Instead of one ``DownloadToken`` row per (order, photo), a paid order gets a
+single signed token naming the order, a bitmap of the photos it covers and
+an expiry. Checking a token is a signature check plus one query for the
+order's items, however many photos are validated at once; nothing is
+written per photo.
+
+Bit ``i`` of the bitmap stands for the order's ``i``-th item ordered by
+``(created_at, id)``. Paid orders don't change their items, and the token
+carries the item count so any change invalidates it. A refund revokes the
+token because only paid orders are looked up.
+
+The legacy per-row tokens keep working; ``validate_legacy`` and
+``mark_legacy_used`` handle them in batches.
+"""
+import base64
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.utils import timezone
+
+from .models import DownloadToken, Order, OrderItem
+
+SALT = 'payments.order-download-token'
+
+
+class InvalidDownloadToken(Exception):
+    pass
+
+
+def _lifetime():
+    return timedelta(seconds=getattr(settings, 'ORDER_DOWNLOAD_TOKEN_LIFETIME', 7 * 24 * 3600))
+
+
+def _encode_bitmap(positions, size):
+    bitmap = bytearray((size + 7) // 8)
+    for position in positions:
+        bitmap[position // 8] |= 1 << (position % 8)
+    return base64.urlsafe_b64encode(bytes(bitmap)).decode().rstrip('=')
+
+
+def _decode_bitmap(value, size):
+    bitmap = base64.urlsafe_b64decode(value + '=' * (-len(value) % 4))
+    return {position for position in range(size) if bitmap[position // 8] & (1 << (position % 8))}
+
+
+def _order_photo_ids(order_id):
+    """Photo ids of a paid order's items in bitmap order (one query)."""
+    return [
+        str(photo_id) for photo_id in OrderItem.objects.filter(
+            order_id=order_id, order__status=Order.STATUS_PAID
+        ).order_by('created_at', 'id').values_list('photo_id', flat=True)
+    ]
+
+
+def issue(order, photo_ids=None, lifetime=None):
+    """
+    Issue a token for ``order`` covering ``photo_ids`` (default: every
+    photo in the order). Returns ``(token, expires_at)``.
+    """
+    if not order.is_paid:
+        raise InvalidDownloadToken('Order is not paid')
+    items = _order_photo_ids(order.pk)
+    if photo_ids is None:
+        positions = range(len(items))
+    else:
+        wanted = {str(photo_id) for photo_id in photo_ids}
+        positions = [index for index, photo_id in enumerate(items) if photo_id in wanted]
+    expires_at = timezone.now() + (lifetime or _lifetime())
+    payload = {
+        'o': str(order.pk),
+        'n': len(items),
+        'b': _encode_bitmap(positions, len(items)),
+        'e': int(expires_at.timestamp()),
+    }
+    return signing.dumps(payload, salt=SALT, compress=True), expires_at
+
+
+def decode(token):
+    """Verify the signature and expiry of ``token`` and return its payload."""
+    try:
+        payload = signing.loads(token, salt=SALT)
+    except signing.BadSignature:
+        raise InvalidDownloadToken('Invalid download token')
+    if payload.get('e', 0) < timezone.now().timestamp():
+        raise InvalidDownloadToken('Download token has expired')
+    return payload
+
+
+def entitled_photo_ids(payload, user=None):
+    """Photo ids a decoded token grants, checked against the order in one query."""
+    items_query = OrderItem.objects.filter(order_id=payload['o'], order__status=Order.STATUS_PAID)
+    if user is not None:
+        items_query = items_query.filter(order__user=user)
+    items = [
+        str(photo_id) for photo_id in
+        items_query.order_by('created_at', 'id').values_list('photo_id', flat=True)
+    ]
+    if not items or len(items) != payload['n']:
+        raise InvalidDownloadToken('Order is no longer eligible for downloads')
+    return {items[position] for position in _decode_bitmap(payload['b'], len(items))}
+
+
+def validate(token, photo_ids, user=None):
+    """
+    Check many photos against one token. Returns ``(valid, invalid)`` lists
+    of photo ids, preserving the input order.
+    """
+    granted = entitled_photo_ids(decode(token), user)
+    valid, invalid = [], []
+    for photo_id in photo_ids:
+        (valid if str(photo_id) in granted else invalid).append(str(photo_id))
+    return valid, invalid
+
+
+def validate_legacy(tokens, user=None):
+    """Split legacy ``DownloadToken`` ids into usable and unusable ones with one query."""
+    tokens = [str(token) for token in tokens]
+    usable = DownloadToken.objects.filter(token__in=tokens, is_used=False, expires_at__gt=timezone.now())
+    if user is not None:
+        usable = usable.filter(order__user=user)
+    usable = {str(token) for token in usable.values_list('token', flat=True)}
+    return [token for token in tokens if token in usable], [token for token in tokens if token not in usable]
+
+
+def mark_legacy_used(tokens, user=None):
+    """
+    Consume legacy tokens with one conditional UPDATE. Only tokens that are
+    still unused and unexpired are claimed, so concurrent callers can't both
+    consume the same token. Returns the number of tokens consumed.
+    """
+    queryset = DownloadToken.objects.filter(
+        token__in=[str(token) for token in tokens], is_used=False, expires_at__gt=timezone.now()
+    )
+    if user is not None:
+        queryset = queryset.filter(order__user=user)
+    return queryset.update(is_used=True, used_at=timezone.now())
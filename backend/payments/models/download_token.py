@@ -33,9 +33,16 @@ class DownloadToken(models.Model):
         return not self.is_used and self.expires_at > timezone.now()
     
     def mark_as_used(self):
-        """Mark the token as used."""
+        """
+        Mark the token as used with a conditional UPDATE. Returns False when
+        another request consumed it first.
+        """
         from django.utils import timezone
-        if not self.is_used:
+        if self.is_used:
+            return False
+        now = timezone.now()
+        claimed = DownloadToken.objects.filter(pk=self.pk, is_used=False).update(is_used=True, used_at=now)
+        if claimed:
             self.is_used = True
-            self.used_at = timezone.now()
-            self.save(update_fields=['is_used', 'used_at'])
+            self.used_at = now
+        return bool(claimed)
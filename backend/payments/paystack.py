@@ -1,141 +1,328 @@
-import os
+"""
+Paystack API clients.
+
+``PaystackClient`` (sync, ``requests``) and ``AsyncPaystackClient``
+(async, ``httpx``) keep a per-process pool of keep-alive connections to
+Paystack, so a checkout request reuses an open TLS connection instead of
+doing a handshake. Every call has strict connect and read timeouts.
+
+Transient failures are retried with jittered exponential backoff:
+- Rate limiting (429) is retried for every call.
+- Connection failures before the request went out are retried for
+  every call.
+- Server errors and read timeouts are retried only for GETs. A retried
+  POST could otherwise initialize a transaction twice.
+
+Repeated failures open a circuit breaker shared by both clients. While
+it is open, calls fail fast with ``PaystackUnavailable`` instead of
+waiting on timeouts. After ``PAYSTACK_BREAKER_RESET_SECONDS`` one trial
+call is let through.
+
+Paystack's own error responses (4xx with ``"status": false``) are
+returned as parsed JSON, as ``paystackapi`` did. ``PaystackError`` is
+raised only when no usable response arrives. ``PAYSTACK_BASE_URL`` can
+point at a local fake Paystack server for testing.
+"""
+import asyncio
+import logging
+import random
+import threading
+import time
+import weakref
+
+import httpx
 import requests
 from django.conf import settings
-from django.utils import timezone
-from rest_framework import status
-from rest_framework.response import Response
+from requests.adapters import HTTPAdapter
 
-class Paystack:
-    """
-    Paystack API client for handling payment operations.
-    """
-    
-    def __init__(self):
-        self.secret_key = os.getenv('PAYSTACK_SECRET_KEY')
-        self.base_url = "https://api.paystack.co"
+logger = logging.getLogger(__name__)
+
+# Backoff before retry n (from 0) is uniform in [0, min(MAX_BACKOFF, BASE_BACKOFF * 2 ** n)]
+BASE_BACKOFF = 0.2
+MAX_BACKOFF = 2.0
+
+
+class PaystackError(Exception):
+    pass
+
+
+class PaystackUnavailable(PaystackError):
+    """The circuit breaker is open: Paystack has been failing."""
+
+
+class CircuitBreaker:
+    """Opens after ``threshold`` consecutive failures; lets a trial call through every ``reset_seconds``."""
+
+    def __init__(self, threshold, reset_seconds):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.reset_seconds:
+                # Half open: this call is the trial, the others keep failing fast
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                if self.opened_at is None:
+                    logger.error(f"Paystack circuit opened after {self.failures} consecutive failures")
+                self.opened_at = time.monotonic()
+
+
+breaker = CircuitBreaker(settings.PAYSTACK_BREAKER_THRESHOLD, settings.PAYSTACK_BREAKER_RESET_SECONDS)
+
+
+def backoff(attempt):
+    return random.uniform(0, min(MAX_BACKOFF, BASE_BACKOFF * 2 ** attempt))
+
+
+class BasePaystackClient:
+    """Request building and response handling shared by the sync and async clients."""
+
+    def __init__(self, secret_key=None, base_url=None):
+        self.secret_key = secret_key or settings.PAYSTACK_SECRET_KEY
+        self.base_url = (base_url or settings.PAYSTACK_BASE_URL).rstrip('/')
         self.headers = {
             'Authorization': f'Bearer {self.secret_key}',
             'Content-Type': 'application/json',
         }
-    
-    def initialize_transaction(self, email, amount, reference, callback_url, metadata=None):
-        """
-        Initialize a transaction with Paystack.
-        
-        Args:
-            email (str): Customer's email address
-            amount (int): Amount in kobo (smallest currency unit)
-            reference (str): Unique transaction reference
-            callback_url (str): URL to redirect to after payment
-            metadata (dict, optional): Additional transaction data
-            
-        Returns:
-            dict: Response from Paystack API
-        """
-        url = f"{self.base_url}/transaction/initialize"
-        data = {
+        self.connect_timeout = settings.PAYSTACK_CONNECT_TIMEOUT
+        self.read_timeout = settings.PAYSTACK_READ_TIMEOUT
+        self.max_retries = settings.PAYSTACK_MAX_RETRIES
+        self.pool_size = settings.PAYSTACK_HTTP_POOL_SIZE
+
+    def check_circuit(self, method, path):
+        if not breaker.allow():
+            raise PaystackUnavailable(f"Paystack {method} {path} skipped: circuit open")
+
+    def retryable_status(self, method, status_code):
+        return status_code == 429 or (status_code >= 500 and method == 'GET')
+
+    def handle_response(self, method, path, status_code, parse_json):
+        """Parsed body of a response that isn't retryable, recording the outcome."""
+        if status_code >= 500:
+            breaker.record_failure()
+            raise PaystackError(f"Paystack {method} {path} failed with HTTP {status_code}")
+        breaker.record_success()
+        try:
+            return parse_json()
+        except ValueError as e:
+            raise PaystackError(f"Paystack {method} {path} returned invalid JSON (HTTP {status_code})") from e
+
+    @staticmethod
+    def initialize_payload(email, amount, reference, callback_url, metadata=None):
+        return {
             'email': email,
-            'amount': int(amount * 100),  # Convert to kobo
+            'amount': amount,
             'reference': reference,
             'callback_url': callback_url,
-            'metadata': metadata or {}
+            'metadata': metadata or {},
         }
-        
-        try:
-            response = requests.post(url, headers=self.headers, json=data)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            return {
-                'status': False,
-                'message': str(e)
-            }
-    
+
+
+class PaystackClient(BasePaystackClient):
+    """Sync Paystack client over a pooled ``requests`` session."""
+
+    def __init__(self, secret_key=None, base_url=None):
+        super().__init__(secret_key, base_url)
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        # Retries are done here, with the circuit breaker in the loop
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def retryable_error(self, method, error):
+        if method == 'GET':
+            return isinstance(error, (requests.ConnectionError, requests.Timeout))
+        return isinstance(error, requests.ConnectTimeout)
+
+    def request(self, method, path, json=None):
+        for attempt in range(self.max_retries + 1):
+            self.check_circuit(method, path)
+            last_attempt = attempt == self.max_retries
+            try:
+                response = self.session.request(
+                    method,
+                    f'{self.base_url}{path}',
+                    json=json,
+                    timeout=(self.connect_timeout, self.read_timeout),
+                )
+            except requests.RequestException as e:
+                breaker.record_failure()
+                if last_attempt or not self.retryable_error(method, e):
+                    raise PaystackError(f"Paystack {method} {path} failed: {e}") from e
+                logger.warning(f"Retrying Paystack {method} {path} after error: {e}")
+                time.sleep(backoff(attempt))
+                continue
+            if self.retryable_status(method, response.status_code) and not last_attempt:
+                breaker.record_failure()
+                logger.warning(f"Retrying Paystack {method} {path} after HTTP {response.status_code}")
+                time.sleep(backoff(attempt))
+                continue
+            return self.handle_response(method, path, response.status_code, response.json)
+
+    def initialize_transaction(self, email, amount, reference, callback_url, metadata=None):
+        """Initialize a transaction; ``amount`` is in the currency's smallest unit."""
+        return self.request('POST', '/transaction/initialize', self.initialize_payload(
+            email, amount, reference, callback_url, metadata
+        ))
+
     def verify_transaction(self, reference):
-        """
-        Verify a transaction by its reference.
-        
-        Args:
-            reference (str): Transaction reference
-            
-        Returns:
-            dict: Transaction details from Paystack
-        """
-        url = f"{self.base_url}/transaction/verify/{reference}"
-        
+        return self.request('GET', f'/transaction/verify/{reference}')
+
+    def create_customer(self, **data):
+        return self.request('POST', '/customer', data)
+
+    def create_plan(self, **data):
+        return self.request('POST', '/plan', data)
+
+    def create_subscription(self, **data):
+        return self.request('POST', '/subscription', data)
+
+
+class AsyncPaystackClient(BasePaystackClient):
+    """Async Paystack client over a pooled ``httpx.AsyncClient``; use one per event loop."""
+
+    def __init__(self, secret_key=None, base_url=None):
+        super().__init__(secret_key, base_url)
+        self.client = httpx.AsyncClient(
+            headers=self.headers,
+            timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+            limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+        )
+
+    def retryable_error(self, method, error):
+        if method == 'GET':
+            return isinstance(error, httpx.TransportError)
+        return isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout))
+
+    async def request(self, method, path, json=None):
+        for attempt in range(self.max_retries + 1):
+            self.check_circuit(method, path)
+            last_attempt = attempt == self.max_retries
+            try:
+                response = await self.client.request(method, f'{self.base_url}{path}', json=json)
+            except httpx.HTTPError as e:
+                breaker.record_failure()
+                if last_attempt or not self.retryable_error(method, e):
+                    raise PaystackError(f"Paystack {method} {path} failed: {e!r}") from e
+                logger.warning(f"Retrying Paystack {method} {path} after error: {e!r}")
+                await asyncio.sleep(backoff(attempt))
+                continue
+            if self.retryable_status(method, response.status_code) and not last_attempt:
+                breaker.record_failure()
+                logger.warning(f"Retrying Paystack {method} {path} after HTTP {response.status_code}")
+                await asyncio.sleep(backoff(attempt))
+                continue
+            return self.handle_response(method, path, response.status_code, response.json)
+
+    async def initialize_transaction(self, email, amount, reference, callback_url, metadata=None):
+        """Initialize a transaction; ``amount`` is in the currency's smallest unit."""
+        return await self.request('POST', '/transaction/initialize', self.initialize_payload(
+            email, amount, reference, callback_url, metadata
+        ))
+
+    async def verify_transaction(self, reference):
+        return await self.request('GET', f'/transaction/verify/{reference}')
+
+    async def create_customer(self, **data):
+        return await self.request('POST', '/customer', data)
+
+    async def aclose(self):
+        """Close the pooled connections; the loop's next ``get_async_client`` opens a new pool."""
+        await self.client.aclose()
+        _async_clients.pop(asyncio.get_running_loop(), None)
+
+
+_client = None
+_client_lock = threading.Lock()
+# httpx clients can't be shared across event loops
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_client():
+    """The process-wide sync client."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = PaystackClient()
+    return _client
+
+
+def get_async_client():
+    """The async client of the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_clients[loop] = AsyncPaystackClient()
+    return client
+
+
+class Paystack:
+    """
+    Paystack API client for handling payment operations.
+
+    Takes amounts in the main currency unit and returns an error dict
+    instead of raising; calls go through the pooled ``PaystackClient``.
+    """
+
+    def _call(self, function, *args, **kwargs):
         try:
-            response = requests.get(url, headers=self.headers)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            return function(*args, **kwargs)
+        except PaystackError as e:
             return {
                 'status': False,
                 'message': str(e)
             }
-    
+
+    def initialize_transaction(self, email, amount, reference, callback_url, metadata=None):
+        """Initialize a transaction; ``amount`` is converted to kobo."""
+        return self._call(
+            get_client().initialize_transaction,
+            email, int(amount * 100), reference, callback_url, metadata
+        )
+
+    def verify_transaction(self, reference):
+        """Verify a transaction by its reference."""
+        return self._call(get_client().verify_transaction, reference)
+
     def create_plan(self, name, amount, interval='monthly', description=None):
-        """
-        Create a subscription plan.
-        
-        Args:
-            name (str): Name of the plan
-            amount (int): Amount in kobo
-            interval (str): Billing interval (daily, weekly, monthly, quarterly, yearly)
-            description (str, optional): Plan description
-            
-        Returns:
-            dict: Response from Paystack API
-        """
-        url = f"{self.base_url}/plan"
-        data = {
-            'name': name,
-            'amount': int(amount * 100),  # Convert to kobo
-            'interval': interval,
-            'description': description or f"{name} plan"
-        }
-        
-        try:
-            response = requests.post(url, headers=self.headers, json=data)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            return {
-                'status': False,
-                'message': str(e)
-            }
-    
+        """Create a subscription plan; ``amount`` is converted to kobo."""
+        return self._call(
+            get_client().create_plan,
+            name=name,
+            amount=int(amount * 100),
+            interval=interval,
+            description=description or f"{name} plan"
+        )
+
     def create_subscription(self, customer_email, plan_code, authorization_code, start_date=None):
-        """
-        Create a subscription for a customer.
-        
-        Args:
-            customer_email (str): Customer's email
-            plan_code (str): Plan code from Paystack
-            authorization_code (str): Authorization code from customer's card
-            start_date (str, optional): When to start the subscription (ISO 8601 format)
-            
-        Returns:
-            dict: Response from Paystack API
-        """
-        url = f"{self.base_url}/subscription"
+        """Create a subscription for a customer."""
         data = {
             'customer': customer_email,
             'plan': plan_code,
             'authorization': authorization_code
         }
-        
         if start_date:
             data['start_date'] = start_date
-        
-        try:
-            response = requests.post(url, headers=self.headers, json=data)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            return {
-                'status': False,
-                'message': str(e)
-            }
+        return self._call(get_client().create_subscription, **data)
 
 # Create a singleton instance
 paystack = Paystack()
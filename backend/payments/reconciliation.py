@@ -0,0 +1,450 @@
+"""
+Background reconciliation of Paystack payments.
+
+``PaystackVerifyPaymentView`` never calls Paystack. It reads the result
+published here for a reference and, until there is one, queues the
+reference with ``enqueue``. The ``reconcile_paystack_payments`` task runs
+every ten seconds, and is kicked whenever a new reference is queued. Each
+run:
+
+- takes the batch of queued references that are due,
+- settles references whose transaction the webhook already marked as
+  succeeded, without calling Paystack,
+- verifies the rest against Paystack concurrently, at most
+  ``PAYSTACK_RECONCILE_CONCURRENCY`` at a time,
+- records successes (order paid, ticket purchases issued) and failures
+  in the database,
+- publishes each settled result: a key read by the verify endpoint, and
+  a message on the reference's channel for clients waiting on it.
+
+References Paystack still reports as pending are checked again with
+exponential backoff, and dropped after ``PAYSTACK_RECONCILE_MAX_AGE``.
+Pending transactions the webhook never settled are swept into the queue
+every five minutes. Runs don't overlap: each holds a Redis lock.
+"""
+import asyncio
+import json
+import logging
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import CustomUser as User
+from config.redis_client import get_redis
+from gallery.ticket_models.models import EventTicket
+from notifications import live
+from tickets.models import TicketPurchase
+
+from .models import Order, Transaction
+from .paystack import PaystackError, get_async_client
+
+logger = logging.getLogger(__name__)
+
+# Sorted set of queued references, scored by when each is next due (unix time)
+DUE_KEY = 'paystack:reconcile:due'
+# Hash of reference to JSON: the user who asked, when it was queued, checks so far
+META_KEY = 'paystack:reconcile:meta'
+LOCK_KEY = 'paystack:reconcile:lock'
+LOCK_SECONDS = 300
+RESULT_KEY = 'paystack:result:{}'
+RESULT_CHANNEL = 'paystack:result:{}'
+
+# Delay before check n (from 0) of a still pending reference: min(MAX_DELAY, BASE_DELAY * 2 ** n)
+BASE_DELAY = 5
+MAX_DELAY = 300
+
+SETTLED_STATUSES = {'success', 'failed', 'reversed'}
+# Paystack answers an unknown reference with status false and this in its message
+NOT_FOUND = 'not found'
+
+
+def can_access(user, user_id, customer_email):
+    """Whether ``user`` may see a payment: the order's user, or the customer the checkout was for."""
+    return user_id == user.id or (bool(customer_email) and customer_email == user.email)
+
+
+def transaction_access(txn, user):
+    """``can_access`` for a transaction that has no published result yet."""
+    order_user_id = txn.order.user_id if txn.order else None
+    return can_access(user, order_user_id, (txn.metadata or {}).get('customer_email'))
+
+
+def get_result(reference):
+    """The published result for ``reference``, or None while it's unsettled."""
+    data = get_redis().get(RESULT_KEY.format(reference))
+    return json.loads(data) if data else None
+
+
+def publish_result(reference, result):
+    payload = json.dumps(result, default=str)
+    pipe = get_redis().pipeline()
+    pipe.set(RESULT_KEY.format(reference), payload, ex=settings.PAYSTACK_RESULT_TTL)
+    pipe.publish(RESULT_CHANNEL.format(reference), payload)
+    pipe.execute()
+    live.publish(result['user_id'], live.ORDER_PAID if result['status'] == 'success' else live.PAYMENT_FAILED, {
+        'reference': reference,
+        'status': result['status'],
+        'message': result['message'],
+        'order_id': result['order_id'],
+        'transaction_id': result['transaction_id'],
+    })
+
+
+def wait_for_result(reference, timeout):
+    """Block up to ``timeout`` seconds for the result of ``reference``."""
+    pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+    try:
+        pubsub.subscribe(RESULT_CHANNEL.format(reference))
+        # It may have been published before the subscription started
+        result = get_result(reference)
+        deadline = time.monotonic() + timeout
+        while result is None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            message = pubsub.get_message(timeout=remaining)
+            if message and message['type'] == 'message':
+                result = json.loads(message['data'])
+        return result
+    finally:
+        pubsub.close()
+
+
+def enqueue(reference, user_id=None):
+    """Queue ``reference`` for verification; returns whether it was newly queued."""
+    meta = json.dumps({'user_id': user_id, 'queued_at': time.time(), 'checks': 0})
+    pipe = get_redis().pipeline()
+    pipe.zadd(DUE_KEY, {reference: time.time()}, nx=True)
+    pipe.hsetnx(META_KEY, reference, meta)
+    added, _ = pipe.execute()
+    if added:
+        schedule_reconcile()
+    return bool(added)
+
+
+def enqueue_on_commit(reference, user_id=None):
+    """Queue ``reference`` once the current transaction commits; Redis errors are only logged."""
+    def queue():
+        try:
+            enqueue(reference, user_id)
+        except Exception as e:
+            logger.error(f"Error queueing Paystack reference {reference} for reconciliation: {str(e)}")
+
+    transaction.on_commit(queue)
+
+
+def schedule_reconcile():
+    """Start a reconciliation run now, at most once every two seconds."""
+    from .tasks import reconcile_paystack_payments
+
+    if cache.add('paystack:reconcile:kicked', True, 2):
+        reconcile_paystack_payments.delay()
+
+
+def _due(limit):
+    client = get_redis()
+    references = [
+        reference.decode() for reference in
+        client.zrangebyscore(DUE_KEY, '-inf', time.time(), start=0, num=limit)
+    ]
+    metas = client.hmget(META_KEY, references) if references else []
+    return {
+        reference: json.loads(meta) if meta else {'user_id': None, 'queued_at': time.time(), 'checks': 0}
+        for reference, meta in zip(references, metas)
+    }
+
+
+def _drop(references):
+    if references:
+        pipe = get_redis().pipeline()
+        pipe.zrem(DUE_KEY, *references)
+        pipe.hdel(META_KEY, *references)
+        pipe.execute()
+
+
+def _reschedule(pending):
+    """Push still pending references back with backoff, dropping the expired ones."""
+    now = time.time()
+    due, metas, expired = {}, {}, []
+    for reference, meta in pending.items():
+        if now - meta['queued_at'] >= settings.PAYSTACK_RECONCILE_MAX_AGE:
+            expired.append(reference)
+            continue
+        due[reference] = now + min(MAX_DELAY, BASE_DELAY * 2 ** meta['checks'])
+        metas[reference] = json.dumps({**meta, 'checks': meta['checks'] + 1})
+    if due:
+        pipe = get_redis().pipeline()
+        pipe.zadd(DUE_KEY, due, xx=True)
+        pipe.hset(META_KEY, mapping=metas)
+        pipe.execute()
+    if expired:
+        logger.warning(f"Gave up reconciling {len(expired)} Paystack reference(s) still pending after "
+                       f"{settings.PAYSTACK_RECONCILE_MAX_AGE} seconds")
+        _drop(expired)
+
+
+async def verify_references(references, concurrency):
+    """Paystack's verify responses for ``references``; None for those that couldn't be fetched."""
+    client = get_async_client()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def verify(reference):
+        async with semaphore:
+            try:
+                return await client.verify_transaction(reference)
+            except PaystackError as e:
+                logger.error(f"Error verifying Paystack reference {reference}: {str(e)}")
+                return None
+
+    try:
+        return dict(zip(references, await asyncio.gather(*(verify(reference) for reference in references))))
+    finally:
+        await client.aclose()
+
+
+def _result(status, message, txn, data=None, user_id=None):
+    order = txn.order if txn is not None else None
+    metadata = (txn.metadata or {}) if txn is not None else {}
+    return {
+        'status': status,
+        'message': message,
+        'data': data or {},
+        'order_id': str(order.id) if order else None,
+        'transaction_id': str(txn.id) if txn is not None else None,
+        # Who may read it: the order's user, or the customer the checkout was for
+        'user_id': order.user_id if order else user_id,
+        'customer_email': metadata.get('customer_email'),
+    }
+
+
+def _summary(data):
+    """The parts of Paystack's transaction data the verify endpoint returns."""
+    fields = ('reference', 'status', 'amount', 'currency', 'paid_at', 'channel', 'gateway_response')
+    return {field: data.get(field) for field in fields}
+
+
+def _create_paid_order(reference, data, user_id):
+    """Order and transaction for a payment Paystack settled before the webhook created any."""
+    user = User.objects.filter(pk=user_id).first() if user_id else None
+    amount = Decimal(data.get('amount') or 0) / 100
+    currency = data.get('currency') or 'KES'
+    metadata = data.get('metadata')
+    order = Order.objects.create(
+        user=user,
+        status=Order.STATUS_PAID,
+        currency=currency,
+        subtotal=amount,
+        tax_amount=0,
+        total=amount,
+        billing_email=user.email if user else (data.get('customer') or {}).get('email', ''),
+        billing_name=(user.get_full_name() if user else '') or 'Customer',
+        paid_at=timezone.now(),
+    )
+    return Transaction.objects.create(
+        order=order,
+        transaction_type=Transaction.TYPE_CHARGE,
+        amount=amount,
+        currency=currency,
+        status=Transaction.STATUS_SUCCEEDED,
+        paystack_reference=reference,
+        paystack_transaction_id=str(data.get('id') or ''),
+        metadata=metadata if isinstance(metadata, dict) else {},
+    )
+
+
+def record_success(reference, data, user_id=None):
+    """Mark the payment of ``reference`` as succeeded; returns its transaction."""
+    with transaction.atomic():
+        txn = Transaction.objects.select_for_update().select_related('order').filter(
+            paystack_reference=reference
+        ).first()
+        if txn is None:
+            return _create_paid_order(reference, data, user_id)
+        if txn.status != Transaction.STATUS_SUCCEEDED:
+            txn.status = Transaction.STATUS_SUCCEEDED
+            if not txn.paystack_transaction_id:
+                txn.paystack_transaction_id = str(data.get('id') or '')
+            txn.metadata = {
+                **(txn.metadata or {}),
+                'paystack_verification_response': data,
+                'last_verified_at': timezone.now().isoformat(),
+            }
+            txn.save()
+        if txn.order and txn.order.status != Order.STATUS_PAID:
+            txn.order.status = Order.STATUS_PAID
+            txn.order.save()
+        return txn
+
+
+def record_failure(reference, data):
+    """Mark the pending transaction of ``reference`` as failed; returns it, if there is one."""
+    txn = Transaction.objects.select_related('order').filter(paystack_reference=reference).first()
+    if txn is not None and txn.status == Transaction.STATUS_PENDING:
+        txn.status = Transaction.STATUS_FAILED
+        txn.metadata = {**(txn.metadata or {}), 'paystack_verification_response': data}
+        txn.save()
+    return txn
+
+
+def _ticket_details(txn):
+    """The tickets bought, from the checkout metadata (order items are photos only)."""
+    details = (txn.metadata or {}).get('ticket_details')
+    if isinstance(details, str):
+        try:
+            details = json.loads(details)
+        except ValueError as e:
+            logger.warning(f"Failed to parse ticket_details of transaction {txn.id}: {e}")
+            return []
+    return details or []
+
+
+def create_ticket_purchases(order, txn):
+    """Create a confirmed ticket purchase for each ticket bought in ``order``."""
+    if order.user is None:
+        logger.error(f"No user found for ticket purchase of order {order.id}")
+        return 0
+    details = _ticket_details(txn)
+    if not details:
+        # A photo order
+        return 0
+
+    created = []
+    for ticket_data in details:
+        ticket_id = ticket_data.get('ticket_id') or ticket_data.get('id')
+        ticket_type = EventTicket.objects.filter(id=ticket_id).first() if ticket_id else None
+        if ticket_type is None:
+            logger.warning(f"Ticket type {ticket_id} not found, skipping")
+            continue
+        quantity = int(ticket_data.get('quantity') or 1)
+        try:
+            purchase = TicketPurchase.objects.create(
+                user=order.user,
+                event_ticket=ticket_type,
+                quantity=quantity,
+                status='confirmed',
+                payment_method='paystack',
+                payment_intent_id=txn.paystack_reference or f'txn-{txn.id}',
+                total_price=Decimal(str(ticket_data.get('price') or 0)) * quantity
+            )
+            created.append(purchase)
+        except Exception as e:
+            logger.error(f"Error creating ticket purchase for ticket {ticket_id}: {str(e)}", exc_info=True)
+    logger.info(f"Created {len(created)} ticket purchase(s) for order {order.id}")
+    if created:
+        live.publish(order.user_id, live.TICKET_ISSUED, {
+            'order_id': str(order.id),
+            'reference': txn.paystack_reference,
+            'tickets': [
+                {'id': purchase.id, 'event_ticket_id': purchase.event_ticket_id, 'quantity': purchase.quantity}
+                for purchase in created
+            ],
+        })
+    return len(created)
+
+
+def issue_tickets(txn):
+    """Create the ticket purchases of a succeeded transaction, once."""
+    if txn.order is None:
+        return
+    if TicketPurchase.objects.filter(payment_intent_id=txn.paystack_reference).exists():
+        return
+    create_ticket_purchases(txn.order, txn)
+
+
+def settle(reference, response, meta):
+    """The result to publish for a verify response, or None if the payment is still pending."""
+    if response is None:
+        # Paystack couldn't be reached; checked again later
+        return None
+    if not response.get('status'):
+        message = response.get('message') or ''
+        if NOT_FOUND not in message.lower():
+            # Refused for another reason, e.g. rate limited; checked again later
+            return None
+        # Paystack has no such transaction, so it can never succeed
+        data = {'reference': reference, 'status': 'failed', 'gateway_response': message}
+        txn = record_failure(reference, data)
+        return _result('failed', message, txn, _summary(data), meta['user_id'])
+    data = response.get('data') or {}
+    paystack_status = data.get('status')
+    if paystack_status not in SETTLED_STATUSES:
+        return None
+    if paystack_status == 'success':
+        txn = record_success(reference, data, meta['user_id'])
+        issue_tickets(txn)
+        return _result('success', 'Payment verified successfully', txn, _summary(data), meta['user_id'])
+    txn = record_failure(reference, data)
+    message = data.get('gateway_response') or response.get('message') or 'Payment failed'
+    return _result('failed', message, txn, _summary(data), meta['user_id'])
+
+
+def reconcile_due(limit=None, concurrency=None):
+    """Verify one batch of due references; returns (settled, still pending) counts."""
+    client = get_redis()
+    token = uuid.uuid4().hex
+    if not client.set(LOCK_KEY, token, nx=True, ex=LOCK_SECONDS):
+        return 0, 0
+    try:
+        batch = _due(limit or settings.PAYSTACK_RECONCILE_BATCH_SIZE)
+        if not batch:
+            return 0, 0
+
+        results = {}
+        # The webhook got there first: nothing to ask Paystack
+        succeeded = Transaction.objects.select_related('order').filter(
+            paystack_reference__in=list(batch),
+            status=Transaction.STATUS_SUCCEEDED
+        )
+        for txn in succeeded:
+            issue_tickets(txn)
+            results[txn.paystack_reference] = _result(
+                'success', 'Payment verified successfully', txn,
+                {
+                    'reference': txn.paystack_reference,
+                    'status': 'success',
+                    # In the smallest currency unit, as Paystack reports it
+                    'amount': int(txn.amount * 100),
+                    'currency': txn.currency,
+                },
+            )
+
+        unsettled = [reference for reference in batch if reference not in results]
+        if unsettled:
+            responses = asyncio.run(verify_references(
+                unsettled, concurrency or settings.PAYSTACK_RECONCILE_CONCURRENCY
+            ))
+            for reference, response in responses.items():
+                try:
+                    result = settle(reference, response, batch[reference])
+                except Exception as e:
+                    logger.error(f"Error settling Paystack reference {reference}: {str(e)}", exc_info=True)
+                    result = None
+                if result is not None:
+                    results[reference] = result
+
+        for reference, result in results.items():
+            publish_result(reference, result)
+        _drop(list(results))
+        _reschedule({reference: meta for reference, meta in batch.items() if reference not in results})
+        return len(results), len(batch) - len(results)
+    finally:
+        if client.get(LOCK_KEY) == token.encode():
+            client.delete(LOCK_KEY)
+
+
+def enqueue_pending_transactions():
+    """Queue pending Paystack transactions the webhook hasn't settled; returns how many were new."""
+    now = timezone.now()
+    pending = Transaction.objects.filter(
+        status=Transaction.STATUS_PENDING,
+        created_at__gte=now - timedelta(seconds=settings.PAYSTACK_RECONCILE_MAX_AGE),
+        # Give the webhook a couple of minutes first
+        created_at__lte=now - timedelta(minutes=2),
+    ).exclude(paystack_reference='').values_list('paystack_reference', 'order__user_id')
+    return sum(enqueue(reference, user_id) for reference, user_id in pending)
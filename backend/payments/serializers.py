@@ -105,6 +105,36 @@ class DownloadTokenSerializer(serializers.ModelSerializer):
         fields = ['token', 'photo', 'expires_at', 'is_used', 'used_at']
         read_only_fields = ['token', 'expires_at', 'is_used', 'used_at']
 
+class OrderDownloadTokenSerializer(serializers.Serializer):
+    """Serializer for issuing an order-scoped download token."""
+    photo_ids = serializers.ListField(
+        child=serializers.UUIDField(),
+        required=False,
+        allow_empty=False
+    )
+
+class DownloadTokenValidationSerializer(serializers.Serializer):
+    """Serializer for validating download tokens in bulk."""
+    token = serializers.CharField(required=False)
+    photo_ids = serializers.ListField(
+        child=serializers.UUIDField(),
+        required=False,
+        max_length=5000
+    )
+    tokens = serializers.ListField(
+        child=serializers.UUIDField(),
+        required=False,
+        max_length=5000
+    )
+    mark_used = serializers.BooleanField(default=False)
+
+    def validate(self, data):
+        if data.get('token') and data.get('photo_ids') is None:
+            raise serializers.ValidationError({'photo_ids': 'This field is required with token.'})
+        if not data.get('token') and not data.get('tokens'):
+            raise serializers.ValidationError('Provide either token and photo_ids or tokens.')
+        return data
+
 class CreateCheckoutSessionSerializer(serializers.Serializer):
     """Serializer for creating a Stripe checkout session."""
     photo_ids = serializers.ListField(
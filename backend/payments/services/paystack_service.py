@@ -1,8 +1,6 @@
 import logging
-from paystackapi.paystack import Paystack
-from paystackapi.transaction import Transaction as PaystackTransaction
-from paystackapi.customer import Customer as PaystackCustomer
 from ..models.paystack_config import PaystackConfig
+from ..paystack import get_async_client, get_client
 
 logger = logging.getLogger(__name__)
 
@@ -18,7 +16,6 @@ class PaystackService:
 
     def __init__(self):
         self.config = None
-        self.paystack = None
 
     def _load_config(self):
         if not self.config:
@@ -26,15 +23,9 @@ class PaystackService:
             self.config, _ = PaystackConfig.objects.get_or_create(pk=1)
         return self.config
 
-    def _get_paystack(self):
-        if not self.paystack:
-            config = self._load_config()
-            self.paystack = Paystack(secret_key=config.secret_key)
-        return self.paystack
-
     def initialize_payment(self, email, amount, reference, callback_url, metadata=None):
         try:
-            response = PaystackTransaction.initialize(
+            response = get_client().initialize_transaction(
                 email=email,
                 amount=amount,
                 reference=reference,
@@ -48,12 +39,32 @@ class PaystackService:
 
     def verify_payment(self, reference):
         try:
-            response = PaystackTransaction.verify(reference)
+            response = get_client().verify_transaction(reference)
             return response
         except Exception as e:
             logger.error(f"Error verifying Paystack payment: {str(e)}")
             raise
 
+    async def ainitialize_payment(self, email, amount, reference, callback_url, metadata=None):
+        try:
+            return await get_async_client().initialize_transaction(
+                email=email,
+                amount=amount,
+                reference=reference,
+                callback_url=callback_url,
+                metadata=metadata or {}
+            )
+        except Exception as e:
+            logger.error(f"Error initializing Paystack payment: {str(e)}")
+            raise
+
+    async def averify_payment(self, reference):
+        try:
+            return await get_async_client().verify_transaction(reference)
+        except Exception as e:
+            logger.error(f"Error verifying Paystack payment: {str(e)}")
+            raise
+
     def create_customer(self, email, first_name=None, last_name=None, phone=None):
         try:
             customer_data = {
@@ -63,7 +74,7 @@ class PaystackService:
                 'phone': phone
             }
             customer_data = {k: v for k, v in customer_data.items() if v is not None}
-            response = PaystackCustomer.create(**customer_data)
+            response = get_client().create_customer(**customer_data)
             return response
         except Exception as e:
             logger.error(f"Error creating Paystack customer: {str(e)}")
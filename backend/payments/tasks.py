@@ -0,0 +1,37 @@
+from celery import shared_task
+import logging
+
+logger = logging.getLogger(__name__)
+
+@shared_task
+def reconcile_paystack_payments():
+    """
+    Task to verify a batch of queued Paystack references and publish their results
+    """
+    from payments import reconciliation
+
+    try:
+        settled, pending = reconciliation.reconcile_due()
+        if settled or pending:
+            logger.info(f"Reconciled Paystack payments: {settled} settled, {pending} still pending")
+        return True
+
+    except Exception as e:
+        logger.error(f"Error reconciling Paystack payments: {str(e)}")
+        return False
+
+@shared_task
+def enqueue_pending_paystack_transactions():
+    """
+    Task to queue pending Paystack transactions the webhook hasn't settled
+    """
+    from payments import reconciliation
+
+    try:
+        count = reconciliation.enqueue_pending_transactions()
+        logger.info(f"Queued {count} pending Paystack transaction(s) for reconciliation")
+        return True
+
+    except Exception as e:
+        logger.error(f"Error queueing pending Paystack transactions: {str(e)}")
+        return False
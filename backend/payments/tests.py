@@ -0,0 +1,427 @@
+import json
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from gallery.models import Download, Event, Gallery, Photo
+from gallery.ticket_models.models import EventTicket, TicketGroup, TicketLevel, TicketType
+from tickets.models import TicketPurchase
+
+from . import download_tokens, reconciliation
+from .models import DownloadToken, Order, OrderItem, Transaction
+from .views.order_views import OrderPhotoDownloadView
+from .views.payment_views import PaystackVerifyPaymentView
+
+User = get_user_model()
+
+REFERENCE = 'ref-1001'
+
+
+def verify_response(status='success', amount=5000):
+    return {
+        'status': True,
+        'message': 'Verification successful',
+        'data': {'id': 42, 'reference': REFERENCE, 'status': status, 'amount': amount, 'currency': 'KES'},
+    }
+
+
+class ReconciliationTestCase(TestCase):
+    def setUp(self):
+        patcher = mock.patch('notifications.live.publish')
+        self.publish = patcher.start()
+        self.addCleanup(patcher.stop)
+        # Keep ticket QR codes out of MEDIA_ROOT
+        patcher = mock.patch.object(TicketPurchase, '_generate_qr_code')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.user = User.objects.create_user(email='customer@example.com', password='secret')
+        event = Event.objects.create(name='Launch', date=date(2026, 1, 1), created_by=self.user)
+        ticket_type = TicketType.objects.create(
+            name='Standard',
+            group=TicketGroup.objects.create(name='General'),
+            level=TicketLevel.objects.create(name='Regular'),
+        )
+        self.ticket = EventTicket.objects.create(event=event, ticket_type=ticket_type, price=Decimal('25.00'))
+        self.order = Order.objects.create(
+            user=self.user, subtotal=50, tax_amount=0, total=50,
+            billing_email=self.user.email, billing_name='Customer',
+        )
+        self.txn = Transaction.objects.create(
+            order=self.order,
+            transaction_type=Transaction.TYPE_CHARGE,
+            amount=50,
+            status=Transaction.STATUS_PENDING,
+            paystack_reference=REFERENCE,
+            metadata={'ticket_details': [{'ticket_id': self.ticket.id, 'quantity': 2, 'price': '25.00'}]},
+        )
+        self.meta = {'user_id': self.user.id, 'queued_at': 0, 'checks': 0}
+
+
+class SettleTests(ReconciliationTestCase):
+    def test_success_marks_the_order_paid_and_issues_tickets(self):
+        result = reconciliation.settle(REFERENCE, verify_response(), self.meta)
+
+        self.assertEqual(result['status'], 'success')
+        self.assertEqual(result['transaction_id'], str(self.txn.id))
+        self.txn.refresh_from_db()
+        self.order.refresh_from_db()
+        self.assertEqual(self.txn.status, Transaction.STATUS_SUCCEEDED)
+        self.assertEqual(self.order.status, Order.STATUS_PAID)
+        purchase = TicketPurchase.objects.get(payment_intent_id=REFERENCE)
+        self.assertEqual(purchase.quantity, 2)
+
+    def test_settling_twice_issues_tickets_once(self):
+        reconciliation.settle(REFERENCE, verify_response(), self.meta)
+        reconciliation.settle(REFERENCE, verify_response(), self.meta)
+
+        self.assertEqual(TicketPurchase.objects.filter(payment_intent_id=REFERENCE).count(), 1)
+        self.assertEqual(Transaction.objects.filter(paystack_reference=REFERENCE).count(), 1)
+
+    def test_record_success_is_idempotent(self):
+        first = reconciliation.record_success(REFERENCE, verify_response()['data'], self.user.id)
+        second = reconciliation.record_success(REFERENCE, verify_response()['data'], self.user.id)
+
+        self.assertEqual(first.pk, self.txn.pk)
+        self.assertEqual(second.pk, self.txn.pk)
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(Transaction.objects.get(pk=self.txn.pk).paystack_transaction_id, '42')
+
+    def test_issue_tickets_skips_an_issued_transaction(self):
+        self.txn.status = Transaction.STATUS_SUCCEEDED
+        self.txn.save()
+
+        reconciliation.issue_tickets(self.txn)
+        with mock.patch.object(reconciliation, 'create_ticket_purchases') as create:
+            reconciliation.issue_tickets(self.txn)
+
+        create.assert_not_called()
+        self.assertEqual(TicketPurchase.objects.filter(payment_intent_id=REFERENCE).count(), 1)
+
+    def test_unreachable_paystack_stays_pending(self):
+        self.assertIsNone(reconciliation.settle(REFERENCE, None, self.meta))
+        self.assertIsNone(reconciliation.settle(REFERENCE, verify_response(status='ongoing'), self.meta))
+        self.assertIsNone(reconciliation.settle(
+            REFERENCE, {'status': False, 'message': 'Rate limit exceeded'}, self.meta
+        ))
+
+        self.txn.refresh_from_db()
+        self.assertEqual(self.txn.status, Transaction.STATUS_PENDING)
+
+    def test_unknown_reference_is_a_terminal_failure(self):
+        result = reconciliation.settle(
+            REFERENCE, {'status': False, 'message': 'Transaction reference not found'}, self.meta
+        )
+
+        self.assertEqual(result['status'], 'failed')
+        self.txn.refresh_from_db()
+        self.assertEqual(self.txn.status, Transaction.STATUS_FAILED)
+        self.assertFalse(TicketPurchase.objects.exists())
+
+
+class FakeRedis:
+    """The sorted set, hash and string commands the reconciler uses."""
+
+    def __init__(self):
+        self.strings, self.zsets, self.hashes = {}, {}, {}
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.strings:
+            return None
+        self.strings[key] = value if isinstance(value, bytes) else str(value).encode()
+        return True
+
+    def get(self, key):
+        return self.strings.get(key)
+
+    def delete(self, key):
+        return int(self.strings.pop(key, None) is not None)
+
+    def publish(self, channel, message):
+        return 0
+
+    def zadd(self, key, mapping, nx=False, xx=False):
+        zset = self.zsets.setdefault(key, {})
+        added = 0
+        for member, score in mapping.items():
+            if (nx and member in zset) or (xx and member not in zset):
+                continue
+            added += member not in zset
+            zset[member] = score
+        return added
+
+    def zrangebyscore(self, key, low, high, start=0, num=None):
+        members = sorted(self.zsets.get(key, {}).items(), key=lambda item: item[1])
+        return [member.encode() for member, score in members if score <= float(high)][start:num]
+
+    def zrem(self, key, *members):
+        return sum(self.zsets.get(key, {}).pop(member, None) is not None for member in members)
+
+    def hsetnx(self, key, field, value):
+        fields = self.hashes.setdefault(key, {})
+        if field in fields:
+            return 0
+        fields[field] = value.encode()
+        return 1
+
+    def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update({field: value.encode() for field, value in mapping.items()})
+
+    def hmget(self, key, fields):
+        return [self.hashes.get(key, {}).get(field) for field in fields]
+
+    def hdel(self, key, *fields):
+        return sum(self.hashes.get(key, {}).pop(field, None) is not None for field in fields)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        return [getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+
+class ReconcileDueTests(ReconciliationTestCase):
+    def setUp(self):
+        super().setUp()
+        self.redis = FakeRedis()
+        patcher = mock.patch.object(reconciliation, 'get_redis', return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(reconciliation, 'schedule_reconcile')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def stub_verify(self, response):
+        async def verify_references(references, concurrency):
+            self.verified.extend(references)
+            return {reference: response for reference in references}
+        self.verified = []
+        return mock.patch.object(reconciliation, 'verify_references', verify_references)
+
+    def test_settled_reference_is_published_and_dropped(self):
+        reconciliation.enqueue(REFERENCE, self.user.id)
+
+        with self.stub_verify(verify_response()):
+            self.assertEqual(reconciliation.reconcile_due(), (1, 0))
+
+        self.assertEqual(self.verified, [REFERENCE])
+        self.assertEqual(reconciliation.get_result(REFERENCE)['status'], 'success')
+        self.assertEqual(self.redis.zsets[reconciliation.DUE_KEY], {})
+        self.assertEqual(TicketPurchase.objects.filter(payment_intent_id=REFERENCE).count(), 1)
+
+    def test_reconciling_again_does_not_reissue_tickets(self):
+        with self.stub_verify(verify_response()):
+            reconciliation.enqueue(REFERENCE, self.user.id)
+            reconciliation.reconcile_due()
+            reconciliation.enqueue(REFERENCE, self.user.id)
+            self.assertEqual(reconciliation.reconcile_due(), (1, 0))
+
+        # The second run found the succeeded transaction without asking Paystack
+        self.assertEqual(self.verified, [REFERENCE])
+        self.assertEqual(TicketPurchase.objects.filter(payment_intent_id=REFERENCE).count(), 1)
+
+    def test_pending_reference_is_rescheduled(self):
+        reconciliation.enqueue(REFERENCE, self.user.id)
+
+        with self.stub_verify(None):
+            self.assertEqual(reconciliation.reconcile_due(), (0, 1))
+
+        self.assertIn(REFERENCE, self.redis.zsets[reconciliation.DUE_KEY])
+        meta = json.loads(self.redis.hashes[reconciliation.META_KEY][REFERENCE])
+        self.assertEqual(meta['checks'], 1)
+        self.assertIsNone(reconciliation.get_result(REFERENCE))
+
+
+class VerifyPaymentViewTests(ReconciliationTestCase):
+    def setUp(self):
+        super().setUp()
+        self.factory = APIRequestFactory()
+        patcher = mock.patch.object(reconciliation, 'get_result', return_value=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(reconciliation, 'enqueue')
+        self.enqueue = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def verify(self, user, reference=REFERENCE):
+        request = self.factory.get(f'/api/payments/paystack/verify/{reference}/')
+        force_authenticate(request, user=user)
+        return PaystackVerifyPaymentView.as_view()(request, reference=reference)
+
+    def test_owner_queues_the_reference(self):
+        response = self.verify(self.user)
+
+        self.assertEqual(response.status_code, 202)
+        self.enqueue.assert_called_once_with(REFERENCE, self.user.id)
+
+    def test_unknown_reference_is_not_queued(self):
+        response = self.verify(self.user, 'made-up')
+
+        self.assertEqual(response.status_code, 404)
+        self.enqueue.assert_not_called()
+
+    def test_other_users_reference_is_not_queued(self):
+        other = User.objects.create_user(email='other@example.com', password='secret')
+
+        response = self.verify(other)
+
+        self.assertEqual(response.status_code, 400)
+        self.enqueue.assert_not_called()
+
+
+class DownloadTokenTestCase(TestCase):
+    def setUp(self):
+        patcher = mock.patch('notifications.live.publish')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.user = User.objects.create_user(email='customer@example.com', password='secret')
+        gallery = Gallery.objects.create(title='Launch', photographer=self.user)
+        self.photos = [
+            Photo.objects.create(gallery=gallery, image=f'photos/{index}.jpg', content_hash=f'{index:064x}')
+            for index in range(10)
+        ]
+        self.order = Order.objects.create(
+            user=self.user, subtotal=50, tax_amount=0, total=50,
+            billing_email=self.user.email, billing_name='Customer', status=Order.STATUS_PAID,
+        )
+        for photo in self.photos:
+            OrderItem.objects.create(order=self.order, photo=photo, price=5)
+        self.photo_ids = [str(photo.id) for photo in self.photos]
+
+
+class DownloadTokenTests(DownloadTokenTestCase):
+    def test_token_covers_exactly_the_requested_photos(self):
+        wanted = [self.photo_ids[0], self.photo_ids[3], self.photo_ids[9]]
+        token, _ = download_tokens.issue(self.order, wanted)
+
+        valid, invalid = download_tokens.validate(token, self.photo_ids, user=self.user)
+
+        self.assertEqual(valid, wanted)
+        self.assertEqual(invalid, [photo_id for photo_id in self.photo_ids if photo_id not in wanted])
+
+    def test_token_covers_the_whole_order_by_default(self):
+        token, _ = download_tokens.issue(self.order)
+
+        with self.assertNumQueries(1):
+            valid, invalid = download_tokens.validate(token, self.photo_ids)
+
+        self.assertEqual(valid, self.photo_ids)
+        self.assertEqual(invalid, [])
+
+    def test_unpaid_order_gets_no_token(self):
+        self.order.status = Order.STATUS_PENDING
+        self.order.save()
+
+        with self.assertRaises(download_tokens.InvalidDownloadToken):
+            download_tokens.issue(self.order)
+
+    def test_changing_the_items_invalidates_the_token(self):
+        token, _ = download_tokens.issue(self.order)
+        OrderItem.objects.create(order=self.order, photo=self.photos[0], price=5)
+
+        with self.assertRaisesMessage(download_tokens.InvalidDownloadToken, 'no longer eligible'):
+            download_tokens.validate(token, self.photo_ids)
+
+    def test_refund_revokes_the_token(self):
+        token, _ = download_tokens.issue(self.order)
+        self.order.status = Order.STATUS_REFUNDED
+        self.order.save()
+
+        with self.assertRaisesMessage(download_tokens.InvalidDownloadToken, 'no longer eligible'):
+            download_tokens.validate(token, self.photo_ids)
+
+    def test_token_is_bound_to_the_buyer(self):
+        token, _ = download_tokens.issue(self.order)
+        other = User.objects.create_user(email='other@example.com', password='secret')
+
+        with self.assertRaises(download_tokens.InvalidDownloadToken):
+            download_tokens.validate(token, self.photo_ids, user=other)
+
+    def test_expired_and_tampered_tokens_are_rejected(self):
+        expired, _ = download_tokens.issue(self.order, lifetime=timedelta(seconds=-1))
+        token, _ = download_tokens.issue(self.order)
+
+        with self.assertRaisesMessage(download_tokens.InvalidDownloadToken, 'expired'):
+            download_tokens.validate(expired, self.photo_ids)
+        with self.assertRaisesMessage(download_tokens.InvalidDownloadToken, 'Invalid'):
+            download_tokens.validate(token[:-1] + ('A' if token[-1] != 'A' else 'B'), self.photo_ids)
+
+    def test_legacy_tokens_are_consumed_once(self):
+        usable = DownloadToken.objects.create(
+            order=self.order, photo=self.photos[0], expires_at=timezone.now() + timedelta(days=1)
+        )
+        expired = DownloadToken.objects.create(
+            order=self.order, photo=self.photos[1], expires_at=timezone.now() - timedelta(days=1)
+        )
+
+        self.assertEqual(download_tokens.mark_legacy_used([usable.token, expired.token]), 1)
+        self.assertEqual(download_tokens.mark_legacy_used([usable.token]), 0)
+
+        usable.refresh_from_db()
+        expired.refresh_from_db()
+        self.assertTrue(usable.is_used)
+        self.assertIsNotNone(usable.used_at)
+        self.assertFalse(expired.is_used)
+
+    def test_legacy_tokens_of_other_users_are_not_consumed(self):
+        token = DownloadToken.objects.create(
+            order=self.order, photo=self.photos[0], expires_at=timezone.now() + timedelta(days=1)
+        )
+        other = User.objects.create_user(email='other@example.com', password='secret')
+
+        self.assertEqual(download_tokens.mark_legacy_used([token.token], user=other), 0)
+        self.assertEqual(download_tokens.mark_legacy_used([token.token], user=self.user), 1)
+
+
+class OrderPhotoDownloadViewTests(DownloadTokenTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.factory = APIRequestFactory()
+        self.token, _ = download_tokens.issue(self.order)
+        patcher = mock.patch('payments.views.order_views.serve_file', return_value=Response(status=200))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def download(self, photo, **headers):
+        request = self.factory.get(f'/api/payments/download/order/{self.token}/{photo.id}/', **headers)
+        force_authenticate(request, user=self.user)
+        return OrderPhotoDownloadView.as_view()(request, token=self.token, photo_id=photo.id)
+
+    def test_each_download_is_recorded(self):
+        self.assertEqual(self.download(self.photos[0]).status_code, 200)
+        self.assertEqual(self.download(self.photos[0]).status_code, 200)
+
+        self.assertEqual(Download.objects.filter(user=self.user, photo=self.photos[0]).count(), 2)
+
+    def test_resumed_chunks_and_revalidations_are_not_recorded(self):
+        self.download(self.photos[0])
+        self.download(self.photos[0], HTTP_RANGE='bytes=1024-')
+        self.download(self.photos[0], HTTP_IF_NONE_MATCH=self.photos[0].etag)
+
+        self.assertEqual(Download.objects.filter(photo=self.photos[0]).count(), 1)
+
+    def test_range_without_a_started_download_is_recorded(self):
+        self.download(self.photos[0], HTTP_RANGE='bytes=1024-')
+
+        self.assertEqual(Download.objects.filter(photo=self.photos[0]).count(), 1)
@@ -22,4 +22,7 @@ urlpatterns = [
     # Download tokens
     path('download-tokens/', views.DownloadTokenListView.as_view(), name='download-token-list'),
     path('download/<uuid:token>/', views.DownloadPhotoView.as_view(), name='download-photo'),
+    path('download-tokens/validate/', views.DownloadTokenValidateView.as_view(), name='download-token-validate'),
+    path('orders/<uuid:pk>/download-token/', views.OrderDownloadTokenView.as_view(), name='order-download-token'),
+    path('download/order/<str:token>/<uuid:photo_id>/', views.OrderPhotoDownloadView.as_view(), name='order-download-photo'),
 ]
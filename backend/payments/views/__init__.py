@@ -5,7 +5,10 @@ from .order_views import (
     CreateCheckoutSessionView,
     stripe_webhook,
     DownloadTokenListView,
-    DownloadPhotoView
+    DownloadPhotoView,
+    OrderDownloadTokenView,
+    OrderPhotoDownloadView,
+    DownloadTokenValidateView
 )
 
 from .payment_views import (
@@ -24,6 +27,9 @@ __all__ = [
     'stripe_webhook',
     'DownloadTokenListView',
     'DownloadPhotoView',
+    'OrderDownloadTokenView',
+    'OrderPhotoDownloadView',
+    'DownloadTokenValidateView',
     
     # Payment views
     'PaystackWebhookView',
@@ -42,5 +48,8 @@ __all__ = [
     'CreateCheckoutSessionView',
     'stripe_webhook',
     'DownloadTokenListView',
-    'DownloadPhotoView'
+    'DownloadPhotoView',
+    'OrderDownloadTokenView',
+    'OrderPhotoDownloadView',
+    'DownloadTokenValidateView'
 ]
@@ -1,10 +1,27 @@
+import uuid
+
 from rest_framework import generics, permissions
 from rest_framework.response import Response
 from rest_framework import status
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils import timezone
+
+from config.file_delivery import download_started_at, is_resumed, not_modified, serve_file, start_download
+
+from gallery.models import Download, Photo
+
+from .. import download_tokens
+from ..models import Order, OrderItem, DownloadToken
+from ..serializers import (
+    OrderSerializer,
+    OrderDetailSerializer,
+    OrderDownloadTokenSerializer,
+    DownloadTokenValidationSerializer,
+)
 
-from ..models import Order, OrderItem
-from ..serializers import OrderSerializer, OrderDetailSerializer
+# Substituted into the reversed download URL to produce a template
+PHOTO_ID_PLACEHOLDER = uuid.UUID(int=0)
 
 
 class OrderListView(generics.ListCreateAPIView):
@@ -76,9 +93,140 @@ class DownloadPhotoView(generics.RetrieveAPIView):
     lookup_url_kwarg = 'token'
 
     def get_queryset(self):
-        # Return the queryset of downloadable photos for the current user
-        return []
+        # Tokens issued for the current user's orders
+        return DownloadToken.objects.filter(order__user=self.request.user).select_related('photo')
 
     def retrieve(self, request, *args, **kwargs):
-        # Implementation for serving the photo file
-        return Response(status=status.HTTP_501_NOT_IMPLEMENTED)
+        token = self.get_object()
+        # A used token may still resume its own interrupted transfer for a short while
+        resuming = token.is_used and token.expires_at > timezone.now() and is_resumed(request, token.used_at)
+        if not token.is_valid() and not resuming:
+            return Response(
+                {'error': 'This download link has expired or was already used'},
+                status=status.HTTP_410_GONE
+            )
+
+        photo = token.photo
+        try:
+            response = serve_file(request, photo.image, content_type=photo.mime_type or None, etag=photo.etag)
+        except FileNotFoundError:
+            return Response({'error': 'File not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        # Revalidations and unsatisfiable ranges don't consume the token
+        if response.status_code not in (304, 416):
+            token.mark_as_used()
+        return response
+
+
+class OrderDownloadTokenView(generics.GenericAPIView):
+    """Issue one signed download token covering a paid order's photos"""
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = OrderDownloadTokenSerializer
+
+    def post(self, request, pk, *args, **kwargs):
+        order = get_object_or_404(Order, pk=pk, user=request.user)
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            token, expires_at = download_tokens.issue(order, serializer.validated_data.get('photo_ids'))
+        except download_tokens.InvalidDownloadToken as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'token': token,
+            'expires_at': expires_at,
+            'download_url': request.build_absolute_uri(
+                reverse('payments:order-download-photo', kwargs={'token': token, 'photo_id': PHOTO_ID_PLACEHOLDER})
+            ).replace(str(PHOTO_ID_PLACEHOLDER), '{photo_id}'),
+        }, status=status.HTTP_201_CREATED)
+
+
+class OrderPhotoDownloadView(generics.GenericAPIView):
+    """
+    Download one photo of an order with its signed download token. The
+    token can be reused until it expires; each download is recorded like
+    ``DownloadPhotoView`` records one, except resumed chunks and
+    revalidations of a download already recorded.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, token, photo_id, *args, **kwargs):
+        try:
+            payload = download_tokens.decode(token)
+            granted = download_tokens.entitled_photo_ids(payload, user=request.user)
+        except download_tokens.InvalidDownloadToken as e:
+            return Response({'error': str(e)}, status=status.HTTP_410_GONE)
+        if str(photo_id) not in granted:
+            return Response(
+                {'error': 'This photo is not covered by the download token'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        photo = get_object_or_404(
+            Photo.objects.select_related('gallery').only(
+                'id', 'image', 'mime_type', 'content_hash', 'title', 'gallery__id', 'gallery__title'
+            ),
+            pk=photo_id
+        )
+        etag = photo.etag
+        download_key = f"order:{payload['o']}:photo:{photo.id}:user:{request.user.id}"
+        if not is_resumed(request, download_started_at(download_key)) and not not_modified(request, etag):
+            start_download(download_key)
+            self.record_download(request, photo)
+        try:
+            return serve_file(request, photo.image, content_type=photo.mime_type or None, etag=etag)
+        except FileNotFoundError:
+            return Response({'error': 'File not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    def record_download(self, request, photo):
+        from customer_dashboard.models.activity import UserActivity
+        from customer_dashboard.utils.activity_logger import log_user_activity
+
+        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
+        Download.objects.create(
+            user=request.user,
+            photo=photo,
+            ip_address=x_forwarded_for.split(',')[0] if x_forwarded_for else request.META.get('REMOTE_ADDR')
+        )
+        log_user_activity(
+            user=request.user,
+            activity_type=UserActivity.ActivityType.PHOTO_DOWNLOAD,
+            obj=photo,
+            metadata={
+                'photo_id': str(photo.id),
+                'photo_title': getattr(photo, 'title', 'Untitled'),
+                'gallery_id': str(photo.gallery_id) if photo.gallery_id else None,
+                'gallery_title': photo.gallery.title if photo.gallery else None
+            }
+        )
+
+
+class DownloadTokenValidateView(generics.GenericAPIView):
+    """
+    Validate many downloads at once: photo ids against one signed order
+    token, or legacy per-photo tokens (optionally consuming them with a
+    single conditional UPDATE)
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = DownloadTokenValidationSerializer
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        if data.get('token'):
+            try:
+                valid, invalid = download_tokens.validate(data['token'], data['photo_ids'], user=request.user)
+            except download_tokens.InvalidDownloadToken as e:
+                return Response({'error': str(e)}, status=status.HTTP_410_GONE)
+            return Response({'valid': valid, 'invalid': invalid})
+
+        if data['mark_used']:
+            # The UPDATE itself decides which tokens were still usable
+            consumed = download_tokens.mark_legacy_used(data['tokens'], user=request.user)
+            return Response({'consumed': consumed})
+
+        valid, invalid = download_tokens.validate_legacy(data['tokens'], user=request.user)
+        return Response({'valid': valid, 'invalid': invalid})
@@ -2,10 +2,10 @@ import json
 import logging
 import time
 import uuid
+from django.conf import settings
 from django.db import transaction
 from django.utils import timezone
 from rest_framework import status, viewsets
-from rest_framework.generics import RetrieveAPIView
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
@@ -23,7 +23,7 @@ from tickets.models import TicketPurchase, EventTicket
 from accounts.models import CustomUser as User
 from payments.models import Transaction, Order, OrderItem
 from payments.paystack import Paystack
-from payments.services.paystack_service import paystack_service
+from payments import reconciliation
 from gallery.ticket_models.models import EventTicket
 from gallery.serializers import EventTicketSerializer as TicketSerializer
 from gallery.models import EventRegistration
@@ -414,6 +414,9 @@ class PaystackWebhookView(APIView):
                     txn.status = Transaction.STATUS_SUCCEEDED
                     if not txn.paystack_transaction_id:
                         txn.paystack_transaction_id = event_data.get('id')
+                    # The reconciler finds the transaction of a reference by this field
+                    if not txn.paystack_reference:
+                        txn.paystack_reference = reference
                     
                     # Update metadata with latest data
                     txn_metadata = txn.metadata or {}
@@ -423,7 +426,7 @@ class PaystackWebhookView(APIView):
                         'last_updated': timezone.now().isoformat()
                     })
                     txn.metadata = txn_metadata
-                    txn.save(update_fields=['status', 'paystack_transaction_id', 'metadata', 'updated_at'])
+                    txn.save(update_fields=['status', 'paystack_transaction_id', 'paystack_reference', 'metadata', 'updated_at'])
                     
                     # Update the related order status if it exists
                     if hasattr(txn, 'order') and txn.order:
@@ -520,6 +523,9 @@ class PaystackWebhookView(APIView):
                         elif not event_id or event_id == 'None':
                             logger.warning('No valid event ID found in transaction metadata, skipping registration update')
                     
+                    # Issues the tickets and publishes the result to the verify endpoint
+                    reconciliation.enqueue_on_commit(reference, txn.order.user_id if txn.order else None)
+                    
                     logger.info('Successfully processed payment for reference: %s', reference)
                     return Response(
                         {'status': 'success', 'message': 'Payment processed successfully'},
@@ -532,393 +538,48 @@ class PaystackWebhookView(APIView):
                     status=status.HTTP_500_INTERNAL_SERVER_ERROR
                 )
 
-class PaystackVerifyPaymentView(RetrieveAPIView):
-    """Verify a Paystack payment using the reference"""
+class PaystackVerifyPaymentView(APIView):
+    """
+    Result of a Paystack payment, by reference.
+
+    A cache read: the payment is verified by the background reconciler
+    (payments.reconciliation), never here. Until it settles the response
+    is 202 pending; poll again, or pass ``?wait=<seconds>`` to hold the
+    request open until the result is published. Only references of
+    transactions the user can access are queued.
+    """
     permission_classes = [IsAuthenticated]
-    
-    def get_queryset(self):
-        # First try to find transactions for the current user
-        user_transactions = Transaction.objects.select_related('order').filter(order__user=self.request.user)
-        
-        # Also include any transactions with this reference (for webhook-created transactions)
-        # This allows verification to find transactions created by webhooks even if they're associated with different users
-        reference = self.kwargs.get('reference')
-        if reference:
-            ref_transactions = Transaction.objects.select_related('order').filter(paystack_reference=reference)
-            # Combine querysets and remove duplicates, prioritizing user transactions
-            return (user_transactions | ref_transactions).distinct()
-        
-        return user_transactions
-        
-    def get_object(self):
-        # Override get_object to use paystack_reference instead of the default lookup_field
-        reference = self.kwargs.get('reference')
-        if not reference:
-            raise ValidationError({'reference': 'This field is required'})
-            
-        try:
-            txn = self.get_queryset().get(paystack_reference=reference)
-            
-            # Validate that the current user has access to this transaction
-            if not self._user_has_access_to_transaction(txn):
+
+    def get(self, request, reference):
+        result = reconciliation.get_result(reference)
+        if result is None:
+            txn = Transaction.objects.select_related('order').filter(paystack_reference=reference).first()
+            if txn is None:
+                raise NotFound({'reference': 'Transaction not found'})
+            if not reconciliation.transaction_access(txn, request.user):
                 raise ValidationError({'reference': 'You do not have access to this transaction'})
-                
-            return txn
-        except Transaction.DoesNotExist:
-            raise NotFound('Transaction not found')
-    
-    def _user_has_access_to_transaction(self, transaction):
-        """Check if the current user has access to the given transaction"""
-        user = self.request.user
-        
-        # User has access if the transaction belongs to them
-        if hasattr(transaction, 'order') and transaction.order and transaction.order.user == user:
-            return True
-            
-        # User has access if their email matches the customer email in metadata
-        metadata = transaction.metadata or {}
-        customer_email = metadata.get('customer_email')
-        if customer_email and customer_email == user.email:
-            return True
-            
-        return False
-    
-    def retrieve(self, request, *args, **kwargs):
-        reference = self.kwargs.get('reference')
-        user_id = request.user.id
-        logger.info(f'[Payment Verification] Verifying payment with reference: {reference} for user: {user_id}')
-        
-        # Log all transactions with this reference for debugging
-        all_txns = Transaction.objects.filter(paystack_reference=reference)
-        logger.info(f'[Payment Verification] Found {all_txns.count()} transactions with reference {reference}')
-        
-        # Debug: Log details of found transactions
-        for txn in all_txns:
-            logger.info(f'[Payment Verification] Transaction {txn.id}: user={getattr(txn.order.user if hasattr(txn, "order") and txn.order else None, "id", "None")}, status={txn.status}, metadata_keys={list(txn.metadata.keys()) if txn.metadata else "None"}')
-        
-        try:
-            # First try to get the transaction using our custom get_object method
-            txn = self.get_object()
-            logger.info(f'[Payment Verification] Found transaction: {txn.id} with status: {txn.status} and order: {getattr(txn, "order", None)}')
-            
-            # If transaction is already marked as succeeded, return success
-            if txn.status == Transaction.STATUS_SUCCEEDED:
-                logger.info(f'Transaction {txn.id} already marked as succeeded')
-                
-                # Check if tickets need to be created from webhook metadata
-                metadata = txn.metadata or {}
-                if 'ticket_details' in metadata and metadata['ticket_details']:
-                    logger.info(f'Found ticket details in transaction metadata, creating tickets')
-                    try:
-                        # Create tickets from webhook metadata
-                        if hasattr(txn, 'order') and txn.order:
-                            self._create_ticket_purchases(txn.order, txn)
-                            logger.info(f'Successfully created tickets from webhook metadata')
-                    except Exception as e:
-                        logger.error(f'Error creating tickets from webhook metadata: {str(e)}', exc_info=True)
-                
-                return Response({
-                    'status': 'success',
-                    'message': 'Payment already verified',
-                    'data': {
-                        'reference': reference,
-                        'transaction_id': str(txn.id),
-                        'amount': txn.amount,
-                        'currency': txn.currency,
-                        'status': txn.status
-                    }
-                })
-                
-        except NotFound:
-            logger.warning(f'Transaction not found for reference: {reference}')
-            # Try to verify with Paystack directly
+            reconciliation.enqueue(reference, request.user.id)
             try:
-                # First check if the transaction was already created by the webhook
-                webhook_txn = Transaction.objects.filter(paystack_reference=reference).first()
-                if webhook_txn:
-                    logger.info(f'Found transaction {webhook_txn.id} created by webhook for reference: {reference}')
-                    return Response({
-                        'status': 'success',
-                        'message': 'Payment verified successfully',
-                        'data': {'status': 'success', 'reference': reference},
-                        'order_id': str(webhook_txn.order.id) if webhook_txn.order else None,
-                        'transaction_id': str(webhook_txn.id)
-                    })
-                
-                # If not found, verify with Paystack directly
-                response = paystack_service.verify_payment(reference)
-                if response.get('status') and response['data'].get('status') == 'success':
-                    # Create transaction record if it doesn't exist
-                    with transaction.atomic():
-                        # Get amount from Paystack response and convert from kobo
-                        amount = float(response['data'].get('amount', 0)) / 100
-                        currency = response['data'].get('currency', 'KES')
-                        
-                        # Create order with proper field values - check what fields your Order model actually has
-                        order_data = {
-                            'user': request.user,
-                            'status': 'paid',
-                            'currency': currency,
-                            'paid_at': timezone.now(),
-                        }
-                        
-                        # Add amount fields based on your Order model structure
-                        # Try different possible field names for amounts
-                        from payments.models import Order as OrderModel
-                        if hasattr(OrderModel, 'subtotal'):
-                            order_data['subtotal'] = amount
-                        if hasattr(OrderModel, 'total'):
-                            order_data['total'] = amount
-                        if hasattr(OrderModel, 'total_amount'):
-                            order_data['total_amount'] = amount
-                        if hasattr(OrderModel, 'amount'):
-                            order_data['amount'] = amount
-                            
-                        # Add tax amount if the field exists
-                        if hasattr(OrderModel, 'tax_amount'):
-                            order_data['tax_amount'] = 0
-                            
-                        # Set billing information with proper fallbacks
-                        if hasattr(OrderModel, 'billing_email'):
-                            order_data['billing_email'] = getattr(request.user, 'email', '')
-                            
-                        # Ensure billing_name is always set with a valid value
-                        if hasattr(OrderModel, 'billing_name'):
-                            first_name = getattr(request.user, 'first_name', '')
-                            last_name = getattr(request.user, 'last_name', '')
-                            username = getattr(request.user, 'username', 'Customer')
-                            
-                            # Create billing name from first and last name if available
-                            billing_name = f"{first_name} {last_name}".strip()
-                            # Fall back to username if no name is available
-                            billing_name = billing_name if billing_name else username
-                            # Final fallback to a generic name if everything else is empty
-                            billing_name = billing_name or 'Customer'
-                            
-                            order_data['billing_name'] = billing_name
-                            
-                        order = Order.objects.create(**order_data)
-                        
-                        # Create transaction data
-                        txn_data = {
-                            'order': order,
-                            'transaction_type': Transaction.TYPE_CHARGE,
-                            'amount': amount,
-                            'currency': currency,
-                            'status': Transaction.STATUS_SUCCEEDED,
-                            'paystack_reference': reference,
-                            'metadata': response['data'].get('metadata', {})
-                        }
-                        
-                        # Add paystack_transaction_id if available
-                        paystack_transaction_id = response['data'].get('id')
-                        if paystack_transaction_id:
-                            txn_data['paystack_transaction_id'] = paystack_transaction_id
-                            
-                        txn = Transaction.objects.create(**txn_data)
-                        
-                        # Process any ticket purchases from metadata if available
-                        metadata = response['data'].get('metadata', {})
-                        if isinstance(metadata, dict) and 'ticket_details' in metadata:
-                            self._create_ticket_purchases(order, txn)
-                    
-                    return Response({
-                        'status': 'success',
-                        'message': 'Payment verified successfully',
-                        'data': response['data'],
-                        'order_id': order.id,
-                        'transaction_id': txn.id
-                    })
-                
-                # If payment is still pending
-                return Response({
-                    'status': 'pending',
-                    'message': 'Payment is still being processed',
-                    'data': response.get('data', {})
-                }, status=status.HTTP_202_ACCEPTED)
-                
-            except Exception as e:
-                logger.error(f'Error verifying payment with Paystack: {str(e)}', exc_info=True)
-                return Response({
-                    'status': 'error',
-                    'message': 'Transaction not found and could not be verified with Paystack',
-                    'error': str(e)
-                }, status=status.HTTP_404_NOT_FOUND)
-        
-        # If we found an existing transaction, verify with Paystack
-        try:
-            response = paystack_service.verify_payment(reference)
-            logger.debug(f'Paystack verification response: {response}')
-            
-            if response.get('status') and response['data'].get('status') == 'success':
-                # Payment was successful - update our records
-                with transaction.atomic():
-                    # Update transaction status
-                    txn.status = Transaction.STATUS_SUCCEEDED
-                    
-                    # Update paystack transaction ID if not set
-                    if not txn.paystack_transaction_id:
-                        txn.paystack_transaction_id = response['data'].get('id')
-                    
-                    # Update metadata
-                    current_metadata = txn.metadata or {}
-                    current_metadata.update({
-                        'paystack_verification_response': response['data'],
-                        'last_verified_at': timezone.now().isoformat()
-                    })
-                    txn.metadata = current_metadata
-                    
-                    txn.save()
-                    
-                    # Update order status if it exists
-                    if hasattr(txn, 'order') and txn.order:
-                        txn.order.status = 'paid'
-                        txn.order.save()
-                        
-                        # Process ticket purchases if not already done
-                        if not hasattr(txn.order, 'items') or not txn.order.items.exists():
-                            self._create_ticket_purchases(txn.order, txn)
-                        
-                        # Update any related registrations
-                        from gallery.models import EventRegistration
-                        EventRegistration.objects.filter(
-                            order=txn.order,
-                            status__in=['pending', 'reserved', 'pending_payment']
-                        ).update(
-                            status='confirmed',
-                            confirmed_at=timezone.now()
-                        )
-                
-                return Response({
-                    'status': 'success',
-                    'message': 'Payment verified successfully',
-                    'data': response['data'],
-                    'order_id': txn.order.id if hasattr(txn, 'order') and txn.order else None,
-                    'transaction_id': txn.id
-                })
-            else:
-                # Payment failed or is pending
-                status_message = response.get('message', 'Payment is still being processed')
-                logger.info(f'Payment {reference} is pending: {status_message}')
-                return Response({
-                    'status': 'pending',
-                    'message': status_message,
-                    'data': response.get('data', {})
-                }, status=status.HTTP_202_ACCEPTED)
-                
-        except Exception as e:
-            logger.error(f'Error verifying payment: {str(e)}', exc_info=True)
+                wait = min(float(request.query_params.get('wait', 0)), settings.PAYSTACK_VERIFY_MAX_WAIT)
+            except ValueError:
+                wait = 0
+            if wait > 0:
+                result = reconciliation.wait_for_result(reference, wait)
+
+        if result is None:
             return Response({
-                'status': 'error',
-                'message': 'An error occurred while verifying your payment',
-                'error': str(e)
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+                'status': 'pending',
+                'message': 'Payment is still being processed',
+                'data': {'reference': reference}
+            }, status=status.HTTP_202_ACCEPTED)
 
-    def _create_ticket_purchases(self, order, transaction):
-        """Create ticket purchases for each item in the order"""
-        try:
-            # Get user from order
-            user = order.user if hasattr(order, 'user') and order.user else None
-            
-            if not user:
-                logger.error('No user found for ticket purchase')
-                return
-                
-            # Get metadata from transaction
-            metadata = transaction.metadata or {}
-            ticket_details = []
-            
-            # Try to get ticket details from metadata first
-            if 'ticket_details' in metadata and metadata['ticket_details']:
-                try:
-                    # Check if ticket_details is already a list or needs to be parsed
-                    if isinstance(metadata['ticket_details'], str):
-                        ticket_details = json.loads(metadata['ticket_details'])
-                    else:
-                        ticket_details = metadata['ticket_details']
-                    logger.info(f'Found {len(ticket_details)} ticket(s) in metadata')
-                except (json.JSONDecodeError, TypeError, AttributeError) as e:
-                    logger.warning(f'Failed to parse ticket_details from metadata: {e}')
-            
-            # If no ticket details found in metadata, try to get from order items
-            if not ticket_details and hasattr(order, 'items') and hasattr(order.items, 'all'):
-                logger.info('No ticket details in metadata, checking order items')
-                try:
-                    order_items = order.items.all()
-                    for item in order_items:
-                        # Check if item has content_object attribute
-                        if hasattr(item, 'content_object'):
-                            ticket_type = item.content_object
-                            if isinstance(ticket_type, EventTicket):
-                                ticket_details.append({
-                                    'ticket_id': str(ticket_type.id),
-                                    'name': getattr(ticket_type, 'name', f'Ticket {ticket_type.id}'),
-                                    'price': float(getattr(item, 'price', 0) or 0),
-                                    'quantity': int(getattr(item, 'quantity', 1) or 1),
-                                    'event_id': str(ticket_type.event_id) if hasattr(ticket_type, 'event_id') else ''
-                                })
-                except Exception as e:
-                    logger.warning(f'Error getting order items: {e}')
-            
-            # If we still don't have ticket details, log a warning and return
-            if not ticket_details:
-                logger.warning(f'No ticket details found for order {order.id} and transaction {transaction.id}')
-                return
-                
-            # Process each ticket detail
-            tickets_created = 0
-            for ticket_data in ticket_details:
-                try:
-                    # Try both 'ticket_id' and 'id' as possible keys for the ticket ID
-                    ticket_id = ticket_data.get('ticket_id') or ticket_data.get('id')
-                    if not ticket_id:
-                        logger.warning('Skipping ticket with missing ID')
-                        continue
-                        
-                    # Get ticket type
-                    try:
-                        ticket_type = EventTicket.objects.get(id=ticket_id)
-                    except EventTicket.DoesNotExist:
-                        logger.warning(f'Ticket type {ticket_id} not found, skipping')
-                        continue
-                        
-                    # Get quantity and price with proper defaults
-                    quantity = int(ticket_data.get('quantity', 1))
-                    price = float(ticket_data.get('price', 0))
-                    amount_paid = price * quantity
-                    # Get event ID from ticket data or fall back to ticket type
-                    event_id = ticket_data.get('event_id')
-                    if not event_id and hasattr(ticket_type, 'event_id'):
-                        event_id = str(ticket_type.event_id)
-                    
-                    # Create the ticket purchase
-                    try:
-                        ticket_purchase = TicketPurchase.objects.create(
-                            user=user,
-                            event_ticket=ticket_type,
-                            quantity=quantity,
-                            status='confirmed',
-                            payment_method='paystack',
-                            payment_intent_id=transaction.paystack_reference or transaction.reference or f'txn-{transaction.id}',
-                            total_price=amount_paid
-                        )
-                        
-                        tickets_created += 1
-                        logger.info(f'Created ticket purchase {ticket_purchase.id} for ticket type {ticket_type.id}')
-                        
-                    except Exception as e:
-                        logger.error(f'Error creating ticket purchase for ticket {ticket_id}: {str(e)}', exc_info=True)
-                        continue
-                except Exception as e:
-                    logger.error(f'Error processing ticket data: {str(e)}', exc_info=True)
-                    continue
-            
-            if tickets_created == 0:
-                logger.warning(f'No ticket purchases were created for order {order.id} and transaction {transaction.id}')
-            else:
-                logger.info(f'Successfully created {tickets_created} ticket purchase(s)')
-                    
-        except Exception as e:
-            logger.error(f'Error in _create_ticket_purchases: {str(e)}', exc_info=True)
-            # Don't raise the exception here, just log it
-            pass
\ No newline at end of file
+        if not reconciliation.can_access(request.user, result['user_id'], result.get('customer_email')):
+            raise ValidationError({'reference': 'You do not have access to this transaction'})
+
+        return Response({
+            'status': result['status'],
+            'message': result['message'],
+            'data': result['data'],
+            'order_id': result['order_id'],
+            'transaction_id': result['transaction_id']
+        })
@@ -1,3 +1,10 @@
 from django.contrib import admin
+from .models import PhotographerDailyStats
 
-# Register your models here.
+
+@admin.register(PhotographerDailyStats)
+class PhotographerDailyStatsAdmin(admin.ModelAdmin):
+    list_display = ('photographer', 'date', 'galleries_created', 'photos_uploaded', 'bytes_uploaded', 'downloads', 'earnings')
+    list_filter = ('date',)
+    search_fields = ('photographer__email',)
+    raw_id_fields = ('photographer',)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class PhotographerDashboardConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'photographer_dashboard'
+
+    def ready(self):
+        # Import signals to register them
+        import photographer_dashboard.signals  # noqa
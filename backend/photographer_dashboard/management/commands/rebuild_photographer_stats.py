@@ -0,0 +1,33 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Min
+from django.utils import timezone
+
+from gallery.models import Gallery
+from photographer_dashboard.rollups import compact
+
+
+class Command(BaseCommand):
+    help = 'Rebuild photographer daily stats rollups from the raw gallery, photo, download and payment tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='Only rebuild the last N days (default: full history)')
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        if options['days']:
+            start_date = today - timedelta(days=options['days'] - 1)
+        else:
+            first = Gallery.objects.aggregate(first=Min('created_at'))['first']
+            start_date = timezone.localtime(first).date() if first else today
+
+        # Compact in monthly windows to keep each transaction small
+        total = 0
+        window_start = start_date
+        while window_start <= today:
+            window_end = min(window_start + timedelta(days=30), today)
+            total += compact(window_start, window_end)
+            window_start = window_end + timedelta(days=1)
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {total} photographer stats rows since {start_date}'))
@@ -0,0 +1,36 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PhotographerDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('galleries_created', models.IntegerField(default=0)),
+                ('active_galleries_created', models.IntegerField(default=0)),
+                ('photos_uploaded', models.IntegerField(default=0)),
+                ('bytes_uploaded', models.BigIntegerField(default=0)),
+                ('downloads', models.IntegerField(default=0)),
+                ('earnings', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('photographer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Photographer Daily Stats',
+                'verbose_name_plural': 'Photographer Daily Stats',
+                'ordering': ['-date'],
+                'unique_together': {('photographer', 'date')},
+            },
+        ),
+    ]
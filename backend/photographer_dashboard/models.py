@@ -1,3 +1,36 @@
 from django.db import models
+from django.conf import settings
 
-# Create your models here.
+
+class PhotographerDailyStats(models.Model):
+    """
+    Per-photographer, per-day rollup of dashboard statistics.
+
+    Counters are bumped by signals as galleries, photos and downloads are
+    created or removed, and recomputed from the raw tables by a periodic
+    compaction task (which is also the only source of ``earnings``). Values
+    are net changes for the day the underlying object was created, so a sum
+    over all rows gives current totals.
+    """
+    photographer = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='daily_stats'
+    )
+    date = models.DateField()
+    galleries_created = models.IntegerField(default=0)
+    active_galleries_created = models.IntegerField(default=0)
+    photos_uploaded = models.IntegerField(default=0)
+    bytes_uploaded = models.BigIntegerField(default=0)
+    downloads = models.IntegerField(default=0)
+    earnings = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Photographer Daily Stats'
+        verbose_name_plural = 'Photographer Daily Stats'
+        ordering = ['-date']
+        unique_together = ('photographer', 'date')
+
+    def __str__(self):
+        return f"{self.photographer_id} - {self.date}"
@@ -0,0 +1,190 @@
+"""
+Maintenance and reads of the ``PhotographerDailyStats`` rollups.
+"""
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import PhotographerDailyStats
+
+logger = logging.getLogger(__name__)
+
+COUNTERS = (
+    'galleries_created',
+    'active_galleries_created',
+    'photos_uploaded',
+    'bytes_uploaded',
+    'downloads',
+    'earnings',
+)
+
+
+def day_of(value):
+    return timezone.localtime(value).date() if value else timezone.localdate()
+
+
+def bump(photographer_id, date, **deltas):
+    """Apply counter deltas to one rollup row, creating it if needed."""
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not photographer_id or not deltas:
+        return
+    updates = {field: F(field) + delta for field, delta in deltas.items()}
+    rows = PhotographerDailyStats.objects.filter(photographer_id=photographer_id, date=date)
+    if rows.update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            PhotographerDailyStats.objects.create(photographer_id=photographer_id, date=date, **deltas)
+    except IntegrityError:
+        # Created concurrently; apply the delta to that row instead
+        rows.update(**updates)
+
+
+def _daily(queryset, photographer_field, date_field, **aggregates):
+    """Group ``queryset`` by photographer and day of ``date_field``."""
+    return queryset.annotate(day=TruncDate(date_field)).values(photographer_field, 'day').annotate(**aggregates)
+
+
+def _recompute(start_date, end_date, photographer_ids=None):
+    """Counter values per ``(photographer_id, date)`` from the raw tables."""
+    from gallery.models import Gallery, Photo, Download, Payment
+
+    rows = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+
+    galleries = Gallery.objects.filter(created_at__date__gte=start_date, created_at__date__lte=end_date)
+    photos = Photo.objects.filter(created_at__date__gte=start_date, created_at__date__lte=end_date)
+    downloads = Download.objects.filter(downloaded_at__date__gte=start_date, downloaded_at__date__lte=end_date)
+    payments = Payment.objects.filter(
+        status='completed', created_at__date__gte=start_date, created_at__date__lte=end_date
+    )
+    if photographer_ids is not None:
+        galleries = galleries.filter(photographer_id__in=photographer_ids)
+        photos = photos.filter(gallery__photographer_id__in=photographer_ids)
+        downloads = downloads.filter(photo__gallery__photographer_id__in=photographer_ids)
+        payments = payments.filter(downloads__photo__gallery__photographer_id__in=photographer_ids)
+
+    for row in _daily(galleries, 'photographer_id', 'created_at',
+                      total=Count('id'), active=Count('id', filter=Q(is_active=True))):
+        key = (row['photographer_id'], row['day'])
+        rows[key]['galleries_created'] = row['total']
+        rows[key]['active_galleries_created'] = row['active']
+
+    for row in _daily(photos, 'gallery__photographer_id', 'created_at',
+                      total=Count('id'), size=Sum('file_size')):
+        key = (row['gallery__photographer_id'], row['day'])
+        rows[key]['photos_uploaded'] = row['total']
+        rows[key]['bytes_uploaded'] = row['size'] or 0
+
+    for row in _daily(downloads, 'photo__gallery__photographer_id', 'downloaded_at', total=Count('id')):
+        key = (row['photo__gallery__photographer_id'], row['day'])
+        rows[key]['downloads'] = row['total']
+
+    # A payment counts once per photographer whose photos it covered
+    seen = set()
+    for payment_id, amount, created_at, photographer_id in payments.values_list(
+        'id', 'amount', 'created_at', 'downloads__photo__gallery__photographer_id'
+    ).distinct():
+        if photographer_id is None or (payment_id, photographer_id) in seen:
+            continue
+        seen.add((payment_id, photographer_id))
+        key = (photographer_id, day_of(created_at))
+        rows[key]['earnings'] = rows[key]['earnings'] + (amount or Decimal('0'))
+
+    return rows
+
+
+def compact(start_date, end_date=None, photographer_ids=None):
+    """
+    Recompute rollup rows for ``start_date``..``end_date`` from the raw tables.
+
+    This is the authoritative path: it fixes any drift from missed signals
+    and is the only writer of ``earnings``. Returns the number of rows
+    written.
+
+    The window's rows are locked before the raw tables are read, and
+    rewritten in place. A signal bump that comes in during the rebuild
+    waits for it and then applies on top of the recomputed totals. A bump
+    made before the lock belongs to a save whose rows the recount sees.
+    """
+    end_date = end_date or timezone.localdate()
+
+    with transaction.atomic():
+        existing = PhotographerDailyStats.objects.filter(date__gte=start_date, date__lte=end_date)
+        if photographer_ids is not None:
+            existing = existing.filter(photographer_id__in=photographer_ids)
+        locked = {
+            (row.photographer_id, row.date): row for row in existing.select_for_update().order_by('pk')
+        }
+
+        rows = _recompute(start_date, end_date, photographer_ids)
+
+        changed, created = [], []
+        for (photographer_id, date), values in rows.items():
+            if photographer_id is None:
+                continue
+            row = locked.pop((photographer_id, date), None)
+            if row is None:
+                created.append(PhotographerDailyStats(photographer_id=photographer_id, date=date, **values))
+                continue
+            for field, value in values.items():
+                setattr(row, field, value)
+            changed.append(row)
+        PhotographerDailyStats.objects.bulk_update(changed, COUNTERS, batch_size=1000)
+        PhotographerDailyStats.objects.bulk_create(created, batch_size=1000)
+        # Nothing left in the raw tables for these
+        if locked:
+            PhotographerDailyStats.objects.filter(pk__in=[row.pk for row in locked.values()]).delete()
+    return len(rows)
+
+
+def dashboard_stats(user):
+    """
+    Build the ``DashboardStatsView`` payload from the user's rollup rows with
+    a single aggregate query.
+    """
+    now = timezone.now()
+    today = timezone.localdate()
+    last_7 = today - timedelta(days=6)
+    last_30 = today - timedelta(days=29)
+    last_60 = today - timedelta(days=59)
+
+    recent = Q(date__gte=last_30)
+    totals = PhotographerDailyStats.objects.filter(photographer=user).aggregate(
+        galleries=Sum('galleries_created'),
+        recent_galleries=Sum('galleries_created', filter=recent),
+        active=Sum('active_galleries_created'),
+        recent_active=Sum('active_galleries_created', filter=recent),
+        earnings=Sum('earnings'),
+        recent_earnings=Sum('earnings', filter=Q(date__gte=last_7)),
+        storage=Sum('bytes_uploaded'),
+        recent_storage=Sum('bytes_uploaded', filter=recent),
+        prev_storage=Sum('bytes_uploaded', filter=Q(date__gte=last_60, date__lt=last_30)),
+    )
+    totals = {key: value or 0 for key, value in totals.items()}
+    storage_change = ((totals['recent_storage'] - totals['prev_storage']) / (totals['prev_storage'] or 1)) * 100
+
+    return {
+        'galleries': {
+            'total': totals['galleries'],
+            'recent': totals['recent_galleries'],
+        },
+        'activeSessions': {
+            'total': totals['active'],
+            'recent': totals['recent_active'],
+        },
+        'earnings': {
+            'total': float(totals['earnings']),
+            'recent': float(totals['recent_earnings']),
+        },
+        'storageUsed': {
+            'used': round(totals['storage'] / (1024 ** 3), 2),  # Convert to GB
+            'change': round(storage_change, 1),  # Percentage change
+        },
+        'timestamp': now.isoformat(),
+    }
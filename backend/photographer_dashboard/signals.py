@@ -0,0 +1,77 @@
+import logging
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from gallery.models import Gallery, Photo, Download
+from .rollups import bump, day_of
+
+logger = logging.getLogger(__name__)
+
+
+def _safe_bump(photographer_id, date, **deltas):
+    """Rollups are best effort here; the compaction task repairs any miss."""
+    try:
+        bump(photographer_id, date, **deltas)
+    except Exception as e:
+        logger.error(f"Error updating photographer stats for {photographer_id}: {str(e)}")
+
+
+@receiver(post_save, sender=Gallery)
+def rollup_gallery_saved(sender, instance, created, **kwargs):
+    """
+    Count new galleries and is_active toggles against the gallery's creation day
+    """
+    day = day_of(instance.created_at)
+    if created:
+        _safe_bump(
+            instance.photographer_id, day,
+            galleries_created=1,
+            active_galleries_created=1 if instance.is_active else 0,
+        )
+    elif instance.tracker.has_changed('is_active'):
+        _safe_bump(instance.photographer_id, day, active_galleries_created=1 if instance.is_active else -1)
+
+
+@receiver(post_delete, sender=Gallery)
+def rollup_gallery_deleted(sender, instance, **kwargs):
+    _safe_bump(
+        instance.photographer_id, day_of(instance.created_at),
+        galleries_created=-1,
+        active_galleries_created=-1 if instance.is_active else 0,
+    )
+
+
+def _photographer_of_photo(photo):
+    return Gallery.objects.filter(pk=photo.gallery_id).values_list('photographer_id', flat=True).first()
+
+
+@receiver(post_save, sender=Photo)
+def rollup_photo_saved(sender, instance, created, **kwargs):
+    if not created:
+        return
+    _safe_bump(
+        _photographer_of_photo(instance), day_of(instance.created_at),
+        photos_uploaded=1,
+        bytes_uploaded=instance.file_size or 0,
+    )
+
+
+@receiver(post_delete, sender=Photo)
+def rollup_photo_deleted(sender, instance, **kwargs):
+    # Cascaded deletes remove photos before their gallery, so the lookup still works
+    _safe_bump(
+        _photographer_of_photo(instance), day_of(instance.created_at),
+        photos_uploaded=-1,
+        bytes_uploaded=-(instance.file_size or 0),
+    )
+
+
+@receiver(post_save, sender=Download)
+def rollup_download_saved(sender, instance, created, **kwargs):
+    if not created:
+        return
+    photographer_id = Photo.objects.filter(pk=instance.photo_id).values_list(
+        'gallery__photographer_id', flat=True
+    ).first()
+    _safe_bump(photographer_id, day_of(instance.downloaded_at), downloads=1)
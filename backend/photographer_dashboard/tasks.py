@@ -0,0 +1,24 @@
+from celery import shared_task
+from django.utils import timezone
+from datetime import timedelta
+import logging
+
+logger = logging.getLogger(__name__)
+
+@shared_task
+def compact_photographer_stats(days=2):
+    """
+    Task to recompute the last ``days`` days of photographer rollups from the
+    raw tables (earnings and any drift from missed signals)
+    """
+    from photographer_dashboard.rollups import compact
+
+    try:
+        start_date = timezone.localdate() - timedelta(days=days - 1)
+        count = compact(start_date)
+        logger.info(f"Compacted {count} photographer stats rows since {start_date}")
+        return True
+
+    except Exception as e:
+        logger.error(f"Error compacting photographer stats: {str(e)}")
+        return False
@@ -1,4 +1,8 @@
 from django.urls import path
+
+from config.auth_profiles import apply_auth_profile
+from config.db_router import apply_replica_reads
+
 from . import views
 
 app_name = 'photographer_dashboard'
@@ -7,3 +11,8 @@ urlpatterns = [
     path('stats/', views.DashboardStatsView.as_view(), name='dashboard-stats'),
     path('activity/', views.DashboardActivityView.as_view(), name='dashboard-activity'),
 ]
+
+# Only called by the frontend with a bearer token
+urlpatterns = apply_auth_profile('jwt-only', urlpatterns)
+# Dashboards are read-heavy; GETs read from the replica when one is configured
+urlpatterns = apply_replica_reads(urlpatterns)
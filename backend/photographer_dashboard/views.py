@@ -10,6 +10,7 @@ from gallery.models import Gallery, Photo, Payment, Download
 from accounts.models import CustomUser
 from django.conf import settings
 import os
+from .rollups import dashboard_stats
 
 class DashboardStatsView(APIView):
     permission_classes = [IsAuthenticated]
@@ -37,63 +38,8 @@ class DashboardStatsView(APIView):
         if cached_data:
             return Response(cached_data)
         
-        # Calculate time ranges
-        now = timezone.now()
-        thirty_days_ago = now - timedelta(days=30)
-        seven_days_ago = now - timedelta(days=7)
-        
-        # Get galleries data for the specified user
-        galleries = Gallery.objects.filter(photographer=user)
-        recent_galleries = galleries.filter(created_at__gte=thirty_days_ago)
-        
-        
-        # Get payments data
-        payments = Payment.objects.filter(
-            status='completed',
-            downloads__photo__gallery__photographer=user
-        ).distinct()
-        
-
-        # Calculate storage used
-        photos = Photo.objects.filter(gallery__photographer=user)
-        total_storage = photos.aggregate(total=Sum('file_size'))['total'] or 0
-        
-        
-            
-        
-        # Calculate storage used in last 30 days
-        recent_photos = photos.filter(created_at__gte=thirty_days_ago)
-        recent_storage = recent_photos.aggregate(total=Sum('file_size'))['total'] or 0
-        
-        # Calculate previous period for comparison
-        prev_period_start = now - timedelta(days=60)
-        prev_period_photos = photos.filter(
-            created_at__gte=prev_period_start,
-            created_at__lt=thirty_days_ago
-        )
-        prev_storage = prev_period_photos.aggregate(total=Sum('file_size'))['total'] or 0
-        storage_change = ((recent_storage - prev_storage) / (prev_storage or 1)) * 100
-        
-        # Prepare stats
-        stats = {
-            'galleries': {
-                'total': galleries.count(),
-                'recent': recent_galleries.count(),
-            },
-            'activeSessions': {
-                'total': galleries.filter(is_active=True).count(),
-                'recent': recent_galleries.filter(is_active=True).count(),
-            },
-            'earnings': {
-                'total': float(payments.aggregate(total=Sum('amount'))['total'] or 0),
-                'recent': float(payments.filter(created_at__gte=seven_days_ago).aggregate(total=Sum('amount'))['total'] or 0),
-            },
-            'storageUsed': {
-                'used': round(total_storage / (1024 ** 3), 2),  # Convert to GB
-                'change': round(storage_change, 1),  # Percentage change
-            },
-            'timestamp': now.isoformat(),
-        }
+        # Read the precomputed daily rollups instead of scanning raw tables
+        stats = dashboard_stats(user)
         
         # Cache the data for 5 minutes
         cache.set(cache_key, stats, timeout=300)
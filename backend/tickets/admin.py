@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
+from . import gate
 from .models import TicketPurchase
 from gallery.ticket_models.models import EventTicket, TicketType
 
@@ -79,11 +80,12 @@ class TicketPurchaseAdmin(admin.ModelAdmin):
     
     # Admin actions
     def mark_as_confirmed(self, request, queryset):
-        updated = queryset.filter(status='pending').update(status='confirmed')
+        # Logs manifest changes and syncs the gate, which a plain update() would skip
+        updated = gate.bulk_update_status(queryset, 'pending', 'confirmed')
         self.message_user(request, f"{updated} ticket(s) marked as confirmed.")
     
     def mark_as_used(self, request, queryset):
-        updated = queryset.filter(status='confirmed').update(status='used')
+        updated = gate.bulk_update_status(queryset, 'confirmed', 'used')
         self.message_user(request, f"{updated} ticket(s) marked as used.")
     
     def mark_as_cancelled(self, request, queryset):
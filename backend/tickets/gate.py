@@ -0,0 +1,352 @@
+"""
+Gate scanning: atomic check-in of ticket purchases at venue doors.
+
+A check-in is a single conditional ``UPDATE ... WHERE status='confirmed'``,
+so two scanners reading the same ticket can never both admit it. For each
+event a set of still-valid verification codes is kept in Redis so codes
+that were never valid for the event are rejected without a database round
+trip.
+"""
+import logging
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, When, Value, DateTimeField
+from django.utils import timezone
+
+from config.redis_client import get_redis
+from gallery.ticket_models.models import EventTicket
+from . import manifest
+from .models import TicketPurchase, TicketManifestChange
+
+logger = logging.getLogger(__name__)
+
+ADMITTED = 'admitted'
+ALREADY_USED = 'already_used'
+NOT_VALID = 'not_valid'
+NOT_FOUND = 'not_found'
+
+HOT_SET_KEY = 'gate:event:{}:codes'
+HOT_SET_TTL = int(timedelta(days=2).total_seconds())
+TICKET_IDS_KEY = 'gate:event:{}:ticket_ids'
+
+
+def _event_ticket_ids(event_id):
+    key = TICKET_IDS_KEY.format(event_id)
+    ids = cache.get(key)
+    if ids is None:
+        ids = list(EventTicket.objects.filter(event_id=event_id).values_list('id', flat=True))
+        cache.set(key, ids, 300)
+    return ids
+
+
+def forget_event_tickets(event_id):
+    """Drop the cached ticket ids of an event after its ticket types change."""
+    cache.delete(TICKET_IDS_KEY.format(event_id))
+
+
+def _purchases(event_id=None):
+    """Purchases scoped to an event without a join, so MySQL keeps the UPDATE single-statement."""
+    queryset = TicketPurchase.objects.all()
+    if event_id is not None:
+        queryset = queryset.filter(event_ticket_id__in=_event_ticket_ids(event_id))
+    return queryset
+
+
+def warm_event(event_id):
+    """(Re)build the hot set of confirmed verification codes for an event."""
+    codes = [
+        str(code) for code in _purchases(event_id).filter(status='confirmed')
+        .values_list('verification_code', flat=True)
+    ]
+    key = HOT_SET_KEY.format(event_id)
+    client = get_redis()
+    pipe = client.pipeline()
+    pipe.delete(key)
+    for start in range(0, len(codes), 1000):
+        pipe.sadd(key, *codes[start:start + 1000])
+    # An empty marker member keeps the set alive for events with no valid codes
+    pipe.sadd(key, '')
+    pipe.expire(key, HOT_SET_TTL)
+    pipe.execute()
+    return len(codes)
+
+
+def schedule_warm(event_id):
+    """Queue a hot set build for an event, at most once a minute."""
+    from .tasks import warm_gate_codes
+
+    if cache.add(f'gate:warming:{event_id}', True, 60):
+        transaction.on_commit(lambda: warm_gate_codes.delay(event_id))
+
+
+def add_code(event_id, code):
+    """Add a newly confirmed code to the event's hot set if the set is warm."""
+    key = HOT_SET_KEY.format(event_id)
+    client = get_redis()
+    if client.exists(key):
+        client.sadd(key, str(code))
+
+
+def remove_codes(event_id, codes):
+    if event_id is None or not codes:
+        return
+    get_redis().srem(HOT_SET_KEY.format(event_id), *[str(code) for code in codes])
+
+
+def _hot_set_rejects(event_id, code):
+    """True when the event's hot set is warm and does not contain ``code``."""
+    if event_id is None:
+        return False
+    try:
+        key = HOT_SET_KEY.format(event_id)
+        pipe = get_redis().pipeline()
+        pipe.exists(key)
+        pipe.sismember(key, str(code))
+        exists, member = pipe.execute()
+        if not exists:
+            schedule_warm(event_id)
+        return bool(exists) and not member
+    except Exception as e:
+        # Redis is an optimisation only; the database stays authoritative
+        logger.error(f"Gate hot set unavailable for event {event_id}: {str(e)}")
+        return False
+
+
+def _result(code, outcome, checked_in_at=None):
+    payload = {'code': str(code), 'result': outcome}
+    if checked_in_at is not None:
+        payload['checked_in_at'] = checked_in_at.isoformat()
+    return payload
+
+
+def _classify(rows):
+    """Map rows of (verification_code, status, checked_in_at) to scan results."""
+    results = {}
+    for code, status, checked_in_at in rows:
+        outcome = ALREADY_USED if status == 'used' else NOT_VALID
+        results[str(code)] = _result(code, outcome, checked_in_at)
+    return results
+
+
+def _record_admissions(event_codes):
+    """
+    Log admitted codes as manifest removals and drop them from the hot sets.
+
+    ``event_codes`` maps event ids to the codes admitted for that event. Must
+    be called inside the transaction that admitted them so the manifest log
+    never misses a check-in.
+    """
+    manifest.record_changes([
+        (event_id, code, TicketManifestChange.OP_REMOVE)
+        for event_id, codes in event_codes.items() for code in codes
+    ])
+
+    def _sync_hot_sets():
+        for event_id, codes in event_codes.items():
+            try:
+                remove_codes(event_id, codes)
+            except Exception as e:
+                logger.error(f"Error updating gate hot set for event {event_id}: {str(e)}")
+
+    transaction.on_commit(_sync_hot_sets)
+
+
+def bulk_update_status(purchases, from_status, to_status):
+    """
+    Move the ``purchases`` in ``from_status`` to ``to_status`` with one UPDATE.
+
+    ``queryset.update()`` skips the post_save signal, so this logs the
+    manifest changes and syncs the hot sets the way it would. Returns the
+    number of purchases moved.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        rows = list(purchases.select_for_update().filter(status=from_status).values_list(
+            'pk', 'verification_code', 'event_ticket__event_id'
+        ))
+        if not rows:
+            return 0
+        TicketPurchase.objects.filter(pk__in=[pk for pk, _, _ in rows], status=from_status).update(
+            status=to_status, updated_at=now
+        )
+        event_codes = {}
+        for _, code, event_id in rows:
+            event_codes.setdefault(event_id, []).append(str(code))
+
+        if to_status == 'confirmed':
+            manifest.record_changes([
+                (event_id, code, TicketManifestChange.OP_ADD)
+                for event_id, codes in event_codes.items() for code in codes
+            ])
+
+            def _sync_hot_sets():
+                for event_id, codes in event_codes.items():
+                    try:
+                        for code in codes:
+                            add_code(event_id, code)
+                    except Exception as e:
+                        logger.error(f"Error updating gate hot set for event {event_id}: {str(e)}")
+
+            transaction.on_commit(_sync_hot_sets)
+        elif from_status == 'confirmed':
+            _record_admissions(event_codes)
+    return len(rows)
+
+
+def _events_for_tickets(event_ticket_ids):
+    return dict(
+        EventTicket.objects.filter(id__in=set(event_ticket_ids)).values_list('id', 'event_id')
+    )
+
+
+def admit_purchase(purchase):
+    """
+    Atomically move a confirmed purchase to used.
+
+    Returns True if this call admitted the ticket, False if it was no longer
+    confirmed (for instance because another scanner got there first).
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        admitted = TicketPurchase.objects.filter(pk=purchase.pk, status='confirmed').update(
+            status='used', checked_in_at=now, updated_at=now
+        )
+        if admitted:
+            _record_admissions({purchase.event_ticket.event_id: [str(purchase.verification_code)]})
+    if admitted:
+        purchase.status = 'used'
+        purchase.checked_in_at = now
+        purchase.updated_at = now
+    return bool(admitted)
+
+
+def check_in(code, event_id=None):
+    """
+    Admit a single verification code.
+
+    Costs one UPDATE when the ticket is valid and one extra SELECT otherwise.
+    A code the hot set rejects costs the SELECT alone, unless it shows the
+    set missed a confirmed ticket (e.g. one confirmed by a bulk update).
+    """
+    code = str(code)
+    if _hot_set_rejects(event_id, code):
+        rows = list(_purchases(event_id).filter(verification_code=code).values_list(
+            'verification_code', 'status', 'checked_in_at'
+        ))
+        if not any(status == 'confirmed' for _, status, _ in rows):
+            return _classify(rows).get(code, _result(code, NOT_FOUND))
+        logger.warning(f"Gate hot set of event {event_id} was missing confirmed code {code}; rebuilding it")
+        schedule_warm(event_id)
+
+    now = timezone.now()
+    with transaction.atomic():
+        admitted = _purchases(event_id).filter(verification_code=code, status='confirmed').update(
+            status='used', checked_in_at=now, updated_at=now
+        )
+        if admitted:
+            if event_id is None:
+                event_id = TicketPurchase.objects.filter(verification_code=code).values_list(
+                    'event_ticket__event_id', flat=True
+                ).first()
+            _record_admissions({event_id: [code]})
+    if admitted:
+        return _result(code, ADMITTED, now)
+
+    rows = _purchases(event_id).filter(verification_code=code).values_list(
+        'verification_code', 'status', 'checked_in_at'
+    )
+    return _classify(rows).get(code, _result(code, NOT_FOUND))
+
+
+def check_in_many(scans, event_id=None):
+    """
+    Admit a batch of scans from an offline scanner.
+
+    ``scans`` is a list of ``(code, scanned_at)`` pairs; ``scanned_at`` may be
+    None and is recorded as the check-in time when present. Duplicate codes
+    in the batch keep their earliest scan. The whole batch costs a locking
+    SELECT, one UPDATE and one SELECT for the rejected codes.
+    """
+    now = timezone.now()
+    earliest = {}
+    for code, scanned_at in scans:
+        code = str(code)
+        scanned_at = scanned_at or now
+        if code not in earliest or scanned_at < earliest[code]:
+            earliest[code] = scanned_at
+    if not earliest:
+        return []
+
+    purchases = _purchases(event_id)
+    with transaction.atomic():
+        rows = [
+            (str(code), event_ticket_id) for code, event_ticket_id in
+            purchases.select_for_update().filter(
+                verification_code__in=list(earliest), status='confirmed'
+            ).values_list('verification_code', 'event_ticket_id')
+        ]
+        confirmed = [code for code, _ in rows]
+        if confirmed:
+            TicketPurchase.objects.filter(
+                verification_code__in=confirmed, status='confirmed'
+            ).update(
+                status='used',
+                updated_at=now,
+                checked_in_at=Case(
+                    *[When(verification_code=code, then=Value(earliest[code])) for code in confirmed],
+                    default=Value(now),
+                    output_field=DateTimeField(),
+                ),
+            )
+            events = _events_for_tickets(event_ticket_id for _, event_ticket_id in rows)
+            event_codes = {}
+            for code, event_ticket_id in rows:
+                event_codes.setdefault(events.get(event_ticket_id), []).append(code)
+            _record_admissions(event_codes)
+
+    results = {code: _result(code, ADMITTED, earliest[code]) for code in confirmed}
+    rejected = [code for code in earliest if code not in results]
+    if rejected:
+        rows = purchases.filter(verification_code__in=rejected).values_list(
+            'verification_code', 'status', 'checked_in_at'
+        )
+        results.update(_classify(rows))
+
+    return [results.get(code, _result(code, NOT_FOUND)) for code in earliest]
+
+
+def sync_offline(scans, event_id):
+    """
+    Ingest an offline scanner's check-in log.
+
+    Scans are admitted like a batch; when another device already admitted a
+    ticket, the earliest scan wins and becomes the recorded check-in time.
+    Returns the per-code results with ``duplicate`` set for scans that lost.
+    """
+    results = check_in_many(scans, event_id)
+    earliest = {}
+    for code, scanned_at in scans:
+        code = str(code)
+        if scanned_at and (code not in earliest or scanned_at < earliest[code]):
+            earliest[code] = scanned_at
+
+    for result in results:
+        if result['result'] != ALREADY_USED:
+            continue
+        code = result['code']
+        scanned_at = earliest.get(code)
+        if scanned_at is None:
+            result['duplicate'] = True
+            continue
+        # Offline scan predates the recorded check-in: it becomes the winner
+        moved = _purchases(event_id).filter(
+            verification_code=code, status='used', checked_in_at__gt=scanned_at
+        ).update(checked_in_at=scanned_at)
+        if moved:
+            result['result'] = ADMITTED
+            result['checked_in_at'] = scanned_at.isoformat()
+        else:
+            result['duplicate'] = True
+    return results
@@ -0,0 +1,176 @@
+"""
+Signed, versioned manifests of an event's valid verification codes.
+
+Door scanners download a manifest once and validate scans locally while the
+venue is offline. A manifest is either the full set of valid codes or the
+changes since a version the scanner already holds. Versions are ids from
+``TicketManifestChange``, which is appended to whenever a code becomes valid
+(confirmed) or stops being valid (used, cancelled, refunded).
+
+Two encodings are supported for full manifests:
+
+* ``codes``: the 16-byte UUIDs concatenated and base64 encoded.
+* ``bloom``: a Bloom filter over the same UUIDs, much smaller for large
+  events at the cost of a configurable false-positive rate. Admissions are
+  still reconciled through the sync endpoint once the scanner is online.
+
+Deltas are always sent as explicit ``added``/``removed`` code lists since a
+Bloom filter cannot express removals.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import math
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.crypto import salted_hmac
+
+from .models import TicketPurchase, TicketManifestChange
+
+FORMAT_CODES = 'codes'
+FORMAT_BLOOM = 'bloom'
+FORMATS = (FORMAT_CODES, FORMAT_BLOOM)
+
+
+class BloomFilter:
+    """Minimal Bloom filter over UUID bytes using double hashing of SHA-256."""
+
+    def __init__(self, size_bits, hash_count):
+        self.size_bits = size_bits
+        self.hash_count = hash_count
+        self.bits = bytearray((size_bits + 7) // 8)
+
+    @classmethod
+    def for_capacity(cls, capacity, error_rate):
+        capacity = max(capacity, 1)
+        size_bits = int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        hash_count = max(1, int(round(size_bits / capacity * math.log(2))))
+        return cls(size_bits, hash_count)
+
+    def _positions(self, value):
+        digest = hashlib.sha256(value).digest()
+        h1 = int.from_bytes(digest[:8], 'big')
+        h2 = int.from_bytes(digest[8:16], 'big') | 1
+        return ((h1 + i * h2) % self.size_bits for i in range(self.hash_count))
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position // 8] |= 1 << (position % 8)
+
+    def __contains__(self, value):
+        return all(self.bits[p // 8] & (1 << (p % 8)) for p in self._positions(value))
+
+
+def _signature(body):
+    """HMAC-SHA256 over the canonical JSON encoding of the manifest body."""
+    key = getattr(settings, 'TICKET_MANIFEST_SIGNING_KEY', None)
+    message = json.dumps(body, sort_keys=True, separators=(',', ':')).encode()
+    if key:
+        return hmac.new(key.encode(), message, hashlib.sha256).hexdigest()
+    return salted_hmac('tickets.manifest', message, algorithm='sha256').hexdigest()
+
+
+def _encode_codes(codes):
+    return base64.b64encode(b''.join(uuid.UUID(str(code)).bytes for code in codes)).decode()
+
+
+def record_changes(changes):
+    """Append ``(event_id, verification_code, op)`` tuples to the change log."""
+    if not changes:
+        return
+    TicketManifestChange.objects.bulk_create([
+        TicketManifestChange(event_id=event_id, verification_code=code, op=op)
+        for event_id, code, op in changes
+    ])
+
+
+def current_version(event_id):
+    return TicketManifestChange.objects.filter(event_id=event_id).aggregate(
+        version=Max('id')
+    )['version'] or 0
+
+
+def _valid_codes(event_id):
+    return list(
+        TicketPurchase.objects.filter(
+            event_ticket__event_id=event_id, status='confirmed'
+        ).order_by('verification_code').values_list('verification_code', flat=True)
+    )
+
+
+def _full_body(event_id, version, fmt):
+    codes = _valid_codes(event_id)
+    body = {
+        'event_id': event_id,
+        'version': version,
+        'since': None,
+        'format': fmt,
+        'count': len(codes),
+    }
+    if fmt == FORMAT_BLOOM:
+        error_rate = getattr(settings, 'TICKET_MANIFEST_BLOOM_ERROR_RATE', 0.001)
+        bloom = BloomFilter.for_capacity(len(codes), error_rate)
+        for code in codes:
+            bloom.add(code.bytes)
+        body['bloom'] = {
+            'size_bits': bloom.size_bits,
+            'hash_count': bloom.hash_count,
+            'hash': 'sha256-double',
+            'data': base64.b64encode(bytes(bloom.bits)).decode(),
+        }
+    else:
+        body['codes'] = _encode_codes(codes)
+    return body
+
+
+def _delta_body(event_id, version, since):
+    latest = {}
+    changes = TicketManifestChange.objects.filter(
+        event_id=event_id, id__gt=since, id__lte=version
+    ).values_list('verification_code', 'op')
+    for code, op in changes.iterator():
+        latest[code] = op
+    added = sorted(code for code, op in latest.items() if op == TicketManifestChange.OP_ADD)
+    removed = sorted(code for code, op in latest.items() if op == TicketManifestChange.OP_REMOVE)
+    return {
+        'event_id': event_id,
+        'version': version,
+        'since': since,
+        'format': FORMAT_CODES,
+        'count': len(added) + len(removed),
+        'added': _encode_codes(added),
+        'removed': _encode_codes(removed),
+    }
+
+
+def build_manifest(event_id, since=None, fmt=FORMAT_CODES):
+    """
+    Build a signed manifest for ``event_id``.
+
+    With ``since`` the manifest only carries the changes after that version.
+    The version is read before the codes, so a change landing in between is
+    at worst replayed again by the next delta, which is idempotent.
+    """
+    version = current_version(event_id)
+    if since is not None and since >= version:
+        body = {
+            'event_id': event_id, 'version': version, 'since': since,
+            'format': FORMAT_CODES, 'count': 0, 'added': '', 'removed': '',
+        }
+    elif since is not None:
+        body = _delta_body(event_id, version, since)
+    else:
+        cache_key = f'ticket_manifest:{event_id}:{version}:{fmt}'
+        body = cache.get(cache_key)
+        if body is None:
+            body = _full_body(event_id, version, fmt)
+            cache.set(cache_key, body, 3600)
+
+    manifest = dict(body, generated_at=timezone.now().isoformat())
+    manifest['signature'] = _signature(body)
+    return manifest
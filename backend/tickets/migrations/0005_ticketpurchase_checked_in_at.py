@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0004_remove_ticketpurchase_ticket_type_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticketpurchase',
+            name='checked_in_at',
+            field=models.DateTimeField(blank=True, help_text='When the ticket was admitted at the gate', null=True),
+        ),
+    ]
@@ -0,0 +1,29 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gallery', '0020_add_order_to_eventregistration'),
+        ('tickets', '0005_ticketpurchase_checked_in_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TicketManifestChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('verification_code', models.UUIDField()),
+                ('op', models.CharField(choices=[('add', 'Add'), ('remove', 'Remove')], max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='manifest_changes', to='gallery.event')),
+            ],
+            options={
+                'verbose_name': 'Ticket Manifest Change',
+                'verbose_name_plural': 'Ticket Manifest Changes',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['event', 'id'], name='tickets_manifest_event_idx')],
+            },
+        ),
+    ]
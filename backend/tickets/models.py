@@ -8,6 +8,7 @@ from io import BytesIO
 from django.core.files import File
 from django.core.validators import MinValueValidator
 from django.urls import reverse
+from model_utils import FieldTracker
 from gallery.models import Event
 
 logger = logging.getLogger(__name__)
@@ -64,9 +65,12 @@ class TicketPurchase(models.Model):
     verification_code = models.UUIDField(default=uuid.uuid4, editable=False, unique=True, db_index=True)
     email_sent = models.BooleanField(default=False)
     last_email_sent = models.DateTimeField(null=True, blank=True)
+    checked_in_at = models.DateTimeField(null=True, blank=True, help_text='When the ticket was admitted at the gate')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    tracker = FieldTracker(fields=['status'])
+    
     class Meta:
         verbose_name = 'Ticket Purchase'
         verbose_name_plural = 'Ticket Purchases'
@@ -256,3 +260,38 @@ class TicketPurchase(models.Model):
             bool: True if email was sent successfully, False otherwise
         """
         return self.send_confirmation_email(request)
+
+
+class TicketManifestChange(models.Model):
+    """
+    Append-only log of changes to an event's set of valid verification codes.
+
+    The auto-incrementing id doubles as the manifest version, so scanners can
+    ask for every change after the version they already hold.
+    """
+    OP_ADD = 'add'
+    OP_REMOVE = 'remove'
+    OP_CHOICES = [
+        (OP_ADD, 'Add'),
+        (OP_REMOVE, 'Remove'),
+    ]
+    
+    event = models.ForeignKey(
+        Event,
+        on_delete=models.CASCADE,
+        related_name='manifest_changes'
+    )
+    verification_code = models.UUIDField()
+    op = models.CharField(max_length=10, choices=OP_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'Ticket Manifest Change'
+        verbose_name_plural = 'Ticket Manifest Changes'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['event', 'id'], name='tickets_manifest_event_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.event_id} v{self.id} {self.op} {self.verification_code}"
@@ -59,3 +59,45 @@ class QRCodeVerificationSerializer(serializers.Serializer):
         if not value.startswith('ticket:'):
             raise serializers.ValidationError("Invalid QR code format")
         return value
+
+
+class GateScanSerializer(serializers.Serializer):
+    """Serializer for a single gate scan (verification code or raw QR data)."""
+    verification_code = serializers.UUIDField(required=False)
+    qr_data = serializers.CharField(required=False)
+    event_id = serializers.IntegerField(required=False)
+    
+    def validate(self, data):
+        """Resolve the verification code from the QR data when needed."""
+        if not data.get('verification_code'):
+            qr_data = data.get('qr_data', '')
+            if not qr_data.startswith('ticket:'):
+                raise serializers.ValidationError("Either verification_code or qr_data is required")
+            data['verification_code'] = serializers.UUIDField().to_internal_value(
+                qr_data.split(':', 1)[1].strip()
+            )
+        return data
+
+
+class GateBatchScanItemSerializer(serializers.Serializer):
+    """Serializer for one scan recorded by an offline scanner."""
+    verification_code = serializers.UUIDField()
+    scanned_at = serializers.DateTimeField(required=False)
+
+
+class GateBatchScanSerializer(serializers.Serializer):
+    """Serializer for a batch of scans uploaded by an offline scanner."""
+    event_id = serializers.IntegerField(required=False)
+    scans = GateBatchScanItemSerializer(many=True, allow_empty=False, max_length=1000)
+
+
+class GateManifestQuerySerializer(serializers.Serializer):
+    """Query parameters for downloading an offline manifest."""
+    since = serializers.IntegerField(required=False, min_value=0)
+    format = serializers.ChoiceField(choices=['codes', 'bloom'], default='codes')
+
+
+class GateOfflineSyncSerializer(serializers.Serializer):
+    """Serializer for an offline scanner's check-in log."""
+    device_id = serializers.CharField(required=False, max_length=100)
+    scans = GateBatchScanItemSerializer(many=True, allow_empty=False, max_length=5000)
@@ -0,0 +1,53 @@
+import logging
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import EventTicket, TicketPurchase
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=TicketPurchase)
+def sync_gate_state(sender, instance, created, **kwargs):
+    """
+    Keep the event's manifest log and gate hot set in step with the purchase status
+    """
+    if not created and not instance.tracker.has_changed('status'):
+        return
+
+    from . import gate, manifest
+    from .models import TicketManifestChange
+
+    previous = None if created else instance.tracker.previous('status')
+    event_id = instance.event_ticket.event_id
+    code = instance.verification_code
+
+    # Manifest changes are written in the same transaction as the status change
+    if instance.status == 'confirmed':
+        manifest.record_changes([(event_id, code, TicketManifestChange.OP_ADD)])
+    elif previous == 'confirmed':
+        manifest.record_changes([(event_id, code, TicketManifestChange.OP_REMOVE)])
+
+    def _sync():
+        try:
+            if instance.status == 'confirmed':
+                gate.add_code(event_id, code)
+            elif previous == 'confirmed':
+                gate.remove_codes(event_id, [code])
+        except Exception as e:
+            logger.error(f"Error syncing gate hot set for ticket {instance.pk}: {str(e)}")
+
+    transaction.on_commit(_sync)
+
+
+@receiver(post_save, sender=EventTicket)
+@receiver(post_delete, sender=EventTicket)
+def forget_gate_ticket_ids(sender, instance, **kwargs):
+    """
+    New or removed ticket types change which purchases the gate scopes to the event
+    """
+    from . import gate
+
+    gate.forget_event_tickets(instance.event_id)
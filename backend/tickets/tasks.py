@@ -0,0 +1,20 @@
+from celery import shared_task
+import logging
+
+logger = logging.getLogger(__name__)
+
+@shared_task
+def warm_gate_codes(event_id):
+    """
+    Task to load an event's valid verification codes into the gate hot set
+    """
+    from tickets import gate
+
+    try:
+        count = gate.warm_event(event_id)
+        logger.info(f"Loaded {count} gate codes for event {event_id}")
+        return True
+
+    except Exception as e:
+        logger.error(f"Error warming gate codes for event {event_id}: {str(e)}")
+        return False
@@ -1,7 +1,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from . import views
-from .views_verification import TicketVerificationView, TicketCheckInView
+from .views_verification import TicketVerificationView, TicketCheckInView, GateScanView, GateBatchScanView, GateManifestView, GateOfflineSyncView
 from .views_payment import CreatePaymentIntentView, WebhookHandlerView
 
 router = DefaultRouter()
@@ -28,6 +28,12 @@ urlpatterns = [
     path('verify/', TicketVerificationView.as_view(), name='verify-ticket-post'),
     path('check-in/', TicketCheckInView.as_view(), name='check-in-ticket'),
     
+    # Gate mode endpoints
+    path('gate/scan/', GateScanView.as_view(), name='gate-scan'),
+    path('gate/scan/batch/', GateBatchScanView.as_view(), name='gate-scan-batch'),
+    path('gate/events/<int:event_id>/manifest/', GateManifestView.as_view(), name='gate-manifest'),
+    path('gate/events/<int:event_id>/sync/', GateOfflineSyncView.as_view(), name='gate-offline-sync'),
+    
     # Admin endpoints
     path('admin/tickets/', views.AdminTicketList.as_view(), name='admin-ticket-list'),
     path('admin/tickets/<uuid:pk>/', views.AdminTicketDetail.as_view(), name='admin-ticket-detail'),
@@ -1,7 +1,6 @@
 import os
 import logging
 from django.conf import settings
-from django.core.mail import EmailMultiAlternatives
 from django.template.loader import render_to_string
 from django.utils import timezone
 from django.urls import reverse
@@ -67,7 +66,7 @@ def generate_qr_code(ticket, request=None):
 
 def send_ticket_email(ticket, request=None, is_cancellation=False, refund_amount=None):
     """
-    Send a ticket confirmation or cancellation email
+    Queue a ticket confirmation or cancellation email in the outbox
     
     Args:
         ticket: TicketPurchase instance
@@ -76,7 +75,7 @@ def send_ticket_email(ticket, request=None, is_cancellation=False, refund_amount
         refund_amount: Decimal amount being refunded (for cancellations)
         
     Returns:
-        bool: True if email was sent successfully, False otherwise
+        bool: True if email was queued successfully, False otherwise
     """
     try:
         # Get the event and ticket type through the event_ticket relationship
@@ -116,45 +115,30 @@ def send_ticket_email(ticket, request=None, is_cancellation=False, refund_amount
         from_email = getattr(settings, 'DEFAULT_FROM_EMAIL', 'noreply@example.com')
         to_email = ticket.user.email
         
-        # Generate QR code if this is a confirmation email
+        # Attach the ticket's QR code to confirmation emails
         attachments = []
-        qr_code_url = None
         if not is_cancellation:
-            qr_file, qr_filename, qr_data_url = generate_qr_code(ticket, request)
-            if qr_file and qr_data_url:
-                # Save QR code to ticket model if it has a qr_code field
-                if hasattr(ticket, 'qr_code'):
-                    ticket.qr_code.save(qr_filename, qr_file, save=True)
-                
-                # Add QR code as an inline attachment for the email
-                attachments.append((qr_filename, qr_file.read(), 'image/png'))
-                qr_code_url = qr_data_url
-        
-        # Add QR code URL to context for HTML template
-        context['qr_code_url'] = qr_code_url
-        
-        # Send email
-        email = EmailMultiAlternatives(
-            subject=subject,
-            body=text_content,
+            if not ticket.qr_code:
+                ticket._generate_qr_code()
+            if ticket.qr_code:
+                attachments.append(
+                    (f'ticket_{ticket.verification_code}.png', ticket.qr_code.name, 'image/png')
+                )
+        
+        # Queue the email; the outbox workers deliver it with retries
+        from notifications.outbox import enqueue_email
+        enqueue_email(
+            [to_email],
+            subject,
+            text_body=text_content,
+            html_body=html_content,
             from_email=from_email,
-            to=[to_email],
-            reply_to=[getattr(settings, 'DEFAULT_REPLY_TO_EMAIL', from_email)],
+            reply_to=getattr(settings, 'DEFAULT_REPLY_TO_EMAIL', from_email),
+            attachments=attachments,
         )
         
-        # Attach HTML content if available
-        if html_content:
-            email.attach_alternative(html_content, "text/html")
-        
-        # Attach QR code if available
-        for filename, content, mimetype in attachments:
-            email.attach(filename, content, mimetype)
-        
-        # Send the email
-        email.send(fail_silently=False)
-        
-        # Log successful email sending
-        logger.info(f"Successfully sent {'cancellation' if is_cancellation else 'confirmation'} "
+        # Log successful queueing
+        logger.info(f"Queued {'cancellation' if is_cancellation else 'confirmation'} "
                    f"email for ticket {ticket.id} to {to_email}")
         
         return True
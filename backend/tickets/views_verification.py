@@ -2,14 +2,20 @@ import logging
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from accounts.permissions import IsStaffOrSuperuser
+from . import gate, manifest
 from .models import TicketPurchase
 from .serializers_verification import (
     TicketVerificationSerializer,
     TicketCheckInSerializer,
-    QRCodeVerificationSerializer
+    QRCodeVerificationSerializer,
+    GateScanSerializer,
+    GateBatchScanSerializer,
+    GateManifestQuerySerializer,
+    GateOfflineSyncSerializer
 )
 
 logger = logging.getLogger(__name__)
@@ -57,8 +63,16 @@ class TicketVerificationView(APIView):
                     status=status.HTTP_200_OK
                 )
             
-            # Ticket is valid, mark as used
-            ticket.mark_as_used()
+            # Ticket is valid, mark as used unless another scanner got there first
+            if not gate.admit_purchase(ticket):
+                return Response(
+                    {
+                        "error": "Ticket has already been used",
+                        "status": "used",
+                        "valid": False
+                    },
+                    status=status.HTTP_200_OK
+                )
             
             # Serialize the ticket data
             serializer = TicketVerificationSerializer(ticket)
@@ -139,8 +153,16 @@ class TicketCheckInView(APIView):
                     status=status.HTTP_200_OK
                 )
             
-            # Mark ticket as used
-            ticket.mark_as_used()
+            # Mark ticket as used unless another scanner got there first
+            if not gate.admit_purchase(ticket):
+                return Response(
+                    {
+                        "error": "Ticket is used",
+                        "status": "used",
+                        "checked_in": False
+                    },
+                    status=status.HTTP_200_OK
+                )
             
             # Serialize the ticket data
             serializer = TicketVerificationSerializer(ticket)
@@ -157,3 +179,120 @@ class TicketCheckInView(APIView):
                 {"error": "An error occurred during check-in"}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+
+class GateScanView(APIView):
+    """
+    Gate mode check-in for scanners at the venue doors.
+    
+    A single conditional UPDATE admits the ticket, so concurrent scans of the
+    same code can never both succeed. Returns a minimal payload.
+    """
+    permission_classes = [IsAuthenticated, IsStaffOrSuperuser]
+    
+    def post(self, request):
+        serializer = GateScanSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({"error": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+        
+        data = serializer.validated_data
+        try:
+            result = gate.check_in(data['verification_code'], data.get('event_id'))
+        except Exception as e:
+            logger.error(f"Error during gate scan: {str(e)}")
+            return Response(
+                {"error": "An error occurred during check-in"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+        return Response(result)
+
+
+class GateBatchScanView(APIView):
+    """
+    Batch check-in for scans recorded by offline scanners.
+    
+    Duplicate codes keep their earliest scan time; each scan gets a result in
+    the order it was first seen.
+    """
+    permission_classes = [IsAuthenticated, IsStaffOrSuperuser]
+    
+    def post(self, request):
+        serializer = GateBatchScanSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({"error": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+        
+        data = serializer.validated_data
+        scans = [(scan['verification_code'], scan.get('scanned_at')) for scan in data['scans']]
+        try:
+            results = gate.check_in_many(scans, data.get('event_id'))
+        except Exception as e:
+            logger.error(f"Error during batch gate scan: {str(e)}")
+            return Response(
+                {"error": "An error occurred during check-in"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+        return Response({"results": results})
+
+
+class GateManifestView(APIView):
+    """
+    Signed manifest of an event's valid verification codes for offline scanners.
+    
+    Pass ``since`` with the version the scanner already holds to receive only
+    the changes after it; ``format=bloom`` returns a Bloom filter instead of
+    the full code list.
+    """
+    permission_classes = [IsAuthenticated, IsStaffOrSuperuser]
+    
+    def get(self, request, event_id):
+        serializer = GateManifestQuerySerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response({"error": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            data = manifest.build_manifest(
+                event_id,
+                since=serializer.validated_data.get('since'),
+                fmt=serializer.validated_data['format']
+            )
+        except Exception as e:
+            logger.error(f"Error building manifest for event {event_id}: {str(e)}")
+            return Response(
+                {"error": "An error occurred while building the manifest"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+        return Response(data)
+
+
+class GateOfflineSyncView(APIView):
+    """
+    Ingest check-ins recorded offline by a door scanner.
+    
+    When several devices admitted the same ticket the earliest scan wins and
+    the others are reported as duplicates. The response carries the current
+    manifest version so the scanner can fetch the delta afterwards.
+    """
+    permission_classes = [IsAuthenticated, IsStaffOrSuperuser]
+    
+    def post(self, request, event_id):
+        serializer = GateOfflineSyncSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({"error": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+        
+        data = serializer.validated_data
+        scans = [(scan['verification_code'], scan.get('scanned_at')) for scan in data['scans']]
+        try:
+            results = gate.sync_offline(scans, event_id)
+        except Exception as e:
+            logger.error(
+                f"Error syncing offline scans for event {event_id} "
+                f"from device {data.get('device_id', 'unknown')}: {str(e)}"
+            )
+            return Response(
+                {"error": "An error occurred while syncing check-ins"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+        return Response({
+            "results": results,
+            "version": manifest.current_version(event_id)
+        })